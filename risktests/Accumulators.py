@@ -0,0 +1,236 @@
+from risktests.Grade_aggregates import (
+    grade_aggregates, contingency_table, _check_chunk, _add_aggregates)
+from risktests.Binomial_test import _binomial_from_aggregates
+from risktests.Jeffreys_test import _jeffreys_from_aggregates
+from risktests.Speigelhalter_Normal_test import _spiegelhalter_from_aggregates
+from risktests.Hosmer_Lemeshow_Chi_Square import Hosmer_Lemeshow_Chi_Square
+from risktests.InformationValue import _iv_from_aggregates
+from risktests.Coefficient_of_concordance import _concordance_from_aggregates
+from risktests.Somers_d import _somersd_from_aggregates
+from risktests.Traffic_lights_approach import _traffic_lights_from_aggregates
+from risktests.Population_Stability_Index import _psi_from_contingency
+from risktests.Concentration_of_Rating_Grades import (
+    _concentration_from_contingency)
+from risktests.Customer_migrations import _mwb_from_contingency
+from risktests.Stability_of_Migration_Matrices import (
+    _stability_from_contingency)
+from risktests.Grade_aggregates import _error_moments, _merge_error_moments
+from risktests.LGD_t_test import _lgd_from_moments
+from risktests.Expected_Loss_Best_Estimate_t_test import _elbe_from_moments
+
+
+class _Accumulator:
+    """Mergeable partial state of a test
+
+    Subclasses define _columns() and _reduce(chunk), which returns the
+    state of one chunk, _combine(state, other) and a FINALIZERS dict
+    mapping test names to functions of (state, alpha).
+    """
+
+    FINALIZERS = {}
+
+    def __init__(self, test=None, alpha=0.05):
+        if test is not None and test not in self.FINALIZERS:
+            raise ValueError('{} is not a known test'.format(test))
+        if not isinstance(alpha, float):
+            raise TypeError('alpha should be a float value')
+        self.test = test
+        self.alpha = alpha
+        self.state = None
+
+    def update(self, chunk):
+        """Adds a DataFrame or structured array chunk to the state"""
+        chunk = _check_chunk(chunk, self._columns())
+        if len(chunk):
+            part = self._reduce(chunk)
+            self.state = part if self.state is None else self._combine(
+                self.state, part)
+        return self
+
+    def merge(self, other):
+        """Adds the state of another accumulator of the same test"""
+        if type(other) is not type(self) or \
+                other._columns() != self._columns():
+            raise TypeError('Can only merge accumulators of the same kind')
+        if other.state is not None:
+            self.state = other.state if self.state is None else \
+                self._combine(self.state, other.state)
+        return self
+
+    def finalize(self):
+        """Result of the test, or the accumulated state if no test given"""
+        if self.state is None:
+            raise TypeError('No data provided!')
+        if self.test is None:
+            return self.state
+        return self.FINALIZERS[self.test](self.state, self.alpha)
+
+
+class GradeAccumulator(_Accumulator):
+    """Per-grade counts and PD moments for the PD calibration tests
+
+    Parameters
+    ----------
+    ratings_col: string
+        name of column with ratings
+    defaults_col: string
+        name of column with default statuses (0/1)
+    PDs_col: string, optional
+        name of column with probabilities-of-default values
+    test: string, optional
+        one of 'binomial', 'jeffreys', 'spiegelhalter', 'hosmer_lemeshow',
+        'information_value', 'concordance', 'somers_d', 'traffic_lights'.
+        If None, finalize returns the grade_aggregates table.
+    alpha: float
+        level of significance for the Jeffreys and Hosmer-Lemeshow tests
+
+
+    Notes
+    -----
+    The state is the grade_aggregates table, K rows for K ratings, so it
+    pickles compactly and merges exactly by adding the rows of equal
+    ratings.
+
+
+    Examples
+    --------
+    >>acc = GradeAccumulator('ratings', 'default_flag', 'prob_default',
+                             test='jeffreys')
+    >>for chunk in pd.read_csv('portfolio.csv', chunksize=10**6):
+    >>    acc.update(chunk)
+    >>acc.merge(other_worker_acc)
+    >>print(acc.finalize())
+    """
+
+    FINALIZERS = {
+        'binomial': lambda agg, alpha: _binomial_from_aggregates(agg),
+        'jeffreys': _jeffreys_from_aggregates,
+        'spiegelhalter': lambda agg, alpha: _spiegelhalter_from_aggregates(
+            agg),
+        'hosmer_lemeshow': Hosmer_Lemeshow_Chi_Square.from_aggregates,
+        'information_value': lambda agg, alpha: _iv_from_aggregates(agg),
+        'concordance': lambda agg, alpha: _concordance_from_aggregates(agg),
+        'somers_d': lambda agg, alpha: _somersd_from_aggregates(agg),
+        'traffic_lights': lambda agg, alpha: _traffic_lights_from_aggregates(
+            agg),
+    }
+
+    def __init__(self, ratings_col, defaults_col, PDs_col=None, test=None,
+                 alpha=0.05):
+        _Accumulator.__init__(self, test, alpha)
+        self.ratings_col = ratings_col
+        self.defaults_col = defaults_col
+        self.PDs_col = PDs_col
+
+    def _columns(self):
+        return [c for c in (self.ratings_col, self.defaults_col,
+                            self.PDs_col) if c is not None]
+
+    def _reduce(self, chunk):
+        return grade_aggregates(chunk, self.ratings_col, self.defaults_col,
+                                self.PDs_col)
+
+    def _combine(self, state, other):
+        return _add_aggregates(state, other)
+
+
+class ContingencyAccumulator(_Accumulator):
+    """Initial by final rating counts for the migration and population
+    stability tests
+
+    Parameters
+    ----------
+    initial_ratings_col: string
+        name of column with initial ratings
+    final_ratings_col: string
+        name of column with final ratings
+    test: string, optional
+        one of 'psi', 'ratings_concentration', 'migration_statistics',
+        'migration_stability'. If None, finalize returns the contingency
+        table.
+
+
+    Notes
+    -----
+    The state is the K x K contingency table; the rating histograms of
+    both columns are its margins.
+
+
+    Examples
+    --------
+    >>acc = ContingencyAccumulator('ratings', 'ratings2', test='psi')
+    >>for chunk in chunks:
+    >>    acc.update(chunk)
+    >>print(acc.finalize())
+    """
+
+    FINALIZERS = {
+        'psi': lambda N_ij, alpha: _psi_from_contingency(N_ij),
+        'ratings_concentration': lambda N_ij, alpha:
+            _concentration_from_contingency(N_ij),
+        'migration_statistics': lambda N_ij, alpha: _mwb_from_contingency(
+            N_ij),
+        'migration_stability': lambda N_ij, alpha:
+            _stability_from_contingency(N_ij),
+    }
+
+    def __init__(self, initial_ratings_col, final_ratings_col, test=None):
+        _Accumulator.__init__(self, test)
+        self.initial_ratings_col = initial_ratings_col
+        self.final_ratings_col = final_ratings_col
+
+    def _columns(self):
+        return [self.initial_ratings_col, self.final_ratings_col]
+
+    def _reduce(self, chunk):
+        return contingency_table(chunk, self.initial_ratings_col,
+                                 self.final_ratings_col)
+
+    def _combine(self, state, other):
+        return _add_aggregates(state, other)
+
+
+class ErrorMomentsAccumulator(_Accumulator):
+    """Count, sums and squared deviations of the LGD errors for the LGD
+    and ELBE t-tests
+
+    Parameters
+    ----------
+    observed_LGD_col: string
+        name of column with observed LGD values
+    expected_LGD_col: string
+        name of column with expected LGD or ELBE values
+    test: string, optional
+        'lgd_t_test' or 'elbe_t_test'. If None, finalize returns the
+        moments (N, sum of observed, sum of expected, mean error, sum of
+        squared deviations of the error).
+
+
+    Examples
+    --------
+    >>acc = ErrorMomentsAccumulator('LGD', 'PRED_LGD', test='lgd_t_test')
+    >>for chunk in chunks:
+    >>    acc.update(chunk)
+    >>print(acc.finalize())
+    """
+
+    FINALIZERS = {
+        'lgd_t_test': lambda moments, alpha: _lgd_from_moments(moments),
+        'elbe_t_test': lambda moments, alpha: _elbe_from_moments(moments),
+    }
+
+    def __init__(self, observed_LGD_col, expected_LGD_col, test=None):
+        _Accumulator.__init__(self, test)
+        self.observed_LGD_col = observed_LGD_col
+        self.expected_LGD_col = expected_LGD_col
+
+    def _columns(self):
+        return [self.observed_LGD_col, self.expected_LGD_col]
+
+    def _reduce(self, chunk):
+        return _error_moments(
+            chunk[self.observed_LGD_col].to_numpy(dtype=float),
+            chunk[self.expected_LGD_col].to_numpy(dtype=float))
+
+    def _combine(self, state, other):
+        return _merge_error_moments(state, other)
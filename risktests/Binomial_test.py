@@ -1,13 +1,19 @@
+from collections import OrderedDict
+from functools import lru_cache
 import numpy as np
 import pandas as pd
-from scipy.stats import binom
+from scipy import fft
+from scipy.stats import beta, binom, norm
+from risktests.Grade_aggregates import (
+    grade_aggregates, _is_chunked, _factorize)
+from risktests.Portfolio_handle import Portfolio
 
 
 def binomial_test(df, defaults_col, PDs_col, ratings_col):
     """
     Parameters
     ----------
-    df: array-like, at least 2D
+    df: array-like, at least 2D, or an iterable of such chunks
         data
     ratings_col: string
         name of column with ratings
@@ -38,7 +44,11 @@ def binomial_test(df, defaults_col, PDs_col, ratings_col):
                     PDs_col='prob_default')
     >>print(res)
     """
-    if df.empty:
+    if isinstance(df, Portfolio):
+        return _binomial_from_aggregates(
+            df.grade_aggregates(ratings_col, defaults_col, PDs_col))
+    chunked = _is_chunked(df)
+    if not chunked and df.empty:
         raise TypeError('No data provided!')
     if defaults_col is None:
         raise TypeError('No column name for defaults provided')
@@ -55,6 +65,10 @@ def binomial_test(df, defaults_col, PDs_col, ratings_col):
     if not isinstance(PDs_col, str):
         raise TypeError('PDs_col not of type string')
 
+    if chunked:
+        agg = grade_aggregates(df, ratings_col, defaults_col, PDs_col)
+        return _binomial_from_aggregates(agg)
+
     # Check if the correct column names have been provided
     if defaults_col not in df.columns:
         raise ValueError('{} not a column in the df'.format(defaults_col))
@@ -71,36 +85,398 @@ def binomial_test(df, defaults_col, PDs_col, ratings_col):
     if df[PDs_col].hasnans:
         raise ValueError('Missing values in {}'.format(PDs_col))
 
-    ratings = df[ratings_col]
+    agg = grade_aggregates(df, ratings_col, defaults_col, PDs_col)
+    return _binomial_from_aggregates(agg)
+
+
+def _binomial_from_aggregates(agg, alpha=0.05):
+    """Binomial test per rating from the output of grade_aggregates"""
+    p_g = agg['sum_PD']/agg['N']
+    binomial_factor = binom.cdf(agg['D'], agg['N'], p_g)
+    conclusion = np.where(
+        (binomial_factor <= alpha) | (1 - binomial_factor <= alpha),
+        'reject', 'fail to reject')
     results = pd.DataFrame({
-        'Rating': [],
-        'Number of Obs': [],
-        'Number of Defaults': [],
-        'Average PD': [],
-        'Binomial Test': [],
-        'Conclusion': []})
-
-    alpha = 0.05
-
-    for rating in set(ratings):
-        # Calculation of factors needed
-        g = df[df[ratings_col] == rating]
-        n_g = len(g)
-        n_1g = sum(g[defaults_col])
-        p_g = np.mean(g[PDs_col])
-        binomial_factor = binom.cdf(n_1g, n_g, p_g)
-        # Binomial test
-        if (binomial_factor <= alpha) | (1 - binomial_factor <= alpha):
-            conclusion = 'reject'
-        else:
-            conclusion = 'fail to reject'
-        res = pd.DataFrame({
-            'Rating': [rating],
-            'Number of Obs': [n_g],
-            'Number of Defaults': [n_1g],
-            'Average PD': [p_g],
-            'Binomial Test': [binomial_factor],
-            'Conclusion': [conclusion]})
-        results = pd.concat([results, res])
-    results = results.set_index('Rating')
+        'Number of Obs': agg['N'],
+        'Number of Defaults': agg['D'],
+        'Average PD': p_g,
+        'Binomial Test': binomial_factor,
+        'Conclusion': conclusion}, index=agg.index)
     return results
+
+
+def poisson_binomial_test(df, defaults_col, PDs_col, ratings_col, alpha=0.05,
+                          max_exact=1000000):
+    """Binomial test with the loan-level PDs of every rating
+
+    Parameters
+    ----------
+    df: array-like, at least 2D, or a Portfolio
+        data
+    ratings_col: string
+        name of column with ratings
+    PDs_col: string
+        name of column with probabilities-of-default values
+    defaults_col: string
+        name of column with default statuses (0/1)
+    alpha: float
+        significance level of the two-sided test
+    max_exact: integer
+        largest number of loans of a rating whose default distribution is
+        computed exactly; larger ratings use the refined normal
+        approximation
+
+
+    Returns
+    -------
+    results : array-like, 2D
+        Number of observations, number of defaults, average PD, the
+        probability of at most the observed number of defaults, the method
+        and test conclusion per rating.
+
+
+    Notes
+    -----
+    binomial_test gives every loan of a rating the rating's average PD.
+    With loan-level PDs p_i the number of defaults of a rating follows the
+    Poisson-binomial distribution, whose probabilities are the
+    coefficients of prod(1 - p_i + p_i*z). The product is taken pairwise,
+    all pairs of a level at once with FFT convolutions, in O(n log^2 n)
+    for n loans: about a second for a million loans.
+
+    The refined normal approximation [2] corrects the normal distribution
+    for the skewness g of the number of defaults,
+
+        P(D <= d) = G((d + 0.5 - mu)/sigma),
+        G(x) = Phi(x) + g*(1 - x^2)*phi(x)/6
+
+    with mu, sigma^2 and g from the sums of p_i, p_i*(1 - p_i) and
+    p_i*(1 - p_i)*(1 - 2*p_i), and is evaluated for all large ratings at
+    once.
+
+
+    References
+    ----------
+    [1] BIS. (2005). Studies on the Validation of Internal Rating Systems
+    (revised). https://www.bis.org/publ/bcbs_wp14.htm
+    [2] Volkova, A. Y. (1996). A refinement of the central limit theorem
+    for sums of independent random indicators. Theory of Probability and
+    its Applications, 40(4), 791-794.
+
+
+    Examples
+    --------
+    >>res = poisson_binomial_test(
+                    df=df,
+                    ratings_col='ratings',
+                    defaults_col='default_flag',
+                    PDs_col='prob_default')
+    >>print(res)
+    """
+    if not isinstance(alpha, float):
+        raise TypeError('alpha should be a float value')
+    if not isinstance(max_exact, int):
+        raise TypeError('max_exact should be an integer')
+    if isinstance(df, Portfolio):
+        codes, levels = df.codes(ratings_col)
+        return _poisson_binomial(codes, pd.Index(levels, name='Rating'),
+                                 df.defaults(defaults_col),
+                                 df.values(PDs_col), alpha, max_exact)
+    if df.empty:
+        raise TypeError('No data provided!')
+    # Checking that the correct datatype
+    if not isinstance(defaults_col, str):
+        raise TypeError('defaults_col not of type string')
+    if not isinstance(ratings_col, str):
+        raise TypeError('ratings_col not of type string')
+    if not isinstance(PDs_col, str):
+        raise TypeError('PDs_col not of type string')
+
+    # Check if the correct column names have been provided
+    if defaults_col not in df.columns:
+        raise ValueError('{} not a column in the df'.format(defaults_col))
+    if ratings_col not in df.columns:
+        raise ValueError('{} not a column in the df'.format(ratings_col))
+    if PDs_col not in df.columns:
+        raise ValueError('{} not a column in the df'.format(PDs_col))
+
+    # Check the data for missing values
+    if df[ratings_col].hasnans:
+        raise ValueError('Missing values in {}'.format(ratings_col))
+    if df[defaults_col].hasnans:
+        raise ValueError('Missing values in {}'.format(defaults_col))
+    if df[PDs_col].hasnans:
+        raise ValueError('Missing values in {}'.format(PDs_col))
+
+    codes, levels = _factorize(df[ratings_col])
+    return _poisson_binomial(codes, pd.Index(levels, name='Rating'),
+                             df[defaults_col].to_numpy(dtype=float),
+                             df[PDs_col].to_numpy(dtype=float), alpha,
+                             max_exact)
+
+
+def _poisson_binomial(codes, levels, defaults, PDs, alpha, max_exact):
+    """Poisson-binomial test per rating from the loan-level arrays"""
+    K = len(levels)
+    N = np.bincount(codes, minlength=K)
+    D = np.bincount(codes, weights=defaults, minlength=K)
+    variance = PDs*(1 - PDs)
+    mu = np.bincount(codes, weights=PDs, minlength=K)
+    sigma = np.sqrt(np.bincount(codes, weights=variance, minlength=K))
+    third = np.bincount(codes, weights=variance*(1 - 2*PDs), minlength=K)
+
+    # Refined normal approximation of every rating at once
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = (D + 0.5 - mu)/sigma
+        cdf = norm.cdf(x) + third/sigma**3*(1 - x**2)*norm.pdf(x)/6
+    cdf = np.clip(np.nan_to_num(cdf, nan=1.0), 0, 1)
+
+    # Exact distributions of the smaller ratings
+    exact = N <= max_exact
+    order = np.argsort(codes, kind='stable')
+    grouped = np.split(PDs[order], np.cumsum(N)[:-1])
+    for k in np.flatnonzero(exact):
+        pmf = _poisson_binomial_pmf(grouped[k])
+        cdf[k] = min(pmf[:int(D[k]) + 1].sum(), 1.0)
+
+    conclusion = np.where((cdf <= alpha) | (1 - cdf <= alpha),
+                          'reject', 'fail to reject')
+    return pd.DataFrame({
+        'Number of Obs': N,
+        'Number of Defaults': D.astype(int),
+        'Average PD': mu/N,
+        'Poisson-Binomial Test': cdf,
+        'Method': np.where(exact, 'exact', 'refined normal'),
+        'Conclusion': conclusion}, index=levels)
+
+
+def _poisson_binomial_pmf(PDs):
+    """Probabilities of 0..n defaults of n loans, the coefficients of
+    prod(1 - p + p*z) multiplied pairwise by FFT convolution"""
+    n = len(PDs)
+    # Pad to a power of two with the polynomial 1, for complete pairs
+    polys = np.zeros((1 << max(n - 1, 0).bit_length(), 2))
+    polys[:, 0] = 1
+    polys[:n, 0] = 1 - PDs
+    polys[:n, 1] = PDs
+    while len(polys) > 1:
+        m = 2*polys.shape[1] - 1
+        size = fft.next_fast_len(m, real=True)
+        spectra = fft.rfft(polys, size, axis=1)
+        polys = fft.irfft(spectra[0::2]*spectra[1::2], size, axis=1)[:, :m]
+    # Rounding leaves tiny negative probabilities
+    return np.clip(polys[0, :n + 1], 0, None)
+
+
+def vasicek_binomial_test(df, defaults_col, PDs_col, ratings_col, rho=0.12,
+                          alpha=0.05, n_nodes=64):
+    """Binomial test with correlated defaults under the one-factor model
+
+    Parameters
+    ----------
+    df: array-like, at least 2D, or an iterable of such chunks
+        data
+    ratings_col: string
+        name of column with ratings
+    PDs_col: string
+        name of column with probabilities-of-default values
+    defaults_col: string
+        name of column with default statuses
+    rho: float
+        asset correlation, between 0 and 1
+    alpha: float
+        significance level of the two-sided test
+    n_nodes: integer
+        number of Gauss-Hermite quadrature nodes
+
+
+    Returns
+    -------
+    results : array-like, 2D
+        Number of observations, number of defaults, average PD, the
+        probability of at most the observed number of defaults and test
+        conclusion per rating.
+
+
+    Notes
+    -----
+    In the one-factor (Vasicek) model a loan defaults when
+    sqrt(rho)*Z + sqrt(1 - rho)*e falls below the PD's normal quantile, with
+    Z the systematic factor shared by all loans. Given Z the defaults are
+    binomial, so
+
+        P(D <= d) = E[F(d; N, p(Z))]
+
+    Since the binomial distribution function is the upper tail of a
+    Beta(d + 1, N - d) variable B, and p(Z) < B exactly when Z exceeds a
+    quantile of B, this equals
+
+        E[Phi((sqrt(1 - rho)*Phi^-1(B) - Phi^-1(PD))/sqrt(rho))]
+
+    which is integrated with Gauss-Hermite quadrature over the normal
+    score of B. Unlike F(d; N, p(Z)), which for large ratings jumps from 0
+    to 1 over a narrow range of Z and is missed by the quadrature nodes,
+    the integrand is smooth for any number of loans. All ratings are
+    evaluated in one vectorized step, whose cost is dominated by the Beta
+    quantile function, about 0.1 ms per rating with the default 64 nodes.
+    The Beta quantiles depend on the number of loans and defaults, which
+    change between runs, so they are not cached. For rho close to 0 the
+    test tends to binomial_test.
+
+
+    References
+    ----------
+    [1] Tasche, D. (2003). A traffic lights approach to PD validation
+    (arXiv:cond-mat/0305038). arXiv.
+    [2] Vasicek, O. (2002). The distribution of loan portfolio value.
+    Risk, 15(12), 160-162.
+
+
+    Examples
+    --------
+    >>res = vasicek_binomial_test(
+                    df=df,
+                    ratings_col='ratings',
+                    defaults_col='default_flag',
+                    PDs_col='prob_default',
+                    rho=0.12)
+    >>print(res)
+    """
+    if not isinstance(rho, float) or not 0 < rho < 1:
+        raise TypeError('rho should be a float value between 0 and 1')
+    if not isinstance(alpha, float):
+        raise TypeError('alpha should be a float value')
+    if not isinstance(n_nodes, int) or n_nodes < 1:
+        raise TypeError('n_nodes should be a positive integer')
+    if isinstance(df, Portfolio):
+        return _vasicek_from_aggregates(
+            df.grade_aggregates(ratings_col, defaults_col, PDs_col), rho,
+            alpha, n_nodes)
+    chunked = _is_chunked(df)
+    if not chunked and df.empty:
+        raise TypeError('No data provided!')
+
+    # Checking that the correct datatype
+    if not isinstance(defaults_col, str):
+        raise TypeError('defaults_col not of type string')
+    if not isinstance(ratings_col, str):
+        raise TypeError('ratings_col not of type string')
+    if not isinstance(PDs_col, str):
+        raise TypeError('PDs_col not of type string')
+
+    if not chunked:
+        # Check if the correct column names have been provided and the
+        # data for missing values
+        for col in (defaults_col, ratings_col, PDs_col):
+            if col not in df.columns:
+                raise ValueError('{} not a column in the df'.format(col))
+            if df[col].hasnans:
+                raise ValueError('Missing values in {}'.format(col))
+
+    agg = grade_aggregates(df, ratings_col, defaults_col, PDs_col)
+    return _vasicek_from_aggregates(agg, rho, alpha, n_nodes)
+
+
+def _vasicek_from_aggregates(agg, rho, alpha=0.05, n_nodes=64):
+    """Correlated binomial test per rating from the output of
+    grade_aggregates"""
+    N = agg['N'].to_numpy()
+    D = agg['D'].to_numpy()
+    p_g = agg['sum_PD'].to_numpy()/N
+    cdf = _vasicek_cdf(D, N, p_g, rho, n_nodes)
+    conclusion = np.where((cdf <= alpha) | (1 - cdf <= alpha),
+                          'reject', 'fail to reject')
+    return pd.DataFrame({
+        'Number of Obs': agg['N'],
+        'Number of Defaults': agg['D'],
+        'Average PD': p_g,
+        'Vasicek Binomial Test': cdf,
+        'Conclusion': conclusion}, index=agg.index)
+
+
+def _vasicek_cdf(k, N, PDs, rho, n_nodes=64):
+    """P(D <= k) of pools of N loans under the one-factor model, for
+    arrays of pools"""
+    k = np.asarray(k, dtype=np.int64)
+    N = np.asarray(N, dtype=np.int64)
+    PDs = np.asarray(PDs, dtype=float)
+    weights = _quadrature(n_nodes)[1]
+    cdf = np.ones(len(k))
+    # A PD of 0 never defaults and one of 1 always does
+    cdf[(PDs >= 1) & (k < N)] = 0
+    below = (k < N) & (PDs > 0) & (PDs < 1)
+    scores = _beta_scores(k[below], N[below], n_nodes)
+    threshold = norm.ppf(PDs[below])[:, None]
+    cdf[below] = norm.cdf((np.sqrt(1 - rho)*scores - threshold) /
+                          np.sqrt(rho)) @ weights
+    cdf[k < 0] = 0
+    return cdf
+
+
+def _vasicek_quantile(N, PDs, rho, q, n_nodes=64):
+    """Smallest number of defaults k with P(D <= k) >= q, for arrays of
+    pools, searched from the large-pool quantile of all pools at once"""
+    N = np.asarray(N, dtype=np.int64)
+    PDs = np.asarray(PDs, dtype=float)
+    # The quantile lies a few defaults above the large-pool (Vasicek)
+    # quantile, by about as much as it did in the last run on the same PD
+    expected = N*_large_pool_rate(PDs, rho, q)
+    keys = [(float(PD), rho, q, n_nodes) for PD in PDs]
+    offset = np.array([_QUANTILE_OFFSETS.get(key, 0.5) for key in keys])
+    guess = np.clip(np.rint(expected + offset), 0, N).astype(np.int64)
+
+    # The guess is one end of the bracket [low, high]; the search gallops
+    # away from it in doubling steps until it crosses the quantile, then
+    # bisects
+    reached = _vasicek_cdf(guess, N, PDs, rho, n_nodes) >= q
+    low = np.where(reached, -1, guess)
+    high = np.where(reached, guess, N)
+    step = np.ones(len(N), dtype=np.int64)
+    gallop = np.ones(len(N), dtype=bool)
+    active = high - low > 1
+    while active.any():
+        probe = np.where(reached, high - step, low + step)
+        gallop &= (probe > low) & (probe < high)
+        probe = np.where(gallop, probe, (low + high)//2)
+        hit = np.zeros(len(N), dtype=bool)
+        hit[active] = _vasicek_cdf(probe[active], N[active], PDs[active],
+                                   rho, n_nodes) >= q
+        gallop &= hit == reached
+        high = np.where(active & hit, probe, high)
+        low = np.where(active & ~hit, probe, low)
+        step *= 2
+        active = high - low > 1
+
+    for key, value in zip(keys, high - expected):
+        _QUANTILE_OFFSETS[key] = value
+        _QUANTILE_OFFSETS.move_to_end(key)
+    while len(_QUANTILE_OFFSETS) > _QUANTILE_OFFSETS_SIZE:
+        _QUANTILE_OFFSETS.popitem(last=False)
+    return high
+
+
+def _large_pool_rate(PDs, rho, q):
+    """q quantile of the default rate of an infinitely large pool"""
+    return norm.cdf((norm.ppf(PDs) + np.sqrt(rho)*norm.ppf(q)) /
+                    np.sqrt(1 - rho))
+
+
+@lru_cache(maxsize=None)
+def _quadrature(n_nodes):
+    """Gauss-Hermite nodes and weights for the standard normal density"""
+    nodes, weights = np.polynomial.hermite_e.hermegauss(n_nodes)
+    return nodes, weights/np.sqrt(2*np.pi)
+
+
+# Distance of the default quantiles found from the large-pool quantiles,
+# per (PD, rho, q, n_nodes), least recently used first. It changes little
+# with the number of loans, so reruns on a master scale whose pool sizes
+# have changed start their search at the quantile.
+_QUANTILE_OFFSETS = OrderedDict()
+_QUANTILE_OFFSETS_SIZE = 2**16
+
+
+def _beta_scores(k, N, n_nodes):
+    """len(k) x n_nodes normal scores of Beta(k + 1, N - k) quantiles"""
+    u = norm.cdf(_quadrature(n_nodes)[0])
+    return norm.ppf(beta.ppf(u[None, :], k[:, None] + 1, (N - k)[:, None]))
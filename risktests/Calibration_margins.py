@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import beta, norm
+from risktests.Grade_aggregates import _factorize
+from risktests.Portfolio_handle import Portfolio
+
+
+def calibration_margins(df, ratings_col, defaults_col, PDs_col, alpha=0.05,
+                        n_grid=256):
+    """Smallest PD of every rating that passes the Jeffreys and binomial
+    tests, and smallest PD factor not rejected by the Spiegelhalter test
+
+    Parameters
+    ----------
+    df: array-like, at least 2D, or a Portfolio
+        data
+    ratings_col: string
+        name of column with ratings
+    defaults_col: string
+        name of column with default statuses (0/1)
+    PDs_col: string
+        name of column with probabilities-of-default values
+    alpha: float
+        level of significance
+    n_grid: integer
+        number of scaling factors on which the Spiegelhalter margin is
+        bracketed
+
+
+    Returns
+    -------
+    results: array-like, 2D
+        per rating the number of loans and defaults and the average 'PD';
+        the smallest passing average PD of the Jeffreys and binomial tests
+        and the largest of the binomial test, each also as a factor on the
+        current PD; and the smallest factor on the loan PDs at which the
+        Spiegelhalter test does not reject calibration
+
+
+    Notes
+    -----
+    The Jeffreys test passes when the PD is not below the alpha quantile
+    of Beta(d + 1/2, n - d + 1/2), which is its smallest passing PD. The
+    binomial test of binomial_test passes when alpha < P(D <= d) < 1 -
+    alpha; since P(D <= d) = 1 - I_p(d + 1, n - d), the regularized
+    incomplete Beta function, the passing PDs lie between the alpha and
+    1 - alpha quantiles of Beta(d + 1, n - d). Both are a single beta.ppf
+    call over all ratings. A rating whose loans all defaulted never passes
+    the binomial test and gets NaN.
+
+    The Spiegelhalter z-score of PDs scaled by c,
+
+        z(c) = (D - c*(2*sum(d*p) + S1) + 2*c^2*S2) /
+               sqrt(c*S1 - 5*c^2*S2 + 8*c^3*S3 - 4*c^4*S4)
+
+    with Sk the sum of p^k over the loans of the rating, depends on the
+    loans only through these sums. The margin is the smallest factor at
+    which calibration is not rejected, |z| at most the 1 - alpha normal
+    quantile, i.e. the p-value norm.sf(|z|) of Speigelhalter_Normal_test
+    is at least alpha. Note that Speigelhalter_Normal_test labels
+    p < 0.05 'Pass', so just above this factor it reports 'Fail'.
+
+    z(c) is evaluated for all ratings on a geometric grid of factors up
+    to the one taking the largest PD to 1; the first grid point that is
+    not rejected brackets the margin, which is then refined by bisection
+    of all ratings at once, halving towards 0 when the first grid point
+    is already not rejected. A rating without defaults is not rejected
+    however far its PDs are scaled down, since z(c) tends to 0, and gets
+    0. Ratings that are rejected everywhere on the grid get NaN.
+
+
+    Examples
+    --------
+    >>res = calibration_margins(
+        df=df,
+        ratings_col='ratings',
+        defaults_col='default_flag',
+        PDs_col='prob_default',
+        alpha=0.05)
+    >>print(res[['PD', 'Jeffreys min PD', 'Binomial min PD']])
+    """
+    if not isinstance(alpha, float) or not 0 < alpha < 0.5:
+        raise TypeError('alpha should be a float value between 0 and 0.5')
+    if not isinstance(n_grid, int) or n_grid < 2:
+        raise TypeError('n_grid should be an integer of at least 2')
+    if isinstance(df, Portfolio):
+        codes, levels = df.codes(ratings_col)
+        defaults = df.defaults(defaults_col)
+        PDs = df.values(PDs_col)
+    else:
+        if df.empty:
+            raise TypeError('No data provided!')
+        for arg, col in [('ratings_col', ratings_col),
+                         ('defaults_col', defaults_col), ('PDs_col', PDs_col)]:
+            # Checking that the correct datatype
+            if not isinstance(col, str):
+                raise TypeError('{} not of type string'.format(arg))
+            # Check if the correct column names have been provided and the
+            # data for missing values
+            if col not in df.columns:
+                raise ValueError('{} not a column in the df'.format(col))
+            if df[col].hasnans:
+                raise ValueError('Missing values in {}'.format(col))
+        codes, levels = _factorize(df[ratings_col])
+        defaults = df[defaults_col].to_numpy(dtype=float)
+        PDs = df[PDs_col].to_numpy(dtype=float)
+
+    K = len(levels)
+    n = np.bincount(codes, minlength=K)
+    d = np.bincount(codes, weights=defaults, minlength=K)
+    S = [np.bincount(codes, weights=PDs**k, minlength=K) for k in (1, 2, 3, 4)]
+    DP = np.bincount(codes, weights=defaults*PDs, minlength=K)
+    max_PD = np.zeros(K)
+    np.maximum.at(max_PD, codes, PDs)
+    PD = S[0]/n
+
+    jeffreys = beta.ppf(alpha, d + 0.5, n - d + 0.5)
+    with np.errstate(invalid='ignore'):
+        binomial = beta.ppf([[alpha], [1 - alpha]], d + 1, n - d)
+    spiegelhalter = _spiegelhalter_margin(d, DP, S, max_PD, alpha, n_grid)
+
+    return pd.DataFrame({
+        'N': n,
+        'D': d,
+        'PD': PD,
+        'Jeffreys min PD': jeffreys,
+        'Jeffreys factor': jeffreys/PD,
+        'Binomial min PD': binomial[0],
+        'Binomial max PD': binomial[1],
+        'Binomial factor': binomial[0]/PD,
+        'Spiegelhalter non-rejection factor': spiegelhalter},
+        index=pd.Index(levels, name='Rating'))
+
+
+def _spiegelhalter_z(c, D, DP, S):
+    """Spiegelhalter z-score of every rating (rows) with its PDs scaled by
+    each factor c (columns)"""
+    S1, S2, S3, S4 = (s[:, None] for s in S)
+    numerator = D[:, None] - c*(2*DP[:, None] + S1) + 2*c**2*S2
+    variance = c*S1 - 5*c**2*S2 + 8*c**3*S3 - 4*c**4*S4
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return numerator/np.sqrt(variance)
+
+
+def _spiegelhalter_margin(D, DP, S, max_PD, alpha, n_grid, n_bisect=60):
+    """Smallest factor on the PDs of every rating with |z| at most the
+    1 - alpha normal quantile, bracketed on a grid and bisected"""
+    critical = norm.isf(alpha)
+    upper = np.where(max_PD > 0, 1/np.where(max_PD > 0, max_PD, 1), np.nan)
+    grid = np.geomspace(1e-3, 1, n_grid)[None, :]*upper[:, None]
+    accepted = np.abs(_spiegelhalter_z(grid, D, DP, S)) <= critical
+    found = accepted.any(axis=1)
+    first = accepted.argmax(axis=1)
+    rows = np.arange(len(D))
+    high = grid[rows, first]
+    # Below the grid the margin is bracketed from 0
+    low = np.where(first > 0, grid[rows, np.maximum(first - 1, 0)], 0)
+    for _ in range(n_bisect):
+        mid = np.where(low > 0, np.sqrt(low*high), high/2)
+        ok = np.abs(_spiegelhalter_z(mid[:, None], D, DP, S)[:, 0]) <= \
+            critical
+        high = np.where(ok, mid, high)
+        low = np.where(ok, low, mid)
+    high = np.where(D == 0, 0, high)
+    return np.where(found, high, np.nan)
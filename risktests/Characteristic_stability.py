@@ -0,0 +1,333 @@
+import numpy as np
+import pandas as pd
+
+
+def CSI(baseline, current, cols=None, n_bins=10, epsilon=0.0001):
+    """Characteristic stability index of many variables at once
+
+    Parameters
+    ----------
+    baseline: array-like, at least 2D
+        development (baseline) sample
+    current: array-like, at least 2D
+        current sample
+    cols: list of strings, optional
+        names of the variables to compare; all columns of baseline if None
+    n_bins: integer
+        number of baseline quantile bins of the continuous variables
+    epsilon: float
+        floor of the bin proportions, so empty bins add a finite amount
+
+
+    Returns
+    -------
+    summary: array-like, 2D
+        per variable the 'CSI', the number of 'Bins' and the number of
+        'Empty bins', i.e. bins empty in exactly one of the samples
+    bins: array-like, 2D
+        per variable and bin the counts and proportions of both samples and
+        the bin's contribution to the index
+
+
+    Notes
+    -----
+    Numerical variables with more than n_bins distinct values are cut at
+    the baseline quantiles, with the outer bins open-ended so current
+    values outside the baseline range are counted. Other variables keep
+    one bin per baseline value, plus an 'Other' bin for values not seen in
+    the baseline. Missing values get a 'Missing' bin. Bins empty in both
+    samples are left out.
+
+    Every variable is coded to integer bins once and counted with
+    np.bincount, and the index of all variables and bins is evaluated in
+    one vectorized pass,
+
+        CSI = sum((p - q)*ln(p/q))
+
+    with p and q the baseline and current bin proportions floored at
+    epsilon. The index is on the scale of proportions (0.1 and 0.25 are the
+    usual warning and action levels); PSI reports the same quantity in
+    percentage points, i.e. 100 times larger.
+
+
+    References
+    ----------
+    [1] Siddiqi, N. (2006). Credit Risk Scorecards: Developing and
+    Implementing Intelligent Credit Scoring. Wiley.
+
+
+    Examples
+    --------
+    >>summary, bins = CSI(baseline=dev_df, current=month_df, n_bins=10)
+    >>print(summary.sort_values('CSI', ascending=False).head(20))
+    """
+    if baseline.empty or current.empty:
+        raise TypeError('No data provided!')
+    if cols is None:
+        cols = list(baseline.columns)
+    for col in cols:
+        # Checking that the correct datatype
+        if not isinstance(col, str):
+            raise TypeError('cols not of type string')
+        # Check if the correct column names have been provided
+        if col not in baseline.columns:
+            raise ValueError('{} not a column in the baseline'.format(col))
+        if col not in current.columns:
+            raise ValueError('{} not a column in the current df'.format(col))
+    if not isinstance(n_bins, int) or n_bins < 2:
+        raise TypeError('n_bins should be an integer of at least 2')
+    if not isinstance(epsilon, float):
+        raise TypeError('epsilon should be a float value')
+
+    specs = _fit_bins(baseline, cols, n_bins)
+    return _stability(cols, specs, _histogram(baseline, cols, specs),
+                      _histogram(current, cols, specs), epsilon)
+
+
+class BaselineHistograms:
+    """Baseline bins and counts of many variables, kept on disk so new
+    samples are compared to the baseline without the baseline data
+
+    Parameters
+    ----------
+    baseline: array-like, at least 2D
+        development (baseline) sample
+    cols: list of strings, optional
+        names of the variables to monitor; all columns of baseline if None
+    n_bins: integer
+        number of baseline quantile bins of the continuous variables
+
+
+    Notes
+    -----
+    The variables are binned as in CSI and only the bins (quantile edges
+    or levels) and their baseline counts are kept, a few numbers per
+    variable. save writes them, with the histograms of the months added
+    so far, to one compressed .npz file that load reads back without
+    pickling; levels other than numbers, booleans and dates are stored as
+    strings, and month labels always are.
+
+    csi and add_month scan only the new sample. csi_by_month then compares
+    every stored month with the baseline, or with the pooled histogram of
+    the previous k months, from the stored counts alone.
+
+
+    Examples
+    --------
+    >>hist = BaselineHistograms(baseline=dev_df, n_bins=10)
+    >>hist.save('baseline.npz')
+    >>hist = BaselineHistograms.load('baseline.npz')
+    >>summary, bins = hist.csi(month_df)
+    >>hist.add_month('2024-01', month_df)
+    >>print(hist.csi_by_month(k=3))
+    """
+
+    def __init__(self, baseline, cols=None, n_bins=10):
+        if baseline.empty:
+            raise TypeError('No data provided!')
+        if cols is None:
+            cols = list(baseline.columns)
+        _check_cols(baseline, cols)
+        if not isinstance(n_bins, int) or n_bins < 2:
+            raise TypeError('n_bins should be an integer of at least 2')
+        self.cols = list(cols)
+        self._specs = _fit_bins(baseline, self.cols, n_bins)
+        self._baseline = _histogram(baseline, self.cols, self._specs)
+        self.months = []
+        self._month_counts = []
+
+    def histogram(self, df):
+        """Counts of a sample in the baseline bins, one after the other"""
+        if df.empty:
+            raise TypeError('No data provided!')
+        _check_cols(df, self.cols)
+        return _histogram(df, self.cols, self._specs)
+
+    def csi(self, current, epsilon=0.0001):
+        """CSI of a sample against the baseline, as returned by CSI"""
+        return _stability(self.cols, self._specs, self._baseline,
+                          self.histogram(current), epsilon)
+
+    def add_month(self, month, df):
+        """Store the histogram of a month; months are added in order"""
+        if month in self.months:
+            raise ValueError('{} already added'.format(month))
+        self._month_counts.append(self.histogram(df))
+        self.months.append(month)
+
+    def csi_by_month(self, k=None, epsilon=0.0001):
+        """CSI of every stored month (rows) and variable (columns) against
+        the baseline, or if k is given against the previous k months
+        pooled; the first k months have no reference and are left out"""
+        if not self.months:
+            raise ValueError('No months added')
+        sizes = [_n_bins(spec) for spec in self._specs]
+        counts = np.stack(self._month_counts)
+        months = self.months
+        if k is None:
+            reference = np.broadcast_to(self._baseline, counts.shape)
+        else:
+            if not isinstance(k, int) or k < 1:
+                raise TypeError('k should be a positive integer')
+            # Pooled counts of months m-k..m-1 from the running totals
+            totals = np.cumsum(np.vstack([np.zeros_like(counts[:1]), counts]),
+                               axis=0)
+            reference = totals[k:-1] - totals[:-k - 1]
+            counts, months = counts[k:], months[k:]
+        contribution = _contributions(sizes, reference, counts, epsilon)[2]
+        starts = np.r_[0, np.cumsum(sizes)[:-1]]
+        return pd.DataFrame(
+            np.add.reduceat(contribution, starts, axis=-1),
+            index=pd.Index(months, name='Month'),
+            columns=pd.Index(self.cols, name='Variable'))
+
+    def save(self, path):
+        """Write the bins and histograms to a compressed .npz file"""
+        arrays = {'cols': np.asarray(self.cols, dtype=str),
+                  'kinds': np.asarray([kind for kind, _ in self._specs],
+                                      dtype=str),
+                  'baseline': self._baseline,
+                  'months': np.asarray(self.months, dtype=str),
+                  'month_counts': np.asarray(self._month_counts,
+                                             dtype=np.int64).reshape(
+                                                 len(self.months),
+                                                 len(self._baseline))}
+        for i, (kind, bins) in enumerate(self._specs):
+            bins = np.asarray(bins)
+            if bins.dtype == object:
+                bins = bins.astype(str)
+            arrays['bins_{}'.format(i)] = bins
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Read the bins and histograms written by save"""
+        self = cls.__new__(cls)
+        with np.load(path, allow_pickle=False) as data:
+            self.cols = list(data['cols'])
+            self._specs = [
+                (kind, data['bins_{}'.format(i)] if kind == 'edges' else
+                 pd.Index(data['bins_{}'.format(i)]))
+                for i, kind in enumerate(data['kinds'])]
+            self._baseline = data['baseline']
+            self.months = list(data['months'])
+            self._month_counts = list(data['month_counts'])
+        return self
+
+
+def _check_cols(df, cols):
+    for col in cols:
+        # Checking that the correct datatype
+        if not isinstance(col, str):
+            raise TypeError('cols not of type string')
+        # Check if the correct column names have been provided
+        if col not in df.columns:
+            raise ValueError('{} not a column in the df'.format(col))
+
+
+def _fit_bins(df, cols, n_bins):
+    """Bin specification of each variable: the interior quantile edges of
+    a continuous variable, or the sorted levels of a discrete one"""
+    numeric = [col for col in cols
+               if pd.api.types.is_numeric_dtype(df[col]) and
+               not pd.api.types.is_bool_dtype(df[col])]
+    edges = {}
+    if numeric:
+        # One sort of all numerical variables gives both their numbers of
+        # distinct values and their quantiles; missing values sort last
+        X = np.sort(df[numeric].to_numpy(dtype=float), axis=0)
+        valid = (~np.isnan(X)).sum(axis=0)
+        distinct = (valid > 0) + ((np.diff(X, axis=0) != 0) &
+                                  ~np.isnan(X[1:])).sum(axis=0)
+        # Linear interpolation between order statistics, as np.quantile
+        position = np.linspace(0, 1, n_bins + 1)[1:-1, None] * \
+            np.maximum(valid - 1, 0)
+        lower = np.floor(position).astype(int)
+        upper = np.ceil(position).astype(int)
+        low = np.take_along_axis(X, lower, axis=0)
+        q = low + (position - lower)*(np.take_along_axis(X, upper, axis=0) -
+                                      low)
+        edges = {col: np.unique(q[:, i]) for i, col in enumerate(numeric)
+                 if distinct[i] > n_bins}
+    return [('edges', edges[col]) if col in edges else
+            ('levels', pd.Index(df[col].dropna().unique()).sort_values())
+            for col in cols]
+
+
+def _bin_codes(values, spec):
+    """Integer bin of every value; missing values take the last bin"""
+    kind, bins = spec
+    missing = values.isna().to_numpy()
+    if kind == 'edges':
+        codes = np.searchsorted(bins, values.to_numpy(dtype=float),
+                                side='right')
+        return np.where(missing, len(bins) + 1, codes)
+    codes = bins.get_indexer(values)
+    # Values not seen in the baseline fall in the 'Other' bin
+    codes = np.where(codes < 0, len(bins), codes)
+    return np.where(missing, len(bins) + 1, codes)
+
+
+def _bin_counts(values, spec):
+    """Number of values per bin"""
+    return np.bincount(_bin_codes(values, spec), minlength=_n_bins(spec))
+
+
+def _histogram(df, cols, specs):
+    """Bin counts of all variables, one after the other"""
+    return np.concatenate([_bin_counts(df[col], spec)
+                           for col, spec in zip(cols, specs)])
+
+
+def _n_bins(spec):
+    kind, bins = spec
+    return len(bins) + 2
+
+
+def _bin_labels(spec):
+    kind, bins = spec
+    if kind == 'edges':
+        labels = list(pd.IntervalIndex.from_breaks(
+            np.r_[-np.inf, bins, np.inf], closed='left'))
+        return labels + ['Missing']
+    return list(bins) + ['Other', 'Missing']
+
+
+def _stability(cols, specs, base, curr, epsilon):
+    """CSI per variable and per bin from the concatenated bin counts of
+    both samples"""
+    sizes = [_n_bins(spec) for spec in specs]
+    variable = np.repeat(np.arange(len(cols)), sizes)
+    p, q, contribution = _contributions(sizes, base, curr, epsilon)
+
+    kept = (base > 0) | (curr > 0)
+    empty = kept & ((base == 0) | (curr == 0))
+    summary = pd.DataFrame({
+        'CSI': np.bincount(variable, weights=contribution,
+                           minlength=len(cols)),
+        'Bins': np.bincount(variable[kept], minlength=len(cols)),
+        'Empty bins': np.bincount(variable[empty], minlength=len(cols))},
+        index=pd.Index(cols, name='Variable'))
+    labels = [label for spec in specs for label in _bin_labels(spec)]
+    index = pd.MultiIndex.from_arrays(
+        [np.asarray(cols, dtype=object)[variable],
+         pd.Index(labels, dtype=object)], names=['Variable', 'Bin'])
+    bins = pd.DataFrame({'Baseline N': base.astype(int),
+                         'Current N': curr.astype(int),
+                         'Baseline %': p,
+                         'Current %': q,
+                         'CSI': contribution}, index=index)[kept]
+    return summary, bins
+
+
+def _contributions(sizes, base, curr, epsilon):
+    """Bin proportions and CSI contributions of count arrays whose last
+    axis holds the bins of all variables one after the other"""
+    starts = np.r_[0, np.cumsum(sizes)[:-1]]
+    base = np.asarray(base, dtype=float)
+    curr = np.asarray(curr, dtype=float)
+    p = base/np.repeat(np.add.reduceat(base, starts, axis=-1), sizes, axis=-1)
+    q = curr/np.repeat(np.add.reduceat(curr, starts, axis=-1), sizes, axis=-1)
+    p_floor = np.maximum(p, epsilon)
+    q_floor = np.maximum(q, epsilon)
+    return p, q, (p_floor - q_floor)*np.log(p_floor/q_floor)
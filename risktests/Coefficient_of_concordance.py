@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 from scipy.stats import rankdata
+from risktests.Grade_aggregates import grade_aggregates
+from risktests.Portfolio_handle import Portfolio
 
 
 def Coefficient_of_concordance(df, defaults_col, PDs_col, ratings_col):
@@ -47,6 +49,9 @@ def Coefficient_of_concordance(df, defaults_col, PDs_col, ratings_col):
         ratings_col = 'ratings')
     >>print(res)
     """
+    if isinstance(df, Portfolio):
+        return _concordance_from_aggregates(
+            df.grade_aggregates(ratings_col, defaults_col, PDs_col))
     if df.empty:
         raise TypeError('No data provided!')
     if defaults_col is None:
@@ -80,13 +85,14 @@ def Coefficient_of_concordance(df, defaults_col, PDs_col, ratings_col):
     if df[PDs_col].hasnans:
         raise ValueError('Missing values in {}'.format(PDs_col))
 
-    ratings = df[ratings_col]
-    X = []
-    Y = []
-    for rating in set(ratings):
-        temp = df[df[ratings_col] == rating]
-        X.append(temp[defaults_col].sum())
-        Y.append(temp[PDs_col].mean())
+    agg = grade_aggregates(df, ratings_col, defaults_col, PDs_col)
+    return _concordance_from_aggregates(agg)
+
+
+def _concordance_from_aggregates(agg):
+    """Coefficient of concordance from the output of grade_aggregates"""
+    X = agg['D'].to_numpy()
+    Y = (agg['sum_PD']/agg['N']).to_numpy()
     ranked_X = len(X) - rankdata(X, method='max') + 1
     ranked_Y = len(Y) - rankdata(Y, method='max') + 1
     expt_ratings = pd.DataFrame([(a, b) for a, b in zip(ranked_X, ranked_Y)])
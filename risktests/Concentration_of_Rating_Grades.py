@@ -1,5 +1,6 @@
 import numpy as np
-import pandas as pd
+from risktests.Grade_aggregates import contingency_table
+from risktests.Portfolio_handle import Portfolio
 from scipy.stats import norm
 
 
@@ -40,6 +41,9 @@ def ratings_concentration(df, initial_ratings_col, final_ratings_col):
         >>print(res)
         """
 
+    if isinstance(df, Portfolio):
+        return _concentration_from_contingency(
+            df.contingency_table(initial_ratings_col, final_ratings_col))
     if df.empty:
         raise TypeError('No data provided!')
     if initial_ratings_col is None:
@@ -65,14 +69,18 @@ def ratings_concentration(df, initial_ratings_col, final_ratings_col):
     if df[final_ratings_col].hasnans:
         raise ValueError('Missing values in{}'.format(final_ratings_col))
 
-    a = df[initial_ratings_col]
-    b = df[final_ratings_col]
-    N_init = pd.crosstab(a, a)
-    N_curr = pd.crosstab(b, b)
-    K = len(set(a))
+    N_ij = contingency_table(df, initial_ratings_col, final_ratings_col)
+    return _concentration_from_contingency(N_ij)
 
-    R_init = list(N_init.sum(axis=1)/N_init.sum(axis=1).sum())
-    R_curr = list(N_curr.sum()/N_curr.sum().sum())
+
+def _concentration_from_contingency(N_ij):
+    """Herfindahl indices and p-value from a transition count table"""
+    N_init = N_ij.sum(axis=1)
+    N_curr = N_ij.sum(axis=0)
+    K = len(N_init)
+
+    R_init = list(N_init/N_init.sum())
+    R_curr = list(N_curr/N_curr.sum())
 
     CV_init = CV_curr = 0
     for i in range(1, K+1):
@@ -86,4 +94,4 @@ def ratings_concentration(df, initial_ratings_col, final_ratings_col):
     HI_curr = 1 + np.log((CV_curr**2+1)/K)/np.log(K)
 
     p_value = 1 - norm.cdf(np.sqrt(K-1)*(CV_curr-CV_init)/np.sqrt(CV_curr**2*(0.5 + CV_curr**2)))
-    return HI_curr, HI_init, p_value, sum(list(N_curr.sum(axis=1)))
+    return HI_curr, HI_init, p_value, N_curr.sum()
@@ -1,4 +1,7 @@
+import numpy as np
 import pandas as pd
+from risktests.Grade_aggregates import contingency_table
+from risktests.Portfolio_handle import Portfolio
 
 
 def migration_matrix_statistics(df, initial_ratings_col, final_ratings_col):
@@ -30,6 +33,9 @@ def migration_matrix_statistics(df, initial_ratings_col, final_ratings_col):
         final_ratings_col='ratings2')
     >>print(res)
     """
+    if isinstance(df, Portfolio):
+        return _mwb_from_contingency(
+            df.contingency_table(initial_ratings_col, final_ratings_col))
     if df.empty:
         raise TypeError('No data provided!')
     if initial_ratings_col is None:
@@ -55,28 +61,129 @@ def migration_matrix_statistics(df, initial_ratings_col, final_ratings_col):
     if df[final_ratings_col].hasnans:
         raise ValueError('Missing values in{}'.format(final_ratings_col))
 
-    a = df[initial_ratings_col]
-    b = df[final_ratings_col]
-    N_ij = pd.crosstab(a, b)
-    p_ij = pd.crosstab(a, b, normalize='index')
-    K = len(set(a))
-    mnormu = mnorml = upper_mwb = lower_mwb = 0
-    for i in range(1, K):
-        c = p_ij.iloc[i-1, i:].sum()
-        b = N_ij.sum(axis=1).values[i-1]
-        a = max(i-K, i-1)
-        mnormu += a*b*c
-    for i in range(2, K+1):
-        c = p_ij.iloc[i-1, 0:i-1].sum()
-        b = N_ij.sum(axis=1).values[i-1]
-        a = max(i-K, i-1)
-        mnorml += a*b*c
-    for i in range(1, K-1+1):
-        for j in range(i+1, K+1):
-            upper_mwb += abs(i-j)*N_ij.sum(axis=1).values[i-1]*p_ij.iloc[i-1, j-1]
-    upper_mwb = (1/mnormu)*upper_mwb
-    for i in range(2, K+1):
-        for j in range(1, i-1+1):
-            lower_mwb += abs(i-j)*N_ij.sum(axis=1).values[i-1]*p_ij.iloc[i-1, j-1]
-    lower_mwb = (1/mnorml)*lower_mwb
+    N_ij = contingency_table(df, initial_ratings_col, final_ratings_col)
+    return _mwb_from_contingency(N_ij)
+
+
+def migration_matrix_statistics_by_cohort(df, cohort_pairs):
+    """Upper and lower matrix weighted bandwidth of many cohorts at once
+
+    Parameters
+    ----------
+    df: array-like, at least 2D
+        data with one ratings column per snapshot
+    cohort_pairs: list of tuples of strings
+        (initial ratings column, final ratings column) of each cohort
+
+
+    Returns
+    -------
+    results: array-like, 2D
+        'Upper MWB' and 'Lower MWB' per cohort, indexed by the initial and
+        final ratings columns
+
+
+    Notes
+    -----
+    The ratings of all columns are coded once on their common, sorted
+    rating scale, so grades that are missing from a snapshot keep their
+    position. The transition counts of every cohort are stacked and the
+    bandwidths of all of them are computed together with |i - j| distance
+    weights and triangular masks, see migration_matrix_statistics_from_counts.
+
+
+    Examples
+    --------
+    >>months = ['rating_2015_01', 'rating_2015_02', ..., 'rating_2024_12']
+    >>pairs = [(months[t], months[t + 12]) for t in range(len(months) - 12)]
+    >>res = migration_matrix_statistics_by_cohort(df=df, cohort_pairs=pairs)
+    >>print(res)
+    """
+    if df.empty:
+        raise TypeError('No data provided!')
+    if cohort_pairs is None or len(cohort_pairs) == 0:
+        raise TypeError('No cohorts provided')
+
+    cols = []
+    for pair in cohort_pairs:
+        if len(pair) != 2:
+            raise TypeError('cohort_pairs should hold (initial, final) pairs')
+        for col in pair:
+            # Checking that the correct datatype
+            if not isinstance(col, str):
+                raise TypeError('cohort_pairs not of type string')
+            # Check if the correct column names have been provided
+            if col not in df.columns:
+                raise ValueError('{} not in the df'.format(col))
+            # Check the data for missing values
+            if df[col].hasnans:
+                raise ValueError('Missing values in{}'.format(col))
+            if col not in cols:
+                cols.append(col)
+
+    codes, levels = pd.factorize(
+        np.concatenate([df[col].to_numpy() for col in cols]), sort=True)
+    codes = dict(zip(cols, codes.reshape(len(cols), len(df))))
+    K = len(levels)
+    N_ij = np.stack([
+        np.bincount(codes[a]*K + codes[b], minlength=K*K).reshape(K, K)
+        for a, b in cohort_pairs])
+    upper_mwb, lower_mwb = _mwb(N_ij)
+    return pd.DataFrame({'Upper MWB': upper_mwb, 'Lower MWB': lower_mwb},
+                        index=pd.MultiIndex.from_tuples(
+                            [tuple(pair) for pair in cohort_pairs],
+                            names=['Initial', 'Final']))
+
+
+def migration_matrix_statistics_from_counts(N_ij):
+    """Upper and lower matrix weighted bandwidth of one or many transition
+    count matrices
+
+    Parameters
+    ----------
+    N_ij: array-like, 2D or 3D
+        transition counts with initial ratings as rows and final ratings as
+        columns, or a cohorts x K x K stack of such counts
+
+
+    Returns
+    -------
+    upper_mwb: float or array-like, 1D
+        upper matrix weighted bandwidth, one per cohort for a stack
+    lower_mwb: float or array-like, 1D
+        lower matrix weighted bandwidth, one per cohort for a stack
+
+
+    Examples
+    --------
+    >>upper_mwb, lower_mwb = migration_matrix_statistics_from_counts(N)
+    """
+    N_ij = np.asarray(N_ij, dtype=float)
+    if N_ij.ndim not in (2, 3):
+        raise ValueError('N_ij should be a K x K or cohorts x K x K array')
+    return _mwb(N_ij)
+
+
+def _mwb_from_contingency(N_ij):
+    """Upper and lower matrix weighted bandwidth from a transition count
+    table"""
+    return _mwb(N_ij.to_numpy(dtype=float))
+
+
+def _mwb(N_ij):
+    """Upper and lower matrix weighted bandwidth of a (..., K, K) array of
+    transition counts"""
+    K = N_ij.shape[-1]
+    i, j = np.indices((K, K)) + 1
+    upper = j > i
+    lower = j < i
+    # Normalising weight of row i, and the distance weights |i - j|
+    a = np.maximum(i - K, i - 1)
+    distance = np.abs(i - j)
+    # N_i * p_ij is the count N_ij
+    mnormu = (N_ij*(a*upper)).sum(axis=(-2, -1))
+    mnorml = (N_ij*(a*lower)).sum(axis=(-2, -1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        upper_mwb = (N_ij*(distance*upper)).sum(axis=(-2, -1))/mnormu
+        lower_mwb = (N_ij*(distance*lower)).sum(axis=(-2, -1))/mnorml
     return upper_mwb, lower_mwb
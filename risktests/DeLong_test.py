@@ -0,0 +1,143 @@
+from itertools import combinations
+import numpy as np
+import pandas as pd
+from scipy.stats import norm, rankdata
+from risktests.Portfolio_handle import Portfolio
+
+
+def delong_test(df, score_cols, defaults_col, alpha=0.05):
+    """DeLong test for the difference of correlated AUCs of rating models
+
+    Parameters
+    ----------
+    df: array-like, at least 2D
+        data
+    score_cols: list of strings
+        names of at least two columns with scores of the same obligors,
+        each increasing with risk (e.g. PDs of the champion and challenger)
+    defaults_col: string
+        name of column with default statuses (0/1)
+    alpha: float
+        level of significance
+
+
+    Returns
+    -------
+    aucs: array-like, 2D
+        AUC, standard error and 1 - alpha confidence interval per score
+    comparisons: array-like, 2D
+        for each pair of scores the AUC difference, its standard error,
+        z-score, two-sided p-value and test conclusion
+
+
+    Notes
+    -----
+    The covariance of the AUCs is the DeLong et al. (1988) estimator,
+    computed with the midrank algorithm of Sun & Xu (2014): the structural
+    components of every loan follow from the midranks of the scores among
+    the defaulters, the non-defaulters and all loans, so the cost is
+    O(n log n) per score instead of O(n^2) pairwise placements.
+    The null hypothesis is that the two AUCs are equal.
+
+
+    References
+    ----------
+    [1] DeLong, E. R., DeLong, D. M., & Clarke-Pearson, D. L. (1988).
+    Comparing the areas under two or more correlated receiver operating
+    characteristic curves: a nonparametric approach. Biometrics, 44(3),
+    837-845.
+    [2] Sun, X., & Xu, W. (2014). Fast implementation of DeLong's algorithm
+    for comparing the areas under correlated receiver operating
+    characteristic curves. IEEE Signal Processing Letters, 21(11),
+    1389-1393.
+
+
+    Examples
+    --------
+    >>aucs, comparisons = delong_test(
+        df=df,
+        score_cols=['PD_champion', 'PD_challenger'],
+        defaults_col='default_flag')
+    >>print(comparisons)
+    """
+    if not isinstance(alpha, float):
+        raise TypeError('alpha should be a float value')
+    if isinstance(df, Portfolio):
+        defaulted = df.defaults(defaults_col) == 1
+        columns = [df.values(col) for col in score_cols]
+    else:
+        if df.empty:
+            raise TypeError('No data provided!')
+        if score_cols is None:
+            raise TypeError('No column names for scores provided')
+        if defaults_col is None:
+            raise TypeError('No column name for defaults provided')
+
+        # Checking that the correct datatype
+        if isinstance(score_cols, str) or len(score_cols) < 2:
+            raise TypeError(
+                'score_cols should be a list of at least two names')
+        for col in score_cols:
+            if not isinstance(col, str):
+                raise TypeError('score_cols not of type string')
+        if not isinstance(defaults_col, str):
+            raise TypeError('defaults_col not of type string')
+
+        # Check if the correct column names have been provided
+        for col in list(score_cols) + [defaults_col]:
+            if col not in df.columns:
+                raise ValueError('{} not a column in the df'.format(col))
+
+        # Check the data for missing values
+        for col in list(score_cols) + [defaults_col]:
+            if df[col].hasnans:
+                raise ValueError('Missing values in {}'.format(col))
+
+        defaulted = df[defaults_col].to_numpy() == 1
+        columns = [df[col].to_numpy(dtype=float) for col in score_cols]
+
+    # Defaulters first, one row per score
+    scores = np.vstack([np.concatenate([x[defaulted], x[~defaulted]])
+                        for x in columns])
+    auc, cov = _delong_covariance(scores, defaulted.sum())
+
+    se = np.sqrt(np.diag(cov))
+    z = norm.ppf(1 - alpha/2)
+    aucs = pd.DataFrame({'AUC': auc,
+                         'SE': se,
+                         'Lower': auc - z*se,
+                         'Upper': auc + z*se},
+                        index=pd.Index(score_cols, name='Score'))
+
+    pairs = list(combinations(range(len(score_cols)), 2))
+    i, j = np.array(pairs).T
+    diff = auc[i] - auc[j]
+    diff_se = np.sqrt(cov[i, i] + cov[j, j] - 2*cov[i, j])
+    z_score = diff/diff_se
+    p_value = 2*norm.sf(np.abs(z_score))
+    comparisons = pd.DataFrame({
+        'Difference': diff,
+        'SE': diff_se,
+        'z-score': z_score,
+        'P-Value': p_value,
+        'Conclusion': np.where(p_value <= alpha, 'reject', 'fail to reject')},
+        index=pd.MultiIndex.from_tuples(
+            [(score_cols[a], score_cols[b]) for a, b in pairs],
+            names=['Score 1', 'Score 2']))
+    return aucs, comparisons
+
+
+def _delong_covariance(scores, m):
+    """AUCs and their DeLong covariance matrix for a (models x loans) array
+    of scores whose first m columns are the defaulters"""
+    n = scores.shape[1] - m
+    if m == 0 or n == 0:
+        raise ValueError('Both defaulters and non-defaulters are required')
+    tx = rankdata(scores[:, :m], axis=1)
+    ty = rankdata(scores[:, m:], axis=1)
+    tz = rankdata(scores, axis=1)
+    auc = (tz[:, :m].sum(axis=1) - m*(m + 1)/2)/(m*n)
+    v10 = (tz[:, :m] - tx)/n
+    v01 = 1 - (tz[:, m:] - ty)/m
+    cov = np.atleast_2d(np.cov(v10))/m + np.atleast_2d(np.cov(v01))/n
+    return auc, cov
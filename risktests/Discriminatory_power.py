@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+from risktests.Grade_aggregates import _level_counts
+from risktests.Portfolio_handle import Portfolio
+
+
+def discriminatory_power(df, score_col, defaults_col, n_points=101):
+    """AUC, accuracy ratio and the CAP and ROC curves of a risk score
+
+    Parameters
+    ----------
+    df: array-like, at least 2D
+        data
+    score_col: string
+        name of column with a score that increases with risk, e.g. PDs
+    defaults_col: string
+        name of column with default statuses (0/1)
+    n_points: integer
+        number of points of the returned curves
+
+
+    Returns
+    -------
+    auc: float
+        area under the ROC curve
+    ar: float
+        accuracy ratio (Gini), 2*auc - 1
+    curve: array-like, 2D
+        n_points rows with the grid 'x' from 0 to 1, 'CAP' the share of
+        defaults among the riskiest x share of the population and 'ROC'
+        the share of defaults at a false positive rate of x
+
+
+    Notes
+    -----
+    The scores are sorted once and reduced to defaulter and non-defaulter
+    counts per distinct score, from which the AUC (ties counted as one
+    half) and both curves follow by cumulative sums. The curves are linear
+    within a tied score, so interpolating them on the grid is exact.
+
+
+    References
+    ----------
+    [1] BIS. (2005). Studies on the Validation of Internal Rating Systems
+    (revised). https://www.bis.org/publ/bcbs_wp14.htm
+
+
+    Examples
+    --------
+    >>auc, ar, curve = discriminatory_power(
+        df=df,
+        score_col='prob_default',
+        defaults_col='default_flag',
+        n_points=51)
+    >>print(auc, ar)
+    """
+    if isinstance(df, Portfolio):
+        return discriminatory_power_from_histograms(
+            *df.level_counts(score_col, defaults_col), n_points)
+    if df.empty:
+        raise TypeError('No data provided!')
+    if score_col is None:
+        raise TypeError('No column name for scores provided')
+    if defaults_col is None:
+        raise TypeError('No column name for defaults provided')
+
+    # Checking that the correct datatype
+    if not isinstance(score_col, str):
+        raise TypeError('score_col not of type string')
+    if not isinstance(defaults_col, str):
+        raise TypeError('defaults_col not of type string')
+
+    # Check if the correct column names have been provided
+    if score_col not in df.columns:
+        raise ValueError('{} not a column in the df'.format(score_col))
+    if defaults_col not in df.columns:
+        raise ValueError('{} not a column in the df'.format(defaults_col))
+
+    # Check the data for missing values
+    if df[score_col].hasnans:
+        raise ValueError('Missing values in {}'.format(score_col))
+    if df[defaults_col].hasnans:
+        raise ValueError('Missing values in {}'.format(defaults_col))
+
+    n_0, n_1 = _level_counts(df[score_col].to_numpy(),
+                             df[defaults_col].to_numpy(dtype=float))
+    return discriminatory_power_from_histograms(n_0, n_1, n_points)
+
+
+def discriminatory_power_from_histograms(non_defaults, defaults,
+                                         n_points=101):
+    """AUC, accuracy ratio and the CAP and ROC curves from score histograms
+
+    Parameters
+    ----------
+    non_defaults: array-like, 1D
+        number of non-defaulted loans per score bin, bins in increasing
+        order of risk
+    defaults: array-like, 1D
+        number of defaulted loans per score bin
+    n_points: integer
+        number of points of the returned curves
+
+
+    Returns
+    -------
+    auc, ar, curve: see discriminatory_power
+
+
+    Notes
+    -----
+    For very large portfolios the histograms can be accumulated chunk by
+    chunk, e.g. with np.bincount on binned scores, and never require the
+    loan-level data in memory. Loans in the same bin count as tied.
+
+
+    Examples
+    --------
+    >>bins = np.digitize(df['prob_default'], edges)
+    >>defaults = np.bincount(bins, weights=df['default_flag'])
+    >>non_defaults = np.bincount(bins) - defaults
+    >>auc, ar, curve = discriminatory_power_from_histograms(
+        non_defaults, defaults)
+    """
+    n_0 = np.asarray(non_defaults, dtype=float)
+    n_1 = np.asarray(defaults, dtype=float)
+    if n_0.shape != n_1.shape or n_0.ndim != 1:
+        raise ValueError('Histograms must be 1D and of the same length')
+    if (n_0 < 0).any() or (n_1 < 0).any():
+        raise ValueError('Histogram counts must not be negative')
+    if not isinstance(n_points, int) or n_points < 2:
+        raise TypeError('n_points should be an integer of at least 2')
+    N_0, N_1 = n_0.sum(), n_1.sum()
+    if N_0 == 0 or N_1 == 0:
+        raise ValueError('Both defaulters and non-defaulters are required')
+
+    # Non-defaulters strictly below each bin, ties count one half
+    below_0 = np.cumsum(n_0) - n_0
+    auc = (n_1*(below_0 + 0.5*n_0)).sum()/(N_0*N_1)
+
+    # Curves from the riskiest bin down, starting at the origin
+    cum_0 = np.concatenate([[0], np.cumsum(n_0[::-1])])/N_0
+    cum_1 = np.concatenate([[0], np.cumsum(n_1[::-1])])/N_1
+    cum_all = np.concatenate([[0], np.cumsum((n_0 + n_1)[::-1])])/(N_0 + N_1)
+    x = np.linspace(0, 1, n_points)
+    curve = pd.DataFrame({'x': x,
+                          'CAP': np.interp(x, cum_all, cum_1),
+                          'ROC': np.interp(x, cum_0, cum_1)})
+    return auc, 2*auc - 1, curve
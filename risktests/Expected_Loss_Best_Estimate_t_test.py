@@ -1,6 +1,8 @@
 import numpy as np
-import pandas as pd
 from scipy.stats import t
+from risktests.Grade_aggregates import (
+    _is_chunked, _error_moments, _chunked_error_moments)
+from risktests.Portfolio_handle import Portfolio
 
 
 def elbe_t_test(df, LGD_col, ELBE_col, verbose=False):
@@ -9,7 +11,7 @@ def elbe_t_test(df, LGD_col, ELBE_col, verbose=False):
 
     Parameters
     ----------
-    df: array-like, at least 2D
+    df: array-like, at least 2D, or an iterable of such chunks
         data
     LGD_col: string
         name of column with LGD values
@@ -46,7 +48,10 @@ def elbe_t_test(df, LGD_col, ELBE_col, verbose=False):
     >>print(res)
     """
     # Checking for any missing data
-    if df.empty:
+    if isinstance(df, Portfolio):
+        return _elbe_from_moments(df.error_moments(LGD_col, ELBE_col), verbose)
+    chunked = _is_chunked(df)
+    if not chunked and df.empty:
         raise TypeError('No data provided!')
     if LGD_col is None:
         raise TypeError('No column name for LGDs provided')
@@ -59,6 +64,10 @@ def elbe_t_test(df, LGD_col, ELBE_col, verbose=False):
     if not isinstance(ELBE_col, str):
         raise TypeError('ELBE_col not of type string')
 
+    if chunked:
+        moments = _chunked_error_moments(df, LGD_col, ELBE_col)
+        return _elbe_from_moments(moments, verbose)
+
     # Check if the correct column names have been provided
     if LGD_col not in df.columns:
         raise ValueError('{} not a column in the df'.format(LGD_col))
@@ -71,25 +80,28 @@ def elbe_t_test(df, LGD_col, ELBE_col, verbose=False):
     if df[ELBE_col].hasnans:
         raise ValueError('Missing values in the {} column'.format(ELBE_col))
 
-    N = len(df)
-    LGD = df[LGD_col]
-    ELBE = df[ELBE_col]
+    moments = _error_moments(df[LGD_col].to_numpy(dtype=float),
+                             df[ELBE_col].to_numpy(dtype=float))
+    return _elbe_from_moments(moments, verbose)
+
 
-    error = LGD - ELBE
-    mean_error = error.mean()
+def _elbe_from_moments(moments, verbose=False):
+    """Two-sided ELBE t-test from the output of _error_moments"""
+    N, LGD_sum, ELBE_sum, mean_error, M2 = moments
+    LGD_mean = LGD_sum/N
+    ELBE_mean = ELBE_sum/N
+    s2 = M2/(N-1)
     num = np.sqrt(N)*mean_error
-    s2 = ((error - mean_error)**2).sum()/(N-1)
     t_stat = num/np.sqrt(s2)
     p_value = 2*(1 - t.cdf(abs(t_stat), df=N-1))
 
     if verbose is True:
         # print the results
-        print("t_stat=%.3f, ELBE.mean=%.3f,LGD.mean=%.3f,N=%d, s2=%.3f, p=%.3f" % (t_stat, ELBE.mean(), LGD.mean(), N, s2, p_value))
+        print("t_stat=%.3f, ELBE.mean=%.3f,LGD.mean=%.3f,N=%d, s2=%.3f, p=%.3f" % (t_stat, ELBE_mean, LGD_mean, N, s2, p_value))
         if p_value <= 0.05:
             print(
                 "P-value <= 5%, therefore, H0 is rejected.")
         elif p_value > 0.05:
             print(
                 "P-value > 5%, therefore, H0 fails to be rejected.")
-    return N, LGD.mean(), ELBE.mean(), t_stat, s2, p_value
-
+    return N, LGD_mean, ELBE_mean, t_stat, s2, p_value
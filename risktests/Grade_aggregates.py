@@ -0,0 +1,279 @@
+import numpy as np
+import pandas as pd
+
+
+def grade_aggregates(df, ratings_col, defaults_col, PDs_col=None):
+    """Per-rating sufficient statistics computed in a single pass
+
+    Parameters
+    ----------
+    df: array-like, at least 2D, or an iterable of such chunks
+        data
+    ratings_col: string or list of strings
+        name of column with ratings. A list of segment columns ending with
+        the ratings column aggregates per segment and rating.
+    defaults_col: string
+        name of column with default statuses
+    PDs_col: string, optional
+        name of column with probabilities-of-default values
+
+
+    Returns
+    -------
+    agg : array-like, 2D
+        one row per rating (sorted) with the columns
+        N: number of observations
+        D: number of defaults
+        sum_PD: sum of PDs
+        sum_PD2: sum of squared PDs
+        sum_SE: sum of squared errors (d - PD)**2
+        sum_PQ: sum of PD*(1 - PD)
+        sum_PQ_spread: sum of PD*(1 - PD)*(1 - 2*PD)**2
+        min_PD: smallest PD
+        max_PD: largest PD
+        The PD columns are only present if PDs_col is given.
+
+
+    Notes
+    -----
+    The ratings are factorized once and every statistic is accumulated
+    with np.bincount, so the cost is O(n + K) for n observations and K
+    ratings. All columns but min_PD and max_PD are additive, so the
+    overall figures are the column sums (and the smallest and largest PD)
+    and aggregates of separate samples can be added together.
+    That is how chunked input (e.g. pd.read_csv(..., chunksize=...)) is
+    handled: each chunk is validated and aggregated on its own, so memory
+    is bounded by the chunk size.
+
+
+    Examples
+    --------
+    >>agg = grade_aggregates(
+        df=df,
+        ratings_col='ratings',
+        defaults_col='default_flag',
+        PDs_col='prob_default')
+    >>print(agg)
+    """
+    if _is_chunked(df):
+        cols = ratings_col if isinstance(ratings_col, list) else [ratings_col]
+        cols = cols + [c for c in (defaults_col, PDs_col) if c]
+        agg = None
+        for chunk in _chunks(df, cols):
+            agg = _add_aggregates(agg, grade_aggregates(
+                chunk, ratings_col, defaults_col, PDs_col))
+        return agg
+    codes, levels = _factorize(df[ratings_col])
+    defaults = df[defaults_col].to_numpy(dtype=float)
+    PDs = None if PDs_col is None else df[PDs_col].to_numpy(dtype=float)
+    if isinstance(ratings_col, list):
+        levels.names = ratings_col[:-1] + ['Rating']
+    else:
+        levels = pd.Index(levels, name='Rating')
+    return pd.DataFrame(_moments(codes, len(levels), defaults, PDs),
+                        index=levels)
+
+
+def contingency_table(df, initial_ratings_col, final_ratings_col):
+    """Counts of (initial, final) rating pairs
+
+    Parameters
+    ----------
+    df: array-like, at least 2D
+        data
+    initial_ratings_col: string
+        name of column with initial ratings
+    final_ratings_col: string
+        name of column with final ratings
+
+
+    Returns
+    -------
+    N_ij : array-like, 2D
+        number of observations per initial (rows) and final (columns)
+        rating, equal to pd.crosstab of the two columns
+
+
+    Examples
+    --------
+    >>N_ij = contingency_table(
+        df=df,
+        initial_ratings_col='ratings',
+        final_ratings_col='ratings2')
+    >>print(N_ij)
+    """
+    a_codes, a_levels = _factorize(df[initial_ratings_col])
+    b_codes, b_levels = _factorize(df[final_ratings_col])
+    return _contingency(a_codes, a_levels, b_codes, b_levels,
+                        initial_ratings_col, final_ratings_col)
+
+
+def _is_chunked(df):
+    """True if the data is an iterable of chunks rather than one frame"""
+    return not isinstance(df, pd.DataFrame)
+
+
+def _chunks(data, cols):
+    """Yields the non-empty chunks of the data as DataFrames after checking
+    the given columns. Chunks can be DataFrames or structured arrays."""
+    empty = True
+    for chunk in data:
+        chunk = _check_chunk(chunk, cols)
+        if len(chunk):
+            empty = False
+            yield chunk
+    if empty:
+        raise TypeError('No data provided!')
+
+
+def _check_chunk(chunk, cols):
+    """Chunk as a DataFrame after checking that the columns are present
+    and complete"""
+    if not isinstance(chunk, pd.DataFrame):
+        chunk = pd.DataFrame(chunk)
+    for col in cols:
+        if col not in chunk.columns:
+            raise ValueError('{} not a column in the df'.format(col))
+        if chunk[col].hasnans:
+            raise ValueError('Missing values in {}'.format(col))
+    return chunk
+
+
+def _add_aggregates(agg, other):
+    """Sum of two per-grade (or contingency) tables aligned on their
+    ratings; agg may be None"""
+    if agg is None:
+        return other
+    # Align both on all ratings first: add with fill_value leaves NaN in
+    # the cells that neither table has
+    index = agg.index.union(other.index)
+    columns = agg.columns.union(other.columns, sort=False)
+    total = agg.reindex(index=index, columns=columns, fill_value=0).add(
+        other.reindex(index=index, columns=columns, fill_value=0))
+    for col, combine in _EXTREMES.items():
+        if col in total.columns:
+            total[col] = combine(agg[col].reindex(index),
+                                 other[col].reindex(index))
+    total = total.sort_index()
+    if 'N' in total.columns:
+        total['N'] = total['N'].astype(int)
+    else:
+        total = total.sort_index(axis=1).astype(int)
+    return total
+
+
+def _factorize(values):
+    """Integer codes and sorted unique levels of a column, or of the rows
+    of several columns"""
+    if not isinstance(values, pd.DataFrame):
+        return pd.factorize(values, sort=True)
+    return _combine_codes(
+        [pd.factorize(values[col], sort=True) for col in values.columns],
+        list(values.columns))
+
+
+def _combine_codes(factorized, names):
+    """Codes and MultiIndex levels of the rows of several columns, given as
+    (codes, sorted levels) pairs"""
+    # Combine the codes of each column into one integer key, whose sorted
+    # order is the lexicographic order of the rows
+    key = np.zeros(len(factorized[0][0]), dtype=np.int64)
+    levels = []
+    for codes, uniques in factorized:
+        key = key*len(uniques) + codes
+        levels.append(uniques)
+    codes, keys = pd.factorize(key, sort=True)
+    level_codes = []
+    for uniques in reversed(levels):
+        level_codes.insert(0, keys % len(uniques))
+        keys = keys // len(uniques)
+    return codes, pd.MultiIndex(levels=levels, codes=level_codes,
+                                names=names)
+
+
+def _level_counts(scores, defaults):
+    """Non-defaulter and defaulter counts per distinct score, in increasing
+    order of the score. One sort of the scores gives every loan its level."""
+    levels, codes = np.unique(scores, return_inverse=True)
+    n_1 = np.bincount(codes, weights=defaults, minlength=len(levels))
+    n_0 = np.bincount(codes, minlength=len(levels)) - n_1
+    return n_0, n_1
+
+
+def _contingency(a_codes, a_levels, b_codes, b_levels, a_name=None,
+                 b_name=None):
+    """Cross tabulation of two integer coded columns with np.bincount"""
+    Ka, Kb = len(a_levels), len(b_levels)
+    counts = np.bincount(a_codes*Kb + b_codes, minlength=Ka*Kb)
+    return pd.DataFrame(counts.reshape(Ka, Kb),
+                        index=pd.Index(a_levels, name=a_name),
+                        columns=pd.Index(b_levels, name=b_name))
+
+
+def _moments(codes, K, defaults, PDs=None):
+    """Accumulates the per-grade moments of integer coded ratings"""
+    moments = {
+        'N': np.bincount(codes, minlength=K),
+        'D': np.bincount(codes, weights=defaults, minlength=K)}
+    if PDs is not None:
+        pq = PDs*(1 - PDs)
+        moments['sum_PD'] = np.bincount(codes, weights=PDs, minlength=K)
+        moments['sum_PD2'] = np.bincount(codes, weights=PDs**2, minlength=K)
+        moments['sum_SE'] = np.bincount(
+            codes, weights=(defaults - PDs)**2, minlength=K)
+        moments['sum_PQ'] = np.bincount(codes, weights=pq, minlength=K)
+        moments['sum_PQ_spread'] = np.bincount(
+            codes, weights=pq*(1 - 2*PDs)**2, minlength=K)
+        moments['min_PD'] = np.full(K, np.inf)
+        np.minimum.at(moments['min_PD'], codes, PDs)
+        moments['max_PD'] = np.full(K, -np.inf)
+        np.maximum.at(moments['max_PD'], codes, PDs)
+    return moments
+
+
+# Columns of grade_aggregates that are combined by other means than a sum
+_EXTREMES = {'min_PD': np.fmin, 'max_PD': np.fmax}
+
+
+def _with_overall(agg):
+    """Appends an 'Overall' row holding the column sums"""
+    overall = agg.sum()
+    for col, combine in _EXTREMES.items():
+        if col in agg.columns:
+            overall[col] = combine.reduce(agg[col].to_numpy())
+    overall = overall.to_frame('Overall').T.astype(agg.dtypes)
+    agg = pd.concat([agg, overall])
+    agg.index.name = 'Rating'
+    return agg
+
+
+def _error_moments(observed, expected):
+    """Number of observations, sums of the observed and expected values,
+    mean error and sum of squared deviations of the error"""
+    N = len(observed)
+    error = observed - expected
+    mean_error = error.mean()
+    M2 = ((error - mean_error)**2).sum()
+    return N, observed.sum(), expected.sum(), mean_error, M2
+
+
+def _merge_error_moments(a, b):
+    """Combines the _error_moments of two samples (Chan et al., 1979)"""
+    N_a, obs_a, exp_a, mean_a, M2_a = a
+    N_b, obs_b, exp_b, mean_b, M2_b = b
+    N = N_a + N_b
+    delta = mean_b - mean_a
+    mean_error = mean_a + delta*N_b/N
+    M2 = M2_a + M2_b + delta**2*N_a*N_b/N
+    return N, obs_a + obs_b, exp_a + exp_b, mean_error, M2
+
+
+def _chunked_error_moments(chunks, observed_col, expected_col):
+    """_error_moments of data supplied as an iterable of chunks"""
+    moments = None
+    for chunk in _chunks(chunks, [observed_col, expected_col]):
+        part = _error_moments(chunk[observed_col].to_numpy(dtype=float),
+                              chunk[expected_col].to_numpy(dtype=float))
+        moments = part if moments is None else _merge_error_moments(
+            moments, part)
+    return moments
@@ -36,9 +36,10 @@
         arXiv. http://arxiv.org/abs/physics/0606071
 """
 import numpy as np
+import pandas as pd
 from scipy.stats import chi2
-np.random.seed(10)
-import os
+from risktests.Grade_aggregates import grade_aggregates, _is_chunked, _chunks, _factorize, _moments
+from risktests.Portfolio_handle import Portfolio
 
 
 #  THE TEST FUNCTION
@@ -53,7 +54,8 @@ class Hosmer_Lemeshow_Chi_Square:
 
     alpha must be set otherwise a TypeError is raised.
     :param
-    data : array_like, 3-D of higher
+    data : array_like, 3-D of higher, or an iterable of such chunks (e.g. pd.read_csv(..., chunksize=...)), or a
+        Portfolio whose loan statuses column is one of its 0/1 defaults columns
     buckets_col : name of column with buckets
     loan_status_col : name of column with loan statuses
     PDs_col : name of column with probabilities-of-default
@@ -75,6 +77,7 @@ class Hosmer_Lemeshow_Chi_Square:
     >>import pandas as pd
     >>import numpy as np
 
+    >>np.random.seed(10)
     >># Sampling the buckets randomly at fixed probabilities
     >>buckets = np.random.choice(a=["Bucket one","Bucket two","Bucket three","Bucket four","Bucket five"], p = [0.15,0.25,0.05,0.05,0.5], size=1000)
     >>loan_status = np.random.choice(a=["default", "non-default"], p=[0.3,0.7], size=1000)
@@ -109,11 +112,23 @@ class Hosmer_Lemeshow_Chi_Square:
 
     def __init__(self,data, buckets_col, loan_statuses_col, PDs_col, alpha, verbose=False):
 
-        # Checking for any missing data
-        if data.empty:
-            raise TypeError('No data provided!')
         if alpha == None:
             raise TypeError('No value provided for alpha. Please input a value for alpha.')
+        if not isinstance(alpha, float):
+            raise TypeError('alpha should be a float value')
+        if not isinstance(verbose, bool):
+            raise TypeError('verbose should be a boolean value')
+
+        if isinstance(data, Portfolio):
+            # Validated once when the portfolio was built
+            self.data = None
+            self._evaluate(data.grade_aggregates(buckets_col, loan_statuses_col, PDs_col), alpha, verbose)
+            return
+
+        # Checking for any missing data
+        chunked = _is_chunked(data)
+        if not chunked and data.empty:
+            raise TypeError('No data provided!')
         if buckets_col == None:
             raise TypeError('No column name for buckets provided')
         if loan_statuses_col == None:
@@ -128,12 +143,16 @@ class Hosmer_Lemeshow_Chi_Square:
             raise TypeError('loan_statuses_col not of type string')
         if not isinstance(PDs_col, str):
             raise TypeError('PDs_col not of type string')
-        if not isinstance(alpha, float):
-            raise TypeError('alpha should be a float value')
-        if not isinstance(verbose, bool):
-            raise TypeError('verbose should be a boolean value')
 
 
+        if chunked:
+            # Each chunk is checked and reduced to per-bucket statistics, so the data is never held in full
+            self.data = None
+            chunks = (chunk.assign(**{loan_statuses_col: chunk[loan_statuses_col] == 'default'})
+                      for chunk in _chunks(data, [buckets_col, loan_statuses_col, PDs_col]))
+            self._evaluate(grade_aggregates(chunks, buckets_col, loan_statuses_col, PDs_col), alpha, verbose)
+            return
+
         # Check if the correct column names have been provided
         if not buckets_col in data.columns:
             raise ValueError('{} not a column in the data provided'.format(buckets_col))
@@ -152,66 +171,78 @@ class Hosmer_Lemeshow_Chi_Square:
 
         buckets, loan_statuses, PDs = data[buckets_col], data[loan_statuses_col], data[PDs_col]
         self.data = np.asarray(data)
-        self.bucket_levels = np.unique(buckets)
+        codes, levels = _factorize(buckets)
+        agg = pd.DataFrame(_moments(codes, len(levels), (loan_statuses == 'default').to_numpy(dtype=float),
+                                    PDs.to_numpy(dtype=float)), index=levels)
+        self._evaluate(agg, alpha, verbose)
+
+    @classmethod
+    def from_aggregates(cls, agg, alpha, verbose=False):
+        """
+        Performs the test on per-bucket statistics as returned by grade_aggregates, without the raw data.
+        :param agg: output of grade_aggregates with the PDs column
+        :param alpha: the tests level of significance
+        :param verbose: boolean. Prints the results if true.
+        :return: Hosmer_Lemeshow_Chi_Square object
+        """
+        self = cls.__new__(cls)
+        self.data = None
+        self._evaluate(agg, alpha, verbose)
+        return self
+
+    @classmethod
+    def from_loan_level(cls, data, loan_statuses_col, PDs_col, alpha, groups=10, verbose=False):
+        """
+        Performs the test on loan-level, continuous PDs grouped into equal-frequency groups of increasing PD, the
+        deciles of risk for groups=10. Each group is tested against its average PD.
+        :param data: array_like, 2-D or higher, or a Portfolio whose loan statuses column is one of its 0/1 defaults
+            columns
+        :param loan_statuses_col: name of column with loan statuses, 'default'/'non-default' or 0/1
+        :param PDs_col: name of column with probabilities-of-default
+        :param alpha: the tests level of significance
+        :param groups: number of groups, at least 3
+        :param verbose: boolean. Prints the results if true.
+        :return: Hosmer_Lemeshow_Chi_Square object
+        """
+        if not isinstance(alpha, float):
+            raise TypeError('alpha should be a float value')
+        if not isinstance(groups, int) or groups < 3:
+            raise TypeError('groups should be an integer of at least 3')
+        self = cls.__new__(cls)
+        self.data = None
+        self._evaluate(_group_aggregates(_sorted_sums(data, loan_statuses_col, PDs_col), groups), alpha, verbose,
+                       single_pd=False)
+        return self
+
+    def _evaluate(self, agg, alpha, verbose, single_pd=True):
+        """
+        Populates the HLC statistic, the degrees of freedom, the probabilities of default, the critical value and the
+        p-value from the per-bucket statistics
+        :param agg: number of loans, defaults and PD sums per bucket
+        :param alpha: the tests level of significance
+        :param verbose: boolean. Prints the results if true.
+        :param single_pd: boolean. If true every bucket must carry a single PD, otherwise buckets are tested
+            against their average PD.
+        """
+        self.bucket_levels = np.asarray(agg.index)
         self.alpha = alpha
         self.verbose = verbose
 
-
-        def HLC_stat(self):
-            """
-            Calculates the Hosmer-Lemeshow Chi-square statistic
-            :param self:
-            :return: HLC statistic, degrees of freedom, probabilities of default in each bucket
-            """
-
-            Ni = []
-            di = []
-            pi = []
-            HLC_stat = 0
-
-            for i in range(len(self.bucket_levels)):
-                mask = buckets == self.bucket_levels[i]
-                Ni.append((mask).sum())
-                di.append((loan_statuses[mask] == 'default').sum())
-                pi.append(np.unique(PDs[mask]).item())
-
-                HLC_stat = HLC_stat + (Ni[i] * pi[i] - di[i])**2/(Ni[i]*pi[i]*(1-pi[i]))
-
-            self.PDs = pi
-
-            df = len(self.bucket_levels) - 2
-            self.df = df
-            self.HLC_stat = HLC_stat
-            return self.HLC_stat, self.df, self.PDs
-
-
-        def HLC_cv(self, alpha):
-            """
-            Calculates the critical value of the Chi-square test using the degrees of freedom and alpha
-            :param self:
-            :param alpha:
-            :return: critical value of the Chi-square test
-            """
-            critical_value = chi2.ppf(q=(1-self.alpha), df=self.df)
-            self.critical_value = critical_value
-            return self.critical_value
-
-
-        def HLC_pvalue(self):
-            """
-            Calculate the p-value of the HLC statistic using the Chi-square cdf and the degrees of freedom
-            :param self:
-            :return: p-value of the HLC statistic
-            """
-            p_value = 1 - chi2.cdf(x=self.HLC_stat, df=self.df)
-            self.p_value = p_value
-            return self.p_value
-        # Populating the HLC statistic object, the degrees of freedom object, the probabilities of default object, the critical values object
-        # and the p-value objects
-
-        self.HLC_stat, self.dof, self.PDs = HLC_stat(self)
-        self.critical_value = HLC_cv(self, alpha=self.alpha)
-        self.p_value = HLC_pvalue(self)
+        Ni = agg['N'].to_numpy()
+        di = agg['D'].to_numpy()
+        pi = agg['sum_PD'].to_numpy()/Ni
+        # Every bucket must carry a single PD
+        if single_pd and (agg['min_PD'] != agg['max_PD']).any():
+            raise ValueError('More than one PD value in a bucket')
+
+        self.PDs = list(pi)
+        self.df = len(self.bucket_levels) - 2
+        self.dof = self.df
+        self.HLC_stat = ((Ni*pi - di)**2/(Ni*pi*(1-pi))).sum()
+        # Critical value of the Chi-square test using the degrees of freedom and alpha
+        self.critical_value = chi2.ppf(q=(1-self.alpha), df=self.df)
+        # p-value of the HLC statistic using the Chi-square cdf and the degrees of freedom
+        self.p_value = 1 - chi2.cdf(x=self.HLC_stat, df=self.df)
 
         if self.verbose == True:
             # print the results
@@ -223,3 +254,80 @@ class Hosmer_Lemeshow_Chi_Square:
                     "P-value > alpha, therefore, the null hypothesis that the observed number of defaults is equal to the predicted number of defaults fails to be rejected.")
 
 
+def hosmer_lemeshow_sweep(data, loan_statuses_col, PDs_col, groups=range(5, 21)):
+    """
+    Hosmer-Lemeshow test on loan-level PDs for several numbers of equal-frequency groups, to show how sensitive the
+    statistic is to the grouping.
+    :param data: array_like, 2-D or higher, or a Portfolio whose loan statuses column is one of its 0/1 defaults
+        columns
+    :param loan_statuses_col: name of column with loan statuses, 'default'/'non-default' or 0/1
+    :param PDs_col: name of column with probabilities-of-default
+    :param groups: numbers of groups, each at least 3
+    :return: DataFrame with the HLC statistic, degrees of freedom and p-value per number of groups
+
+    The loans are sorted by PD once. Group g of G holds the sorted loans ceil(g*n/G) to ceil((g+1)*n/G) - 1, so the
+    defaults and expected defaults of every group, for every G, are differences of two running sums over the sorted
+    loans and the whole sweep costs one sort.
+
+    EXAMPLE
+    -------
+    >>res = hosmer_lemeshow_sweep(data=loan_data, loan_statuses_col='default_flag', PDs_col='PD', groups=range(5, 21))
+    >>print(res)
+    """
+    groups = list(groups)
+    if not groups or any(not isinstance(g, (int, np.integer)) or g < 3 for g in groups):
+        raise TypeError('groups should be integers of at least 3')
+    sums = _sorted_sums(data, loan_statuses_col, PDs_col)
+    results = []
+    for g in groups:
+        agg = _group_aggregates(sums, int(g))
+        Ni, di, Ei = agg['N'].to_numpy(), agg['D'].to_numpy(), agg['sum_PD'].to_numpy()
+        stat = ((Ei - di)**2/(Ei*(1 - Ei/Ni))).sum()
+        results.append((stat, g - 2, chi2.sf(stat, g - 2)))
+    return pd.DataFrame(results, columns=['HLC_stat', 'dof', 'p_value'], index=pd.Index(groups, name='Groups'))
+
+
+def _sorted_sums(data, loan_statuses_col, PDs_col):
+    """Running sums of the defaults and PDs of the loans sorted by increasing PD, from 0"""
+    if isinstance(data, Portfolio):
+        # Validated once when the portfolio was built, with its sort order cached
+        defaults, PDs = data.defaults(loan_statuses_col), data.values(PDs_col)
+        order = data.order(PDs_col)[::-1]
+    else:
+        if data.empty:
+            raise TypeError('No data provided!')
+        # Checking that the correct datatype
+        if not isinstance(loan_statuses_col, str):
+            raise TypeError('loan_statuses_col not of type string')
+        if not isinstance(PDs_col, str):
+            raise TypeError('PDs_col not of type string')
+        # Check if the correct column names have been provided
+        for col in (loan_statuses_col, PDs_col):
+            if not col in data.columns:
+                raise ValueError('{} not a column in the data provided'.format(col))
+            if data[col].hasnans:
+                raise ValueError('There are missing values in the {} column'.format(col))
+        statuses = data[loan_statuses_col]
+        if not pd.api.types.is_numeric_dtype(statuses):
+            defaults = (statuses == 'default').to_numpy(dtype=float)
+        else:
+            defaults = statuses.to_numpy(dtype=float)
+            if not np.isin(defaults, (0, 1)).all():
+                raise ValueError('{} should only hold 0/1 values'.format(loan_statuses_col))
+        PDs = data[PDs_col].to_numpy(dtype=float)
+        # Same order as a Portfolio, so ties split across groups alike
+        order = np.argsort(-PDs, kind='stable')[::-1]
+    return (np.r_[0, np.cumsum(defaults[order], dtype=float)],
+            np.r_[0, np.cumsum(PDs[order])])
+
+
+def _group_aggregates(sums, groups):
+    """Number of loans, defaults and PD sums of equal-frequency groups from the running sums"""
+    cum_defaults, cum_PDs = sums
+    n = len(cum_PDs) - 1
+    if groups > n:
+        raise ValueError('More groups than loans')
+    bounds = -(-np.arange(groups + 1)*n//groups)
+    return pd.DataFrame({'N': np.diff(bounds), 'D': np.diff(cum_defaults[bounds]),
+                         'sum_PD': np.diff(cum_PDs[bounds])},
+                        index=pd.RangeIndex(1, groups + 1, name='Group'))
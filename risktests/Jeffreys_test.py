@@ -1,12 +1,16 @@
+import numpy as np
 import pandas as pd
 from scipy.stats import beta
+from risktests.Grade_aggregates import (
+    grade_aggregates, _factorize, _is_chunked, _with_overall)
+from risktests.Portfolio_handle import Portfolio
 
 
 def jeffreys_test(df, ratings_col, PDs_col, defaults_col, alpha=0.05):
     """
     Parameters
     ----------
-    df: array-like, at least 2D
+    df: array-like, at least 2D, or an iterable of such chunks
         data
     ratings_col: string
         name of column with ratings
@@ -41,10 +45,16 @@ def jeffreys_test(df, ratings_col, PDs_col, defaults_col, alpha=0.05):
 
     """
 
-    if df.empty:
-        raise TypeError('No data provided!')
     if alpha is None:
         raise TypeError('No value provided for alpha.')
+    if not isinstance(alpha, float):
+        raise TypeError('alpha should be a float value')
+    if isinstance(df, Portfolio):
+        return _jeffreys_from_aggregates(
+            df.grade_aggregates(ratings_col, defaults_col, PDs_col), alpha)
+    chunked = _is_chunked(df)
+    if not chunked and df.empty:
+        raise TypeError('No data provided!')
     if defaults_col is None:
         raise TypeError('No column name for defaults provided')
     if ratings_col is None:
@@ -59,8 +69,10 @@ def jeffreys_test(df, ratings_col, PDs_col, defaults_col, alpha=0.05):
         raise TypeError('ratings_col not of type string')
     if not isinstance(PDs_col, str):
         raise TypeError('PDs_col not of type string')
-    if not isinstance(alpha, float):
-        raise TypeError('alpha should be a float value')
+
+    if chunked:
+        agg = grade_aggregates(df, ratings_col, defaults_col, PDs_col)
+        return _jeffreys_from_aggregates(agg, alpha)
 
     # Check if the correct column names have been provided
     if defaults_col not in df.columns:
@@ -78,48 +90,161 @@ def jeffreys_test(df, ratings_col, PDs_col, defaults_col, alpha=0.05):
     if df[PDs_col].hasnans:
         raise ValueError('Missing values in {}'.format(PDs_col))
 
-    results = pd.DataFrame({'Rating': [], 'PD': [], 'N': [], 'D': [], 'a': [], 'b': [], 'Default Rate': [], 'P-Value': [], 'Pass/Fail':  []})
-    ratings = df[ratings_col]
+    agg = grade_aggregates(df, ratings_col, defaults_col, PDs_col)
+    return _jeffreys_from_aggregates(agg, alpha)
 
-    for rating in set(ratings):
-        temp = df[df[ratings_col] == rating]
-        mean_probability = temp[PDs_col].mean()
-        d = temp[defaults_col].sum()
-        n = len(temp)
-        a = d + 0.5
-        b = n - d + 0.5
-        p_value = beta.ppf(alpha, a, b)
 
-        if p_value <= mean_probability:
-            verdict = 'Pass'
-        else:
-            verdict = 'Fail'
-
-        res = pd.DataFrame({'Rating': [rating],
-                            'PD': [mean_probability],
-                            'N': [n],
-                            'D': [d],
-                            'a': [a],
-                            'b': [b],
-                            'Default Rate': [d/n],
-                            'P-Value': [p_value],
-                            'Pass/Fail': [verdict]})
-
-        results = results.append(res)
-    # Overall
-    d = df[defaults_col].sum()
-    n = len(df)
+def _jeffreys_from_aggregates(agg, alpha=0.05):
+    """Jeffreys test per rating and overall from grade_aggregates output"""
+    agg = _with_overall(agg)
+    n = agg['N']
+    d = agg['D']
+    mean_probability = agg['sum_PD']/n
     a = d + 0.5
     b = n - d + 0.5
-    p = beta.ppf(alpha, a, b)
-    m = df[PDs_col].mean()
-    if p <= m:
-        verdict = 'Pass'
-    else:
-        verdict = 'Fail'
-    overall = pd.DataFrame({'Rating': ['Overall'], 'PD': [m], 'N': [n], 'D': [d], 'a': [a], 'b': [b], 'Default Rate': [d/n], 'P-Value': [p], 'Pass/Fail': [verdict]})
+    p_value = beta.ppf(alpha, a, b)
+    results = pd.DataFrame({'PD': mean_probability,
+                            'N': n,
+                            'D': d,
+                            'a': a,
+                            'b': b,
+                            'Default Rate': d/n,
+                            'P-Value': p_value,
+                            'Pass/Fail': np.where(p_value <= mean_probability,
+                                                  'Pass', 'Fail')})
+    return results
+
+
+def jeffreys_test_grid(df, ratings_col, PDs_col, defaults_col,
+                       segment_cols=None, alphas=(0.01, 0.05, 0.1),
+                       two_sided=False):
+    """Jeffreys test for all ratings, segments and significance levels at once
+
+    Parameters
+    ----------
+    df: array-like, at least 2D, or an iterable of such chunks
+        data
+    ratings_col: string
+        name of column with ratings
+    PDs_col: string
+        name of column with probabilities-of-default values
+    defaults_col: string
+        name of column with default statuses
+    segment_cols: list of strings, optional
+        names of columns defining the pools that are tested separately
+    alphas: list of floats
+        levels of significance
+    two_sided: boolean
+        if true, the PD must lie between the alpha/2 and 1 - alpha/2
+        quantiles of the Beta distribution, otherwise it must not be below
+        the alpha quantile
 
-    results = results.append(overall).set_index('Rating')
 
+    Returns
+    -------
+    results: array-like, 2D
+        one row per segment and rating plus an 'Overall' row per segment,
+        with PD, N, D and default rate, then per alpha the Beta quantile
+        ('P-Value <alpha>', or 'Lower <alpha>' and 'Upper <alpha>' if
+        two_sided) and 'Pass/Fail <alpha>'
+
+
+    Notes
+    -----
+    All pools are aggregated in one pass and the Beta(d + 1/2, n - d + 1/2)
+    quantiles of every row and alpha are evaluated in a single broadcast
+    beta.ppf call.
+
+
+    Examples
+    --------
+    >>res = jeffreys_test_grid(df=df, ratings_col='ratings', PDs_col='PD',
+                               defaults_col='loan_status',
+                               segment_cols=['country', 'product'],
+                               alphas=[0.01, 0.05], two_sided=True)
+    >>print(res)
+    """
+    alphas = np.asarray(alphas, dtype=float).ravel()
+    if len(alphas) == 0 or ((alphas <= 0) | (alphas >= 1)).any():
+        raise ValueError('alphas should be between 0 and 1')
+    if isinstance(df, Portfolio):
+        keys = list(segment_cols) + [ratings_col] if segment_cols else \
+            ratings_col
+        return _jeffreys_grid_from_aggregates(
+            df.grade_aggregates(keys, defaults_col, PDs_col), alphas,
+            two_sided)
+    chunked = _is_chunked(df)
+    if not chunked and df.empty:
+        raise TypeError('No data provided!')
+    if defaults_col is None:
+        raise TypeError('No column name for defaults provided')
+    if ratings_col is None:
+        raise TypeError('No column name for ratings provided')
+    if PDs_col is None:
+        raise TypeError('No column name for PDs provided.')
+    segment_cols = list(segment_cols or [])
+
+    # Checking that the correct datatype
+    for col in [defaults_col, ratings_col, PDs_col] + segment_cols:
+        if not isinstance(col, str):
+            raise TypeError('{} not of type string'.format(col))
+
+    if not chunked:
+        # Check if the correct column names have been provided and the data
+        # for missing values
+        for col in [defaults_col, ratings_col, PDs_col] + segment_cols:
+            if col not in df.columns:
+                raise ValueError('{} not a column in the df'.format(col))
+            if df[col].hasnans:
+                raise ValueError('Missing values in {}'.format(col))
+
+    keys = segment_cols + [ratings_col] if segment_cols else ratings_col
+    agg = grade_aggregates(df, keys, defaults_col, PDs_col)
+    return _jeffreys_grid_from_aggregates(agg, alphas, two_sided)
+
+
+def _jeffreys_grid_from_aggregates(agg, alphas, two_sided=False):
+    """Jeffreys test per row of grade_aggregates output and per alpha, with
+    an overall row per segment"""
+    if agg.index.nlevels == 1:
+        agg = _with_overall(agg)
+    else:
+        segments = agg.index.droplevel(-1)
+        overall = agg.groupby(level=list(range(agg.index.nlevels - 1))).sum()
+        overall.index = pd.MultiIndex.from_tuples(
+            [key + ('Overall',) if isinstance(key, tuple) else (key, 'Overall')
+             for key in overall.index], names=agg.index.names)
+        # Each segment's overall row follows its ratings
+        codes = np.concatenate([_factorize(segments.to_frame())[0],
+                                np.arange(len(overall))])
+        agg = pd.concat([agg, overall]).iloc[np.argsort(codes, kind='stable')]
+
+    n = agg['N'].to_numpy()
+    d = agg['D'].to_numpy()
+    mean_probability = agg['sum_PD'].to_numpy()/n
+    a = (d + 0.5)[:, None]
+    b = (n - d + 0.5)[:, None]
+    results = pd.DataFrame({'PD': mean_probability,
+                            'N': n,
+                            'D': d,
+                            'Default Rate': d/n}, index=agg.index)
+
+    k = len(alphas)
+    if two_sided:
+        bounds = beta.ppf(np.concatenate([alphas/2, 1 - alphas/2]), a, b)
+        lower, upper = bounds[:, :k], bounds[:, k:]
+        passed = (lower <= mean_probability[:, None]) & \
+            (mean_probability[:, None] <= upper)
+    else:
+        lower = beta.ppf(alphas, a, b)
+        passed = lower <= mean_probability[:, None]
+    verdicts = np.where(passed, 'Pass', 'Fail')
+
+    for i, alpha in enumerate(alphas):
+        if two_sided:
+            results['Lower {:g}'.format(alpha)] = lower[:, i]
+            results['Upper {:g}'.format(alpha)] = upper[:, i]
+        else:
+            results['P-Value {:g}'.format(alpha)] = lower[:, i]
+        results['Pass/Fail {:g}'.format(alpha)] = verdicts[:, i]
     return results
-    
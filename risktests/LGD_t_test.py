@@ -1,6 +1,9 @@
 import numpy as np
-import pandas as pd
 from scipy.stats import t
+from risktests.Grade_aggregates import (
+    _is_chunked, _error_moments, _chunked_error_moments)
+from risktests.Portfolio_handle import Portfolio
+
 
 def lgd_t_test(df, observed_LGD_col, expected_LGD_col, verbose=False):
     """t-test for the Null hypothesis that estimated LGD is greater than true LGD
@@ -8,7 +11,7 @@ def lgd_t_test(df, observed_LGD_col, expected_LGD_col, verbose=False):
 
     Parameters
     ----------
-    df: array-like, at least 2D
+    df: array-like, at least 2D, or an iterable of such chunks
         data
     observed_LGD_col: string
         name of column with observed LGD values
@@ -46,7 +49,11 @@ def lgd_t_test(df, observed_LGD_col, expected_LGD_col, verbose=False):
     >>print(res)
     """
     # Checking for any missing data
-    if df.empty:
+    if isinstance(df, Portfolio):
+        return _lgd_from_moments(
+            df.error_moments(observed_LGD_col, expected_LGD_col), verbose)
+    chunked = _is_chunked(df)
+    if not chunked and df.empty:
         raise TypeError('No data provided!')
     if observed_LGD_col is None:
         raise TypeError('No column name for observed LGDs provided')
@@ -59,6 +66,11 @@ def lgd_t_test(df, observed_LGD_col, expected_LGD_col, verbose=False):
     if not isinstance(expected_LGD_col, str):
         raise TypeError('expected_LGD_col not of type string')
 
+    if chunked:
+        moments = _chunked_error_moments(df, observed_LGD_col,
+                                         expected_LGD_col)
+        return _lgd_from_moments(moments, verbose)
+
     # Check if the correct column names have been provided
     if observed_LGD_col not in df.columns:
         raise ValueError('{} not a column in the df'.format(observed_LGD_col))
@@ -71,19 +83,24 @@ def lgd_t_test(df, observed_LGD_col, expected_LGD_col, verbose=False):
     if df[expected_LGD_col].hasnans:
         raise ValueError('Missing values in {}'.format(expected_LGD_col))
 
-    N = len(df)
-    LGD = df[observed_LGD_col]
-    pred_LGD = df[expected_LGD_col]
-    error = LGD - pred_LGD
-    mean_error = error.mean()
+    moments = _error_moments(df[observed_LGD_col].to_numpy(dtype=float),
+                             df[expected_LGD_col].to_numpy(dtype=float))
+    return _lgd_from_moments(moments, verbose)
+
+
+def _lgd_from_moments(moments, verbose=False):
+    """One-sided LGD t-test from the output of _error_moments"""
+    N, LGD_sum, pred_LGD_sum, mean_error, M2 = moments
+    LGD_mean = LGD_sum/N
+    pred_LGD_mean = pred_LGD_sum/N
+    lgd_s2 = M2/(N-1)
     num = np.sqrt(N)*mean_error
-    lgd_s2 = ((error - mean_error)**2).sum()/(N-1)
     t_stat = num/np.sqrt(lgd_s2)
     p_value = 1 - t.cdf(t_stat, df=N-1)
 
     if verbose is True:
         # print the results
-        print("t_stat=%.3f, LGD.mean=%.3f,pred_LGD.mean=%.3f,N=%d, s2=%.3f, p=%.3f" % (t_stat, pred_LGD.mean(), LGD.mean(), N, lgd_s2, p_value))
+        print("t_stat=%.3f, LGD.mean=%.3f,pred_LGD.mean=%.3f,N=%d, s2=%.3f, p=%.3f" % (t_stat, pred_LGD_mean, LGD_mean, N, lgd_s2, p_value))
         if p_value <= 0.05:
             print(
                 "P-value <= 5%, therefore, H0 is rejected.")
@@ -91,4 +108,4 @@ def lgd_t_test(df, observed_LGD_col, expected_LGD_col, verbose=False):
             print(
                 "P-value > 5%, therefore, H0 fails to be rejected.")
 
-    return N, LGD.mean(), pred_LGD.mean(), t_stat, lgd_s2, p_value
+    return N, LGD_mean, pred_LGD_mean, t_stat, lgd_s2, p_value
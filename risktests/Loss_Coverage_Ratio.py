@@ -1,8 +1,9 @@
-import matplotlib.pyplot as plt
-from sklearn.metrics import auc
+import numpy as np
+import pandas as pd
+from risktests.Portfolio_handle import Portfolio
 
 
-def lcr(df, LGD_col, EAD_col, pred_LGD_col):
+def lcr(df, LGD_col, EAD_col, pred_LGD_col, plot=False):
     """
     Parameters
     ----------
@@ -14,11 +15,13 @@ def lcr(df, LGD_col, EAD_col, pred_LGD_col):
         name of column with Exposure at Default (EAD)
     pred_LGD_col: string
         name of column with predicted LGDs
+    plot: boolean
+        if true, the loss capture curves are plotted and the ratio printed
 
     Returns
     -------
     lcr : float
-        Calculated value of LCR and a plot
+        Calculated value of LCR
 
     References
     ----------
@@ -31,6 +34,65 @@ def lcr(df, LGD_col, EAD_col, pred_LGD_col):
     >>res =  lcr(df=df, LGD_col='LGD', EAD_col='EAD', pred_LGD_col='PRED_LGD')
     >>print(res)
     """
+    loss_capture_ratio, curve = loss_capture_curve(
+        df, LGD_col, EAD_col, pred_LGD_col, n_points=1001 if plot else None)
+    if plot:
+        _lcr_plot(loss_capture_ratio, curve)
+    return loss_capture_ratio
+
+
+def loss_capture_curve(df, LGD_col, EAD_col, pred_LGD_col, n_points=101):
+    """Loss capture ratio and the model and ideal loss capture curves
+
+    Parameters
+    ----------
+    df: array-like, at least 2D
+        data
+    LGD_col: string
+        name of column with Loss Given Default (LGD)
+    EAD_col: string
+        name of column with Exposure at Default (EAD)
+    pred_LGD_col: string
+        name of column with predicted LGDs
+    n_points: integer, optional
+        number of points of the returned curves; if None, no curve is
+        built
+
+
+    Returns
+    -------
+    lcr: float
+        loss capture ratio
+    curve: array-like, 2D
+        n_points rows with the grid 'x' from 0 to 1 and the shares of the
+        total loss captured by the worst x share of the population when
+        ordered by predicted LGD ('Model') and by realised LGD ('Ideal').
+        None if n_points is None.
+
+
+    Notes
+    -----
+    The input is not modified. The losses EAD * LGD are ordered by the two
+    descending, stable argsorts of the predicted and the realised LGD and
+    both curves come from one cumulative sum over the stacked orderings.
+    The curves are downsampled by linear interpolation, so the returned
+    object stays small whatever the size of the portfolio.
+
+
+    Examples
+    --------
+    >>res, curve = loss_capture_curve(df=df, LGD_col='LGD', EAD_col='EAD',
+                                      pred_LGD_col='PRED_LGD', n_points=51)
+    >>print(res)
+    """
+    if n_points is not None and (not isinstance(n_points, int) or
+                                 n_points < 2):
+        raise TypeError('n_points should be an integer of at least 2')
+    if isinstance(df, Portfolio):
+        loss_capture_ratio, curves = _lcr_from_orders(
+            df.values(EAD_col)*df.values(LGD_col), df.order(pred_LGD_col),
+            df.order(LGD_col))
+        return loss_capture_ratio, _lcr_curve(curves, n_points)
     if df.empty:
         raise TypeError('No data provided!')
     if LGD_col is None:
@@ -63,32 +125,56 @@ def lcr(df, LGD_col, EAD_col, pred_LGD_col):
         raise ValueError('Missing values in {}'.format(LGD_col))
     if df[pred_LGD_col].hasnans:
         raise ValueError('Missing values in {}'.format(pred_LGD_col))
-    df['loss'] = df[EAD_col] * df[LGD_col]
-    # Model loss capture curve
-
-    df2 = df.sort_values(by=pred_LGD_col, ascending=False)
-    df2['cumulative_loss'] = df2.cumsum()['loss']
-    df2['cumulative_loss_capture_percentage'] = df2.cumsum()['loss']/df2.loss.sum()
-    auc_curve1 = auc([i for i in range(len(df2))], df2.cumulative_loss_capture_percentage)
-    random_auc1 = 0.5 * len(df2) * 1
-    # Ideal loss capture curve
-    df3 = df.sort_values(by=LGD_col, ascending=False)
-    df3['cumulative_loss'] = df3.cumsum()['loss']
-    df3['cumulative_loss_capture_percentage'] = df3.cumsum()['loss']/df3.loss.sum()
-    auc_curve2 = auc([i for i in range(len(df3))], df3.cumulative_loss_capture_percentage)
-    random_auc2 = 0.5 * len(df3) * 1
-    loss_capture_ratio = (auc_curve1 - random_auc1)/(auc_curve2 - random_auc2)
-    # loss capture curve
+    loss = df[EAD_col].to_numpy(dtype=float)*df[LGD_col].to_numpy(dtype=float)
+    model_order = np.argsort(-df[pred_LGD_col].to_numpy(dtype=float),
+                             kind='stable')
+    ideal_order = np.argsort(-df[LGD_col].to_numpy(dtype=float),
+                             kind='stable')
+    loss_capture_ratio, curves = _lcr_from_orders(loss, model_order,
+                                                  ideal_order)
+    return loss_capture_ratio, _lcr_curve(curves, n_points)
+
+
+def _lcr_from_orders(loss, model_order, ideal_order):
+    """Loss capture ratio and the model and ideal loss capture curves (a
+    2 x n array) from the losses and the descending sort orders of
+    predicted and realised LGD"""
+    n = len(loss)
+    curves = np.cumsum(loss[np.vstack([model_order, ideal_order])], axis=1)
+    curves /= curves[:, -1:]
+    # Trapezoidal area under each curve on the grid 0, 1, ..., n-1
+    auc_curve1, auc_curve2 = curves.sum(axis=1) - \
+        (curves[:, 0] + curves[:, -1])/2
+    random_auc = 0.5 * n * 1
+    loss_capture_ratio = (auc_curve1 - random_auc)/(auc_curve2 - random_auc)
+    return loss_capture_ratio, curves
+
+
+def _lcr_curve(curves, n_points):
+    """Loss capture curves interpolated on n_points population shares"""
+    if n_points is None:
+        return None
+    n = curves.shape[1]
+    # After k of the n loans the share of the population is k/n
+    share = np.arange(n + 1)/n
+    x = np.linspace(0, 1, n_points)
+    return pd.DataFrame({'x': x,
+                         'Model': np.interp(x, share, np.r_[0, curves[0]]),
+                         'Ideal': np.interp(x, share, np.r_[0, curves[1]])})
+
+
+def _lcr_plot(loss_capture_ratio, curve):
+    """Plots the loss capture curves and reports the loss capture ratio"""
+    import matplotlib.pyplot as plt
     plt.title('Loss Capture Curve')
-    plt.plot([i for i in range(len(df2))], df2.cumulative_loss_capture_percentage, 'b', label='Model Output')
-    plt.plot([i for i in range(len(df3))], df3.cumulative_loss_capture_percentage, 'g', label='Ideal Output')
+    plt.plot(curve['x'], curve['Model'], 'b', label='Model Output')
+    plt.plot(curve['x'], curve['Ideal'], 'g', label='Ideal Output')
     plt.legend(loc='lower right')
-    plt.plot([0, len(df2)], [0, 1], 'r--')
-    plt.xlim([0, len(df2)])
+    plt.plot([0, 1], [0, 1], 'r--')
+    plt.xlim([0, 1])
     plt.ylim([0, 1])
     plt.ylabel('Actual Loss Curve(%)')
     plt.xlabel('Ordered Population(Worst to Best)')
     plt.show()
     print('loss capture ratio is equal to ' +
                 str(abs(round(loss_capture_ratio, 2))))
-    return loss_capture_ratio
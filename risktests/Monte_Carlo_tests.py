@@ -0,0 +1,244 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from risktests.Grade_aggregates import _factorize
+from risktests.Portfolio_handle import Portfolio
+
+# Tests whose statistics can be simulated
+TESTS = ('binomial', 'hosmer_lemeshow', 'spiegelhalter')
+
+
+def simulate_test(df, test, ratings_col, defaults_col, PDs_col,
+                  n_sims=10000, rho=None, alpha=0.05, block_size=None,
+                  workers=1, seed=None):
+    """Simulated p-values and critical values of a calibration test
+
+    Parameters
+    ----------
+    df: array-like, at least 2D, or a Portfolio
+        data
+    test: string
+        'binomial', 'hosmer_lemeshow' or 'spiegelhalter'
+    ratings_col: string
+        name of column with ratings
+    defaults_col: string
+        name of column with default statuses (0/1)
+    PDs_col: string
+        name of column with probabilities-of-default values
+    n_sims: integer
+        number of simulated default scenarios
+    rho: float, optional
+        asset correlation of the one-factor model; defaults are
+        independent if None
+    alpha: float
+        level of significance of the critical values
+    block_size: integer, optional
+        number of scenarios drawn at once; by default about four million
+        loan draws per block
+    workers: integer
+        number of worker processes; 1 runs everything in this process
+    seed: integer, optional
+        seed of the SeedSequence the block streams are spawned from
+
+
+    Returns
+    -------
+    results : array-like, 2D
+        per rating (binomial), per rating and overall (spiegelhalter) or
+        overall (hosmer_lemeshow): the observed statistic, its simulated
+        p-value and critical value(s) with their Monte Carlo standard
+        errors, and the test conclusion
+
+
+    Notes
+    -----
+    Every scenario draws the default of each loan from its own PD, or
+    under the one-factor model from its PD conditional on a systematic
+    factor drawn per scenario. Scenarios are drawn in blocks of
+    block_size x loans, and the statistics of a whole block are evaluated
+    at once from np.add.reduceat sums over the loans sorted by rating:
+
+        binomial         number of defaults per rating; the p-value is
+                         P(D <= d), as in binomial_test, and the lower and
+                         upper critical values are the alpha and 1 - alpha
+                         quantiles
+        hosmer_lemeshow  sum over ratings of (D - E)^2/(E*(1 - E/N)), with
+                         E the expected defaults; the p-value is the
+                         upper tail
+        spiegelhalter    z-score per rating and overall, as in
+                         Speigelhalter_Normal_test; the p-value is
+                         P(Z >= |z|) of the simulated Z, the counterpart
+                         of its norm.sf(|z|) and of the non-rejection
+                         bound of calibration_margins
+
+    The p-values carry the binomial standard error sqrt(p*(1 - p)/n_sims),
+    and the critical values the spread of the order statistics around the
+    quantile. Each block has its own random stream spawned from one
+    SeedSequence, so results are reproducible for a given seed and
+    block_size whatever the number of workers.
+
+
+    References
+    ----------
+    [1] BIS. (2005). Studies on the Validation of Internal Rating Systems
+    (revised). https://www.bis.org/publ/bcbs_wp14.htm
+    [2] Tasche, D. (2003). A traffic lights approach to PD validation
+    (arXiv:cond-mat/0305038). arXiv.
+
+
+    Examples
+    --------
+    >>res = simulate_test(
+        df=df,
+        test='hosmer_lemeshow',
+        ratings_col='ratings',
+        defaults_col='default_flag',
+        PDs_col='prob_default',
+        n_sims=100000,
+        rho=0.12,
+        workers=8,
+        seed=10)
+    >>print(res)
+    """
+    if test not in TESTS:
+        raise ValueError('{} is not a known test'.format(test))
+    if not isinstance(n_sims, int) or n_sims < 1:
+        raise TypeError('n_sims should be a positive integer')
+    if rho is not None and (not isinstance(rho, float) or not 0 < rho < 1):
+        raise TypeError('rho should be a float value between 0 and 1')
+    if not isinstance(alpha, float):
+        raise TypeError('alpha should be a float value')
+    if not isinstance(workers, int) or workers < 1:
+        raise TypeError('workers should be a positive integer')
+
+    if isinstance(df, Portfolio):
+        codes, levels = df.codes(ratings_col)
+        defaults = df.defaults(defaults_col)
+        PDs = df.values(PDs_col)
+    else:
+        if df.empty:
+            raise TypeError('No data provided!')
+        for arg, col in [('ratings_col', ratings_col),
+                         ('defaults_col', defaults_col), ('PDs_col', PDs_col)]:
+            # Checking that the correct datatype
+            if not isinstance(col, str):
+                raise TypeError('{} not of type string'.format(arg))
+            # Check if the correct column names have been provided and the
+            # data for missing values
+            if col not in df.columns:
+                raise ValueError('{} not a column in the df'.format(col))
+            if df[col].hasnans:
+                raise ValueError('Missing values in {}'.format(col))
+        codes, levels = _factorize(df[ratings_col])
+        defaults = df[defaults_col].to_numpy(dtype=float)
+        PDs = df[PDs_col].to_numpy(dtype=float)
+
+    # Loans sorted by rating, so the per-rating sums are contiguous
+    order = np.argsort(codes, kind='stable')
+    PDs = np.ascontiguousarray(PDs[order], dtype=float)
+    N = np.bincount(codes, minlength=len(levels))
+    starts = np.r_[0, np.cumsum(N)[:-1]]
+    observed = _statistics(test, defaults[order][None, :], PDs, starts)[0]
+
+    if block_size is None:
+        block_size = max(1, min(n_sims, 2**22//len(PDs)))
+    sizes = np.diff(np.r_[np.arange(0, n_sims, block_size), n_sims])
+    streams = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(test, PDs, starts, rho, list(sizes[batch]),
+             [streams[i] for i in batch])
+            for batch in np.array_split(np.arange(len(sizes)),
+                                        min(workers, len(sizes)))]
+    if workers == 1:
+        outputs = [_simulate_blocks(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outputs = list(pool.map(_simulate_blocks, *zip(*jobs)))
+    simulated = np.concatenate(outputs)
+
+    if test == 'binomial':
+        index = pd.Index(levels, name='Rating')
+    elif test == 'spiegelhalter':
+        index = pd.Index(list(levels) + ['Overall'], name='Rating')
+    else:
+        index = pd.Index(['Overall'], name='Rating')
+    return _summary(test, observed, simulated, alpha, index)
+
+
+def _simulate_blocks(test, PDs, starts, rho, sizes, streams):
+    """Statistics of blocks of simulated scenarios, one stream per block"""
+    blocks = []
+    for size, stream in zip(sizes, streams):
+        rng = np.random.default_rng(stream)
+        if rho is None:
+            p = PDs[None, :]
+        else:
+            # PDs conditional on the systematic factor of each scenario
+            Z = rng.standard_normal((size, 1))
+            p = norm.cdf((norm.ppf(PDs)[None, :] - np.sqrt(rho)*Z) /
+                         np.sqrt(1 - rho))
+        defaults = rng.random((size, len(PDs))) < p
+        blocks.append(_statistics(test, defaults, PDs, starts))
+    return np.concatenate(blocks)
+
+
+def _statistics(test, defaults, PDs, starts):
+    """Test statistic of each scenario (rows of defaults)"""
+    D = np.add.reduceat(defaults, starts, axis=1, dtype=float)
+    if test == 'binomial':
+        return D
+    if test == 'hosmer_lemeshow':
+        N = np.diff(np.r_[starts, len(PDs)])
+        E = np.add.reduceat(PDs, starts)
+        return ((D - E)**2/(E*(1 - E/N))).sum(axis=1, keepdims=True)
+    # Sum of (d - p)^2 = sum of d*(1 - 2p) + sum of p^2
+    pq = PDs*(1 - PDs)
+    SE = np.add.reduceat(defaults*(1 - 2*PDs), starts, axis=1) + \
+        np.add.reduceat(PDs**2, starts)
+    PQ = np.add.reduceat(pq, starts)
+    spread = np.add.reduceat(pq*(1 - 2*PDs)**2, starts)
+    SE = np.hstack([SE, SE.sum(axis=1, keepdims=True)])
+    PQ = np.r_[PQ, PQ.sum()]
+    spread = np.r_[spread, spread.sum()]
+    # (MSE - EMSE)/sqrt(Var_EMSE) with the same n in every term
+    return (SE - PQ)/np.sqrt(spread)
+
+
+def _summary(test, observed, simulated, alpha, index):
+    """Simulated p-values and critical values with their Monte Carlo
+    errors"""
+    n_sims = len(simulated)
+    if test == 'binomial':
+        p = (simulated <= observed).mean(axis=0)
+    elif test == 'spiegelhalter':
+        # Upper tail at |z|, as norm.sf(|z|) in Speigelhalter_Normal_test
+        p = (simulated >= np.abs(observed)).mean(axis=0)
+    else:
+        p = (simulated >= observed).mean(axis=0)
+    results = pd.DataFrame({'Statistic': observed,
+                            'P-Value': p,
+                            'P-Value MC error': np.sqrt(p*(1 - p)/n_sims)},
+                           index=index)
+    if test == 'binomial':
+        results['Lower critical value'], \
+            results['Lower critical value MC error'] = \
+            _quantile(simulated, alpha)
+        conclusion = (p <= alpha) | (1 - p <= alpha)
+    else:
+        conclusion = p <= alpha
+    results['Critical value'], results['Critical value MC error'] = \
+        _quantile(simulated, 1 - alpha)
+    results['Conclusion'] = np.where(conclusion, 'reject', 'fail to reject')
+    return results
+
+
+def _quantile(simulated, q):
+    """Quantile of every column and its standard error, from the order
+    statistics one binomial standard deviation around it"""
+    n_sims = len(simulated)
+    ordered = np.sort(simulated, axis=0)
+    spread = np.sqrt(n_sims*q*(1 - q))
+    lower = int(np.clip(np.floor(n_sims*q - spread), 0, n_sims - 1))
+    upper = int(np.clip(np.ceil(n_sims*q + spread), 0, n_sims - 1))
+    return (np.quantile(simulated, q, axis=0),
+            (ordered[upper] - ordered[lower])/2)
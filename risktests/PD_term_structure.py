@@ -0,0 +1,113 @@
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from scipy.linalg import expm
+
+
+def pd_term_structure(matrix, horizons=range(1, 31), default_rating=None,
+                      generator=False):
+    """Cumulative and marginal PD curves per grade from a migration matrix
+
+    Parameters
+    ----------
+    matrix: array-like, 2D or 3D
+        one-year transition matrix with initial ratings as rows, or its
+        generator if generator is true. A scenarios x K x K stack computes
+        the curves of every scenario.
+    horizons: list of integers
+        horizons in years, in increasing order
+    default_rating: optional
+        label (for a DataFrame) or position of the default grade; the last
+        grade if None
+    generator: boolean
+        if true, matrix is a generator Q and the t-year matrix is exp(Qt),
+        otherwise the t-year matrix is the t-th power of the matrix
+
+
+    Returns
+    -------
+    cumulative: array-like
+        probability of default within each horizon, grades x horizons (with
+        a leading scenarios axis for a stack); a DataFrame for a DataFrame
+        input
+    marginal: array-like
+        probability of default between the previous horizon and each
+        horizon, of the same shape
+
+
+    Notes
+    -----
+    The eigendecomposition M = V diag(l) V^-1 of each matrix is computed
+    once and cached on the matrix values, so further calls on the same
+    matrix, e.g. for other horizons or scenario runs that revisit a
+    matrix, only evaluate V diag(l^t) (V^-1)_D, or exp(l t) for a
+    generator, for the default column D. Matrices whose eigenvectors are
+    numerically dependent (not diagonalizable) fall back to repeated
+    multiplication or scipy.linalg.expm.
+
+
+    Examples
+    --------
+    >>cumulative, marginal = pd_term_structure(P, horizons=range(1, 31),
+                                               default_rating='D')
+    >>print(cumulative[[1, 5, 10]])
+    >>Q = history.duration_generator('2015-01-01', '2020-01-01')
+    >>cumulative, marginal = pd_term_structure(Q, generator=True)
+    """
+    labels = None
+    if isinstance(matrix, pd.DataFrame):
+        labels = matrix.index
+        if default_rating is not None:
+            default_rating = matrix.columns.get_loc(default_rating)
+    matrix = np.asarray(matrix, dtype=float)
+    if matrix.ndim not in (2, 3) or matrix.shape[-1] != matrix.shape[-2]:
+        raise ValueError('matrix should be a K x K or scenarios x K x K '
+                         'array')
+    horizons = np.asarray(horizons, dtype=float)
+    if horizons.ndim != 1 or len(horizons) == 0 or (horizons < 0).any() or \
+            (np.diff(horizons) <= 0).any():
+        raise ValueError('horizons should be increasing and non-negative')
+    if not generator and (horizons != np.round(horizons)).any():
+        raise ValueError('horizons should be whole years for a one-year '
+                         'matrix')
+    D = matrix.shape[-1] - 1 if default_rating is None else default_rating
+
+    if matrix.ndim == 2:
+        cumulative = _cumulative_pd(matrix, horizons, D, generator)
+    else:
+        cumulative = np.stack([_cumulative_pd(m, horizons, D, generator)
+                               for m in matrix])
+    marginal = np.diff(cumulative, axis=-1, prepend=0)
+    if labels is not None:
+        columns = pd.Index(horizons.astype(int) if not generator else
+                           horizons, name='Year')
+        cumulative = pd.DataFrame(cumulative, index=labels, columns=columns)
+        marginal = pd.DataFrame(marginal, index=labels, columns=columns)
+    return cumulative, marginal
+
+
+def _cumulative_pd(matrix, horizons, D, generator):
+    """Default column of the t-year matrices, grades x horizons"""
+    eigen = _eigen(matrix.tobytes(), matrix.shape[0])
+    if eigen is None:
+        if generator:
+            return np.stack([expm(matrix*t)[:, D] for t in horizons], axis=1)
+        return np.stack([np.linalg.matrix_power(matrix, int(t))[:, D]
+                         for t in horizons], axis=1)
+    values, vectors, inverse_column = eigen[0], eigen[1], eigen[2][:, D]
+    if generator:
+        scale = np.exp(np.outer(values, horizons))
+    else:
+        scale = values[:, None]**horizons[None, :]
+    return (vectors @ (scale*inverse_column[:, None])).real
+
+
+@lru_cache(maxsize=1024)
+def _eigen(data, K):
+    """Eigenvalues, eigenvectors and inverse eigenvector matrix of a K x K
+    matrix given by its bytes, or None if it is not diagonalizable"""
+    matrix = np.frombuffer(data, dtype=float).reshape(K, K)
+    values, vectors = np.linalg.eig(matrix)
+    if np.linalg.cond(vectors) > 1e10:
+        return None
+    return values, vectors, np.linalg.inv(vectors)
@@ -1,5 +1,6 @@
 import numpy as np
-import pandas as pd
+from risktests.Grade_aggregates import contingency_table
+from risktests.Portfolio_handle import Portfolio
 
 
 def PSI(df, initial_ratings_col, final_ratings_col):
@@ -40,6 +41,9 @@ def PSI(df, initial_ratings_col, final_ratings_col):
         final_ratings_col='ratings2')
     >>print(res)
     """
+    if isinstance(df, Portfolio):
+        return _psi_from_contingency(
+            df.contingency_table(initial_ratings_col, final_ratings_col))
     if df.empty:
         raise TypeError('No data provided!')
     if initial_ratings_col is None:
@@ -65,10 +69,14 @@ def PSI(df, initial_ratings_col, final_ratings_col):
     if df[final_ratings_col].hasnans:
         raise ValueError('Missing values in{}'.format(final_ratings_col))
 
-    a = df[initial_ratings_col]
-    b = df[final_ratings_col]
-    a_totals = pd.crosstab(a, a).sum()
-    b_totals = pd.crosstab(b, b).sum()
+    N_ij = contingency_table(df, initial_ratings_col, final_ratings_col)
+    return _psi_from_contingency(N_ij)
+
+
+def _psi_from_contingency(N_ij):
+    """PSI from the initial (row) and final (column) rating totals"""
+    a_totals = N_ij.sum(axis=1)
+    b_totals = N_ij.sum(axis=0)
     pi = (a_totals/a_totals.sum())*100
     qi = (b_totals/b_totals.sum())*100
     return ((pi-qi)*np.log(pi/qi)).sum()
@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+from risktests.Grade_aggregates import (
+    _combine_codes, _contingency, _error_moments, _level_counts, _moments)
+
+
+class Portfolio:
+    """Validated, column-oriented copy of a portfolio that every test in
+    risktests accepts in place of a DataFrame
+
+    Parameters
+    ----------
+    df: array-like, at least 2D
+        data
+    ratings_cols: string or list of strings
+        names of columns with ratings or other categories, e.g. segments
+    defaults_cols: string or list of strings
+        names of columns with default statuses (0/1 or boolean)
+    values_cols: string or list of strings
+        names of numerical columns, e.g. PDs, LGDs, EADs or scores
+
+
+    Notes
+    -----
+    The columns are checked once, when the portfolio is built: the data
+    must not be empty, every column must exist and have no missing values
+    and default statuses must be 0/1. Ratings are stored as integer codes
+    into their sorted levels, defaults as int8 and numerical columns as
+    contiguous float64 arrays; the DataFrame itself is not kept.
+
+    The tests skip their input checks on a Portfolio. The intermediates
+    they share (per-grade aggregates, contingency tables, error moments,
+    score level counts and sort orders) are built on first use and cached,
+    so calling several tests, or one test repeatedly, only pays for the
+    statistics. The Hosmer-Lemeshow test reads its loan statuses from a
+    0/1 defaults column of the portfolio.
+
+
+    Examples
+    --------
+    >>pf = Portfolio(
+        df=df,
+        ratings_cols=['ratings', 'ratings2'],
+        defaults_cols='default_flag',
+        values_cols=['prob_default', 'LGD', 'PRED_LGD', 'EAD'])
+    >>print(binomial_test(pf, 'default_flag', 'prob_default', 'ratings'))
+    >>print(jeffreys_test(pf, 'ratings', 'prob_default', 'default_flag'))
+    >>print(PSI(pf, 'ratings', 'ratings2'))
+    """
+
+    def __init__(self, df, ratings_cols=None, defaults_cols=None,
+                 values_cols=None):
+        if df.empty:
+            raise TypeError('No data provided!')
+        ratings_cols = _as_list(ratings_cols, 'ratings_cols')
+        defaults_cols = _as_list(defaults_cols, 'defaults_cols')
+        values_cols = _as_list(values_cols, 'values_cols')
+
+        # Check if the correct column names have been provided and the data
+        # for missing values
+        for col in ratings_cols + defaults_cols + values_cols:
+            if col not in df.columns:
+                raise ValueError('{} not a column in the df'.format(col))
+            if df[col].hasnans:
+                raise ValueError('Missing values in {}'.format(col))
+
+        self._codes = {col: pd.factorize(df[col], sort=True)
+                       for col in ratings_cols}
+        self._defaults = {}
+        for col in defaults_cols:
+            flags = df[col].to_numpy()
+            if not np.isin(flags, (0, 1)).all():
+                raise ValueError('{} should only hold 0/1 values'.format(col))
+            self._defaults[col] = flags.astype(np.int8)
+        self._values = {col: np.ascontiguousarray(df[col].to_numpy(
+            dtype=np.float64)) for col in values_cols}
+        self._n = len(df)
+        self._cache = {}
+
+    def __len__(self):
+        return self._n
+
+    def codes(self, col):
+        """Integer codes and sorted levels of a ratings column"""
+        if col not in self._codes:
+            raise ValueError('{} not a ratings column of the portfolio'
+                             .format(col))
+        return self._codes[col]
+
+    def defaults(self, col):
+        """Default statuses of a defaults column as an int8 array"""
+        if col not in self._defaults:
+            raise ValueError('{} not a defaults column of the portfolio'
+                             .format(col))
+        return self._defaults[col]
+
+    def values(self, col):
+        """Numerical column as a float64 array"""
+        if col not in self._values:
+            raise ValueError('{} not a values column of the portfolio'
+                             .format(col))
+        return self._values[col]
+
+    def grade_aggregates(self, ratings_col, defaults_col, PDs_col=None):
+        """Per-rating statistics as returned by grade_aggregates; a list of
+        segment columns ending with the ratings column aggregates per
+        segment and rating"""
+        keys = tuple(ratings_col) if isinstance(ratings_col, list) else \
+            ratings_col
+        return self._cached(
+            ('grade_aggregates', keys, defaults_col, PDs_col),
+            lambda: self._grade_aggregates(ratings_col, defaults_col,
+                                           PDs_col))
+
+    def contingency_table(self, initial_ratings_col, final_ratings_col):
+        """Counts of (initial, final) rating pairs"""
+        return self._cached(
+            ('contingency_table', initial_ratings_col, final_ratings_col),
+            lambda: _contingency(*self.codes(initial_ratings_col),
+                                 *self.codes(final_ratings_col),
+                                 initial_ratings_col, final_ratings_col))
+
+    def error_moments(self, observed_col, expected_col):
+        """Count, sums and squared deviations of observed - expected"""
+        return self._cached(
+            ('error_moments', observed_col, expected_col),
+            lambda: _error_moments(self.values(observed_col),
+                                   self.values(expected_col)))
+
+    def level_counts(self, score_col, defaults_col):
+        """Non-defaulter and defaulter counts per distinct score, in
+        increasing order of the score; the score can be a ratings or a
+        values column"""
+        return self._cached(
+            ('level_counts', score_col, defaults_col),
+            lambda: self._level_counts(score_col, defaults_col))
+
+    def order(self, col):
+        """Positions of the loans sorted by a values column, descending and
+        stable"""
+        return self._cached(
+            ('order', col),
+            lambda: np.argsort(-self.values(col), kind='stable'))
+
+    def _cached(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def _grade_aggregates(self, ratings_col, defaults_col, PDs_col):
+        if isinstance(ratings_col, list):
+            codes, levels = _combine_codes(
+                [self.codes(col) for col in ratings_col],
+                ratings_col[:-1] + ['Rating'])
+        else:
+            codes, levels = self.codes(ratings_col)
+            levels = pd.Index(levels, name='Rating')
+        PDs = None if PDs_col is None else self.values(PDs_col)
+        return pd.DataFrame(
+            _moments(codes, len(levels), self.defaults(defaults_col), PDs),
+            index=levels)
+
+    def _level_counts(self, score_col, defaults_col):
+        defaults = self.defaults(defaults_col)
+        if score_col not in self._codes:
+            return _level_counts(self.values(score_col), defaults)
+        codes, levels = self.codes(score_col)
+        n_1 = np.bincount(codes, weights=defaults, minlength=len(levels))
+        n_0 = np.bincount(codes, minlength=len(levels)) - n_1
+        return n_0, n_1
+
+
+def _as_list(cols, arg):
+    """Column names as a list after checking they are strings"""
+    if cols is None:
+        return []
+    if isinstance(cols, str):
+        cols = [cols]
+    for col in cols:
+        if not isinstance(col, str):
+            raise TypeError('{} not of type string'.format(arg))
+    return list(cols)
@@ -0,0 +1,156 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from risktests.Validation_suite import ValidationSuite, TESTS
+
+
+# Names of the values of the tests that do not return a table
+RESULT_FIELDS = {
+    'hosmer_lemeshow': ['HLC_stat', 'dof', 'critical_value', 'p_value'],
+    'concordance': ['Coefficient of concordance'],
+    'somers_d': ["Somers' D"],
+    'psi': ['PSI'],
+    'ratings_concentration': ['HI final', 'HI initial', 'P-Value', 'N'],
+    'migration_statistics': ['Upper MWB', 'Lower MWB'],
+    'lgd_t_test': ['N', 'LGD mean', 'pred LGD mean', 't-stat', 's2',
+                   'P-Value'],
+    'elbe_t_test': ['N', 'LGD mean', 'ELBE mean', 't-stat', 's2',
+                    'P-Value'],
+    'lcr': ['LCR'],
+}
+
+
+def run_by_segment(df, by, tests, workers=1, alpha=0.05, **columns):
+    """Runs validation tests on every segment of a portfolio
+
+    Parameters
+    ----------
+    df: array-like, at least 2D
+        data
+    by: list of strings
+        names of the columns that define the segments
+    tests: list of strings
+        names of the tests to run, see ValidationSuite
+    workers: integer
+        number of worker processes; 1 runs everything in this process
+    alpha: float
+        level of significance for the Jeffreys and Hosmer-Lemeshow tests
+    **columns: strings
+        column names used by the tests, see ValidationSuite
+
+
+    Returns
+    -------
+    results : array-like, 2D
+        one row per segment, test and rating (or per segment and test for
+        tests without a per-rating output) with the segment keys, the test
+        name and the test's outputs as columns
+
+
+    Notes
+    -----
+    The data is partitioned once. Segments are handed to the workers in
+    batches balanced on their number of rows (largest first into the
+    lightest batch), and the results are ordered by segment key and test,
+    so the output does not depend on the number of workers.
+
+
+    Examples
+    --------
+    >>res = run_by_segment(
+        df=df,
+        by=['country', 'product'],
+        tests=['binomial', 'jeffreys', 'lgd_t_test'],
+        workers=8,
+        ratings_col='ratings',
+        defaults_col='default_flag',
+        PDs_col='prob_default',
+        LGD_col='LGD',
+        pred_LGD_col='PRED_LGD')
+    >>print(res)
+    """
+    if df.empty:
+        raise TypeError('No data provided!')
+    if isinstance(by, str):
+        by = [by]
+    for col in by:
+        if col not in df.columns:
+            raise ValueError('{} not a column in the df'.format(col))
+    for test in tests:
+        if test not in TESTS:
+            raise ValueError('{} is not a known test'.format(test))
+    if not isinstance(workers, int) or workers < 1:
+        raise TypeError('workers should be a positive integer')
+
+    groups = df.groupby(by, sort=True, dropna=False).indices
+    keys = list(groups)
+    batches = _balanced_batches([len(groups[key]) for key in keys], workers)
+
+    # Segments are identified by their position: a missing value in a key
+    # does not compare equal to itself once it is shipped back pickled
+    jobs = [([(i, df.take(groups[keys[i]])) for i in batch], tests, alpha,
+             columns) for batch in batches]
+    if workers == 1:
+        outputs = [_run_batch(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outputs = list(pool.map(_run_batch, *zip(*jobs)))
+
+    by_position = {}
+    for output in outputs:
+        by_position.update(output)
+    frames = []
+    for i, key in enumerate(keys):
+        key = key if isinstance(key, tuple) else (key,)
+        for test in tests:
+            res = by_position[i][test]
+            for col, value in reversed(list(zip(by, key))):
+                res.insert(0, col, value)
+            frames.append(res)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _balanced_batches(costs, workers, batches_per_worker=4):
+    """Splits segment positions into batches of similar total cost"""
+    n_batches = min(len(costs), workers*batches_per_worker)
+    batches = [[] for _ in range(n_batches)]
+    loads = np.zeros(n_batches)
+    for i in np.argsort(costs, kind='stable')[::-1]:
+        j = loads.argmin()
+        batches[j].append(i)
+        loads[j] += costs[i]
+    return [sorted(batch) for batch in batches if batch]
+
+
+def _run_batch(segments, tests, alpha, columns):
+    """Runs the tests on a batch of (position, segment) pairs; returns the
+    tidy results per segment position and test"""
+    output = {}
+    for i, segment in segments:
+        results = ValidationSuite(segment, tests, alpha, **columns).run()
+        output[i] = {test: _tidy(test, res) for test, res in results.items()}
+    return output
+
+
+def _tidy(test, res):
+    """Result of a test as a frame with a 'Test' column"""
+    if test == 'migration_stability':
+        z_df, phi_df = res
+        rows, cols = z_df.shape
+        res = pd.DataFrame({
+            'Rating': np.repeat(z_df.index.to_numpy(dtype=object), cols),
+            'Final Rating': np.tile(z_df.columns.to_numpy(dtype=object), rows),
+            'z-score': z_df.to_numpy(dtype=float).ravel(),
+            'P-Value': phi_df.to_numpy(dtype=float).ravel()})
+    elif isinstance(res, pd.DataFrame):
+        res = res.reset_index()
+        res['Rating'] = res['Rating'].astype(object)
+    else:
+        fields = RESULT_FIELDS[test]
+        if test == 'hosmer_lemeshow':
+            res = [getattr(res, field) for field in fields]
+        elif len(fields) == 1:
+            res = [res]
+        res = pd.DataFrame([list(res)], columns=fields)
+    res.insert(0, 'Test', test)
+    return res
@@ -1,4 +1,7 @@
-from itertools import combinations
+import numpy as np
+from scipy.stats import norm
+from risktests.Grade_aggregates import grade_aggregates, _level_counts
+from risktests.Portfolio_handle import Portfolio
 
 
 def Somersd(df, ratings_col, PDs_col, defaults_col):
@@ -36,6 +39,9 @@ def Somersd(df, ratings_col, PDs_col, defaults_col):
     defaults_col='default_flag')
     >>print(res)
     """
+    if isinstance(df, Portfolio):
+        return _somersd_from_aggregates(
+            df.grade_aggregates(ratings_col, defaults_col, PDs_col))
     if df.empty:
         raise TypeError('No data provided!')
     if defaults_col is None:
@@ -68,20 +74,133 @@ def Somersd(df, ratings_col, PDs_col, defaults_col):
         raise ValueError('Missing values in {}'.format(defaults_col))
     if df[PDs_col].hasnans:
         raise ValueError('Missing values in {}'.format(PDs_col))
-    ratings = df[ratings_col]
-    X = []
-    Y = []
-    for rating in set(ratings):
-        temp = df[df[ratings_col] == rating]
-        X.append(temp[defaults_col].sum())
-        Y.append(temp[PDs_col].mean())
-    C = sum([1 if v1 == v2 else 0 for v1, v2 in zip(
-        ['a<b' if a < b else 'a>b' for a, b in combinations(X, 2)],
-        ['a<b' if a < b else 'a>b' for a, b in combinations(Y, 2)])])
-    D = sum([0 if v1 == v2 else 1 for v1, v2 in zip(
-        ['a<b' if a < b else 'a>b' for a, b in combinations(X, 2)],
-        ['a<b' if a < b else 'a>b' for a, b in combinations(Y, 2)])])
-
-    W = (C - D)/max(len(list(combinations(X, 2))),
-                    len(list(combinations(Y, 2))))
+    agg = grade_aggregates(df, ratings_col, defaults_col, PDs_col)
+    return _somersd_from_aggregates(agg)
+
+
+def _somersd_from_aggregates(agg):
+    """Somers' D between defaults and mean PD per rating"""
+    X = agg['D'].to_numpy()
+    Y = (agg['sum_PD']/agg['N']).to_numpy()
+    # Pairs (i, j) with i < j, ordered as itertools.combinations
+    i, j = np.triu_indices(len(X), k=1)
+    same = (X[i] < X[j]) == (Y[i] < Y[j])
+    C = same.sum()
+    D = len(same) - C
+    W = (C - D)/len(same)
     return W
+
+
+def Somersd_loan_level(df, score_col, defaults_col, alpha=0.05):
+    """Loan-level Somers' D of the default flag on a risk score
+
+    Parameters
+    ----------
+    df: array-like, at least 2D
+        data
+    score_col: string
+        name of column with an ordinal score that increases with risk,
+        e.g. PDs or ratings where higher grades are riskier
+    defaults_col: string
+        name of column with default statuses (0/1)
+    alpha: float
+        level of significance of the confidence interval
+
+
+    Returns
+    -------
+    D : float
+        Somers' D(score|default), the share of concordant minus discordant
+        pairs among all defaulter/non-defaulter pairs (the accuracy ratio)
+    ASE : float
+        asymptotic standard error of D
+    lower : float
+        lower bound of the 1 - alpha confidence interval
+    upper : float
+        upper bound of the 1 - alpha confidence interval
+
+
+    Notes
+    -----
+    Pairs tied on the score count as neither concordant nor discordant.
+    The loans are sorted once by score; the concordant and discordant
+    counts of every score level are then cumulative sums of the defaulters
+    and non-defaulters below and above it, so the cost is O(n log n).
+    The ASE is the delta-method standard error of Somers' D for the
+    2 x K table of default status by score level.
+
+
+    References
+    ----------
+    [1] BIS. (2005). Studies on the Validation of Internal Rating Systems
+    (revised). https://www.bis.org/publ/bcbs_wp14.htm
+    [2] Agresti, A. (2010). Analysis of Ordinal Categorical Data (2nd ed.).
+    Wiley.
+
+
+    Examples
+    --------
+    >>res = Somersd_loan_level(
+    df=df,
+    score_col='prob_default',
+    defaults_col='default_flag')
+    >>print(res)
+    """
+    if not isinstance(alpha, float):
+        raise TypeError('alpha should be a float value')
+    if isinstance(df, Portfolio):
+        return _somersd_from_counts(
+            *df.level_counts(score_col, defaults_col), alpha)
+    if df.empty:
+        raise TypeError('No data provided!')
+    if score_col is None:
+        raise TypeError('No column name for scores provided')
+    if defaults_col is None:
+        raise TypeError('No column name for defaults provided')
+
+    # Checking that the correct datatype
+    if not isinstance(score_col, str):
+        raise TypeError('score_col not of type string')
+    if not isinstance(defaults_col, str):
+        raise TypeError('defaults_col not of type string')
+
+    # Check if the correct column names have been provided
+    if score_col not in df.columns:
+        raise ValueError('{} not a column in the df'.format(score_col))
+    if defaults_col not in df.columns:
+        raise ValueError('{} not a column in the df'.format(defaults_col))
+
+    # Check the data for missing values
+    if df[score_col].hasnans:
+        raise ValueError('Missing values in {}'.format(score_col))
+    if df[defaults_col].hasnans:
+        raise ValueError('Missing values in {}'.format(defaults_col))
+
+    n_0, n_1 = _level_counts(df[score_col].to_numpy(),
+                             df[defaults_col].to_numpy(dtype=float))
+    return _somersd_from_counts(n_0, n_1, alpha)
+
+
+def _somersd_from_counts(n_0, n_1, alpha=0.05):
+    """Somers' D, its ASE and confidence interval from the non-defaulter
+    and defaulter counts per score level, in increasing order of risk"""
+    N_0, N_1 = n_0.sum(), n_1.sum()
+    if N_0 == 0 or N_1 == 0:
+        raise ValueError('Both defaulters and non-defaulters are required')
+    # Counts strictly below and above each score level
+    below_0 = np.cumsum(n_0) - n_0
+    below_1 = np.cumsum(n_1) - n_1
+    above_0 = N_0 - below_0 - n_0
+    above_1 = N_1 - below_1 - n_1
+    # Concordant minus discordant partners of a loan in each cell
+    diff_1 = below_0 - above_0
+    diff_0 = above_1 - below_1
+    PQ = (n_1*diff_1).sum() + (n_0*diff_0).sum()
+    w = 2*N_0*N_1
+    D = PQ/w
+
+    n = N_0 + N_1
+    ASE = 2/w**2*np.sqrt((n_1*(w*diff_1 - PQ*(n - N_1))**2).sum() +
+                         (n_0*(w*diff_0 - PQ*(n - N_0))**2).sum())
+    z = norm.ppf(1 - alpha/2)
+    return D, ASE, max(D - z*ASE, -1.0), min(D + z*ASE, 1.0)
@@ -1,13 +1,16 @@
 import numpy as np
 import pandas as pd
 from scipy.stats import norm
+from risktests.Grade_aggregates import (
+    grade_aggregates, _is_chunked, _with_overall)
+from risktests.Portfolio_handle import Portfolio
 
 
 def Speigelhalter_Normal_test(df, ratings_col, defaults_col, PDs_col):
     """
     Parameters
     ----------
-    df: array-like, at least 2D
+    df: array-like, at least 2D, or an iterable of such chunks
         data
     ratings_col: string
         name of column with ratings
@@ -37,7 +40,11 @@ def Speigelhalter_Normal_test(df, ratings_col, defaults_col, PDs_col):
     PDs_col='prob_default')
     >>print(res)
     """
-    if df.empty:
+    if isinstance(df, Portfolio):
+        return _spiegelhalter_from_aggregates(
+            df.grade_aggregates(ratings_col, defaults_col, PDs_col))
+    chunked = _is_chunked(df)
+    if not chunked and df.empty:
         raise TypeError('No data provided!')
     if defaults_col is None:
         raise TypeError('No column name for defaults provided')
@@ -54,6 +61,10 @@ def Speigelhalter_Normal_test(df, ratings_col, defaults_col, PDs_col):
     if not isinstance(PDs_col, str):
         raise TypeError('PDs_col not of type string')
 
+    if chunked:
+        agg = grade_aggregates(df, ratings_col, defaults_col, PDs_col)
+        return _spiegelhalter_from_aggregates(agg)
+
     # Check if the correct column names have been provided
     if defaults_col not in df.columns:
         raise ValueError('{} not a column in the df'.format(defaults_col))
@@ -69,52 +80,24 @@ def Speigelhalter_Normal_test(df, ratings_col, defaults_col, PDs_col):
         raise ValueError('Missing values in {}'.format(defaults_col))
     if df[PDs_col].hasnans:
         raise ValueError('Missing values in {}'.format(PDs_col))
-    results = pd.DataFrame({
-        'Rating': [],
-        'z-score': [],
-        'P-Value': [],
-        'Pass/Fail':  []})
-    ratings = df[ratings_col]
-
-    for rating in set(ratings):
-        temp = df[df[ratings_col] == rating]
-        MSE = ((temp[defaults_col] - temp[PDs_col])**2).sum()/len(temp)
-        EMSE = (temp[PDs_col]*(1 - temp[PDs_col])).sum()/len(temp)
-        Var_EMSE = (temp[PDs_col]*(1-temp[PDs_col])*(1-2*temp[PDs_col])**2)
-        Var_EMSE = Var_EMSE.sum()/(len(temp))**2
-        z = (MSE - EMSE)/np.sqrt(Var_EMSE)
-        p = norm.sf(abs(z))
-
-        if p < 0.05:
-            verdict = 'Pass'
-        else:
-            verdict = 'Fail'
+    agg = grade_aggregates(df, ratings_col, defaults_col, PDs_col)
+    return _spiegelhalter_from_aggregates(agg)
 
-        res = pd.DataFrame({
-            'Rating': [rating],
-            'z-score': [z],
-            'P-Value': [p],
-            'Pass/Fail': [verdict]})
 
-        results = pd.concat([results, res])
-    # Overall
-
-    MSE = ((df[defaults_col] - df[PDs_col])**2).sum()/len(df)
-    EMSE = (df[PDs_col]*(1 - df[PDs_col])).sum()/len(df)
-    Var_EMSE = (df[PDs_col]*(1-df[PDs_col])*(1-2*df[PDs_col])**2)
-    Var_EMSE = Var_EMSE.sum()/(len(df))**2
+def _spiegelhalter_from_aggregates(agg):
+    """Spiegelhalter test per rating and overall from grade_aggregates"""
+    agg = _with_overall(agg)
+    n = agg['N']
+    MSE = agg['sum_SE']/n
+    EMSE = agg['sum_PQ']/n
+    Var_EMSE = agg['sum_PQ_spread']/n**2
     z = (MSE - EMSE)/np.sqrt(Var_EMSE)
     p = norm.sf(abs(z))
-    if p <= 0.05:
-        verdict = 'Pass'
-    else:
-        verdict = 'Fail'
-    overall = pd.DataFrame({
-        'Rating': ['Overall'],
-        'z-score': [z],
-        'P-Value': [p],
-        'Pass/Fail':  [verdict]})
-
-    results = pd.concat([results, overall]).set_index('Rating')
-
+    # The overall verdict has always used a non-strict comparison
+    passed = p < 0.05
+    passed[-1] = p[-1] <= 0.05
+    results = pd.DataFrame({
+        'z-score': z,
+        'P-Value': p,
+        'Pass/Fail': np.where(passed, 'Pass', 'Fail')})
     return results
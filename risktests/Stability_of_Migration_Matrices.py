@@ -1,8 +1,8 @@
 import numpy as np
 import pandas as pd
 from scipy.stats import norm
-
-df = pd.read_excel('synthetic_pd.xlsx')
+from risktests.Grade_aggregates import contingency_table
+from risktests.Portfolio_handle import Portfolio
 
 
 def migration_matrix_stability(df, initial_ratings_col, final_ratings_col):
@@ -36,42 +36,74 @@ def migration_matrix_stability(df, initial_ratings_col, final_ratings_col):
     >>res = migration_matrix_stability(df=df, initial_ratings_col='ratings', final_ratings_col='ratings2')
     >>print(res)
     """
-    a = df[initial_ratings_col]
-    b = df[final_ratings_col]
-    N_ij = pd.crosstab(a, b)
-    p_ij = pd.crosstab(a, b, normalize='index')
-    K = len(set(a))
-    z_df = p_ij.copy()
-    for i in range(1, K+1):
-        for j in range(1, K+1):
-            if i == j:
+    if isinstance(df, Portfolio):
+        return _stability_from_contingency(
+            df.contingency_table(initial_ratings_col, final_ratings_col))
+    N_ij = contingency_table(df, initial_ratings_col, final_ratings_col)
+    return _stability_from_contingency(N_ij)
 
-                z_ij = np.nan
 
-            if i > j:
-                Ni = N_ij.sum(axis=1).values[i-1]
+def migration_matrix_stability_from_counts(N_ij):
+    """z-tests of the stability of one or many transition matrices
 
-                num = p_ij.iloc[i-1, j-1+1] - p_ij.iloc[i-1, j-1]
-                den_a = p_ij.iloc[i-1, j-1]*(1-p_ij.iloc[i-1, j-1])/Ni
-                den_b = p_ij.iloc[i-1, j-1+1]*(1-p_ij.iloc[i-1, j-1+1])/Ni
-                den_c = 2*p_ij.iloc[i-1, j-1]*p_ij.iloc[i-1, j-1+1]/Ni
+    Parameters
+    ----------
+    N_ij: array-like, 2D or 3D
+        transition counts with initial ratings as rows and final ratings as
+        columns, or a periods x K x K stack of such counts, e.g. one matrix
+        per monthly cohort
 
-                z_ij = num/np.sqrt(den_a + den_b + den_c)
 
-            elif i < j:
-                Ni = N_ij.sum(axis=1).values[i-1]
+    Returns
+    -------
+    z: array-like
+        z statistic for each ratings pair, of the shape of N_ij
+    phi: array-like
+        p-values for each ratings pair
 
-                num = p_ij.iloc[i-1, j-1-1] - p_ij.iloc[i-1, j-1]
-                den_a = p_ij.iloc[i-1, j-1]*(1-p_ij.iloc[i-1, j-1])/Ni
-                den_b = p_ij.iloc[i-1, j-1-1]*(1-p_ij.iloc[i-1, j-1-1])/Ni
-                den_c = 2*p_ij.iloc[i-1, j-1]*p_ij.iloc[i-1, j-1-1]/Ni
 
-                z_ij = num/np.sqrt(den_a + den_b + den_c)
+    Notes
+    -----
+    Each cell is compared with its neighbour towards the main diagonal,
+    (i, j+1) below and (i, j-1) above the diagonal, using whole-array
+    shifts, and all p-values come from a single norm.cdf call. Diagonal
+    cells are NaN, as are the cells of ratings without observations.
 
-            else:
 
-                z_ij = np.nan
+    Examples
+    --------
+    >>N = np.stack([contingency_table(c, 'ratings', 'ratings2').to_numpy()
+                    for _, c in df.groupby('cohort')])
+    >>z, phi = migration_matrix_stability_from_counts(N)
+    >>print((phi < 0.05).sum(axis=0))
+    """
+    N_ij = np.asarray(N_ij, dtype=float)
+    if N_ij.ndim not in (2, 3):
+        raise ValueError('N_ij should be a K x K or periods x K x K array')
+    return _stability_z(N_ij)
 
-            z_df.iloc[i-1, j-1] = z_ij
-    phi_df = z_df.apply(lambda x: x.apply(lambda y: norm.cdf(y)))
+
+def _stability_from_contingency(N_ij):
+    """z statistics and p-values from a transition count table"""
+    z, phi = _stability_z(N_ij.to_numpy(dtype=float))
+    z_df = pd.DataFrame(z, index=N_ij.index, columns=N_ij.columns)
+    phi_df = pd.DataFrame(phi, index=N_ij.index, columns=N_ij.columns)
     return z_df, phi_df
+
+
+def _stability_z(N_ij):
+    """z statistics and p-values of a (..., K, K) array of transition
+    counts"""
+    N_i = N_ij.sum(axis=-1, keepdims=True)
+    nan = np.full(N_ij.shape[:-1] + (1,), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = N_ij/N_i
+        # p_i,j+1 below the diagonal and p_i,j-1 above it
+        i, j = np.indices(N_ij.shape[-2:])
+        neighbour = np.where(
+            i > j, np.concatenate([p[..., 1:], nan], axis=-1),
+            np.where(i < j, np.concatenate([nan, p[..., :-1]], axis=-1),
+                     np.nan))
+        den = (p*(1 - p) + neighbour*(1 - neighbour) + 2*p*neighbour)/N_i
+        z = (neighbour - p)/np.sqrt(den)
+    return z, norm.cdf(z)
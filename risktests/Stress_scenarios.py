@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import beta, binom
+from risktests.Grade_aggregates import grade_aggregates, _is_chunked
+from risktests.Portfolio_handle import Portfolio
+
+
+def stress_calibration_tests(df, ratings_col, defaults_col, PDs_col,
+                             scenarios, shift='multiplicative', alpha=0.05):
+    """Jeffreys and binomial tests of every rating under PD scenarios
+
+    Parameters
+    ----------
+    df: array-like, at least 2D, or an iterable of such chunks, or a
+        Portfolio
+        data
+    ratings_col: string
+        name of column with ratings
+    defaults_col: string
+        name of column with default statuses
+    PDs_col: string
+        name of column with probabilities-of-default values
+    scenarios: array-like, 1D or 2D
+        PD multipliers or shifts, scenarios x ratings; a DataFrame is
+        aligned on its columns (ratings) and keeps its index as scenario
+        names, and a 1D array applies one value to all ratings per
+        scenario
+    shift: string
+        'multiplicative' (PD*s) or 'additive' (PD + s)
+    alpha: float
+        level of significance
+
+
+    Returns
+    -------
+    results: array-like, 2D
+        one row per scenario and rating with the stressed average 'PD',
+        the Jeffreys p-value P(PD' <= PD) with PD' ~ Beta(d + 1/2,
+        n - d + 1/2) and verdict, and the binomial P(D <= d) and
+        conclusion; unstack the 'Rating' level for scenarios x ratings
+        tables
+
+
+    Notes
+    -----
+    The numbers of loans and defaults per rating are aggregated once, and
+    the stressed PDs of all scenarios and ratings are evaluated in single
+    broadcast beta.cdf and binom.cdf calls. The Jeffreys verdict agrees
+    with jeffreys_test: a rating passes when its PD is not below the alpha
+    quantile of the Beta distribution, i.e. when the p-value is at least
+    alpha. The binomial conclusion is that of binomial_test. Stressed PDs
+    are clipped to [0, 1].
+
+
+    Examples
+    --------
+    >>multipliers = np.linspace(0.5, 1, 11)
+    >>res = stress_calibration_tests(df=df, ratings_col='ratings',
+                                     defaults_col='default_flag',
+                                     PDs_col='prob_default',
+                                     scenarios=multipliers)
+    >>print(res['Jeffreys Pass/Fail'].unstack('Rating'))
+    """
+    if shift not in ('multiplicative', 'additive'):
+        raise ValueError("shift should be 'multiplicative' or 'additive'")
+    if not isinstance(alpha, float):
+        raise TypeError('alpha should be a float value')
+    if isinstance(df, Portfolio):
+        return _stress_from_aggregates(
+            df.grade_aggregates(ratings_col, defaults_col, PDs_col),
+            scenarios, shift, alpha)
+    chunked = _is_chunked(df)
+    if not chunked and df.empty:
+        raise TypeError('No data provided!')
+
+    # Checking that the correct datatype
+    if not isinstance(defaults_col, str):
+        raise TypeError('defaults_col not of type string')
+    if not isinstance(ratings_col, str):
+        raise TypeError('ratings_col not of type string')
+    if not isinstance(PDs_col, str):
+        raise TypeError('PDs_col not of type string')
+
+    if not chunked:
+        # Check if the correct column names have been provided and the
+        # data for missing values
+        for col in (defaults_col, ratings_col, PDs_col):
+            if col not in df.columns:
+                raise ValueError('{} not a column in the df'.format(col))
+            if df[col].hasnans:
+                raise ValueError('Missing values in {}'.format(col))
+
+    agg = grade_aggregates(df, ratings_col, defaults_col, PDs_col)
+    return _stress_from_aggregates(agg, scenarios, shift, alpha)
+
+
+def _stress_from_aggregates(agg, scenarios, shift='multiplicative',
+                            alpha=0.05):
+    """Scenario x rating tests from the output of grade_aggregates"""
+    n = agg['N'].to_numpy()
+    d = agg['D'].to_numpy()
+    K = len(agg)
+    if isinstance(scenarios, pd.DataFrame):
+        names = scenarios.index
+        missing = agg.index.difference(scenarios.columns)
+        if len(missing):
+            raise ValueError('No scenarios for ratings {}'.format(
+                list(missing)))
+        values = scenarios[agg.index].to_numpy(dtype=float)
+    else:
+        values = np.asarray(scenarios, dtype=float)
+        if values.ndim == 1:
+            values = np.repeat(values[:, None], K, axis=1)
+        names = pd.RangeIndex(len(values))
+    if values.ndim != 2 or values.shape[1] != K:
+        raise ValueError(
+            'scenarios should be scenarios x {} ratings'.format(K))
+    names = names.rename('Scenario')
+
+    PD = agg['sum_PD'].to_numpy()/n
+    if shift == 'multiplicative':
+        stressed = PD*values
+    else:
+        stressed = PD + values
+    stressed = np.clip(stressed, 0, 1)
+
+    jeffreys = beta.cdf(stressed, d + 0.5, n - d + 0.5)
+    binomial = binom.cdf(d, n, stressed)
+    index = pd.MultiIndex.from_product([names, agg.index],
+                                       names=['Scenario', 'Rating'])
+    return pd.DataFrame({
+        'PD': stressed.ravel(),
+        'Jeffreys P-Value': jeffreys.ravel(),
+        'Jeffreys Pass/Fail': np.where(jeffreys.ravel() >= alpha,
+                                       'Pass', 'Fail'),
+        'Binomial Test': binomial.ravel(),
+        'Binomial Conclusion': np.where(
+            (binomial.ravel() <= alpha) | (1 - binomial.ravel() <= alpha),
+            'reject', 'fail to reject')}, index=index)
@@ -1,5 +1,8 @@
 import pandas as pd
 import numpy as np
+from risktests.Grade_aggregates import grade_aggregates, _is_chunked
+from risktests.Portfolio_handle import Portfolio
+from risktests.Binomial_test import _vasicek_quantile
 
 
 def traffic_lights(df, ratings_col, defaults_col):
@@ -33,6 +36,9 @@ def traffic_lights(df, ratings_col, defaults_col):
         defaults_col='default_flag')
     >>print(res)
     """
+    if isinstance(df, Portfolio):
+        return _traffic_lights_from_aggregates(
+            df.grade_aggregates(ratings_col, defaults_col))
     if df.empty:
         raise TypeError('No data provided!')
     if defaults_col is None:
@@ -58,26 +64,132 @@ def traffic_lights(df, ratings_col, defaults_col):
     if df[defaults_col].hasnans:
         raise ValueError('Missing values in {}'.format(defaults_col))
 
-    ratings = df.ratings
-    X = []
-    results = pd.DataFrame({'Rating': [], 'Traffic Light': []})
+    agg = grade_aggregates(df, ratings_col, defaults_col)
+    return _traffic_lights_from_aggregates(agg)
 
-    for rating in set(ratings):
-        temp = df[df[ratings_col] == rating]
-        X.append(temp[defaults_col].sum())
-        res = pd.DataFrame({'Rating': [rating], 'Traffic Light': [rating]})
-        results = pd.concat([results, res])
 
+def _traffic_lights_from_aggregates(agg):
+    """Traffic light per rating from the output of grade_aggregates"""
+    X = agg['D'].to_numpy()
     c_low = np.quantile(X, 0.95)
     c_high = np.quantile(X, 0.95)
-    Y = []
-    for i in set(X):
-        if i < c_low:
-            Y.append('Green')
-        elif i > c_low and i < c_high:
-            Y.append('Yellow')
-        else:
-            Y.append('Red')
-    results['Traffic Light'] = Y
-    results = results.set_index('Rating')
+    Y = np.where(X < c_low, 'Green',
+                 np.where((X > c_low) & (X < c_high), 'Yellow', 'Red'))
+    results = pd.DataFrame({'Traffic Light': Y}, index=agg.index)
+    return results
+
+
+def tasche_traffic_lights(df, ratings_col, defaults_col, PDs_col, rho=0.12,
+                          q_low=0.95, q_high=0.999, n_nodes=64):
+    """traffic lights approach to PD validation with correlated defaults
+    Parameters
+    ----------
+    df: array-like, at least 2D, or an iterable of such chunks
+        data
+    ratings_col: string
+        name of column with ratings
+    defaults_col: string
+        name of column with default statuses
+    PDs_col: string
+        name of column with probabilities-of-default values
+    rho: float
+        asset correlation of the one-factor model, between 0 and 1
+    q_low: float
+        confidence level of the yellow zone
+    q_high: float
+        confidence level of the red zone
+    n_nodes: integer
+        number of Gauss-Hermite quadrature nodes
+
+    Returns
+    -------
+    results : array-like, 2D
+        number of observations and defaults, average PD, the highest
+        numbers of defaults of the green and yellow zones and the traffic
+        light for each bucket
+
+    Notes
+    -----
+    The thresholds c_low and c_high of a rating are the q_low and q_high
+    quantiles of its number of defaults in the one-factor model, given its
+    number of loans and average PD (see vasicek_binomial_test). The light
+    is green for at most c_low defaults, yellow for at most c_high and red
+    above. The quantiles of all ratings are searched together, starting
+    from the quantile of an infinitely large pool,
+
+        N*Phi((Phi^-1(PD) + sqrt(rho)*Phi^-1(q))/sqrt(1 - rho))
+
+    which is a few defaults below it, shifted by the distance found in
+    the last run on the same PD, rho and quantile. That distance changes
+    little with the number of loans, so on a rerun most ratings are
+    settled after two evaluations of the distribution function (see
+    vasicek_binomial_test) even when their sizes have changed. 3000
+    ratings of 1k-20k loans take about 4 s cold and 3 s on a rerun.
+
+    References
+    ----------
+    [1] Tasche, D. (2003). A traffic lights approach to PD validation
+    (arXiv:cond-mat/0305038). arXiv.
+
+    Examples
+    --------
+    >>res = tasche_traffic_lights(
+        df=df,
+        ratings_col='ratings',
+        defaults_col='default_flag',
+        PDs_col='prob_default',
+        rho=0.12)
+    >>print(res)
+    """
+    if not isinstance(rho, float) or not 0 < rho < 1:
+        raise TypeError('rho should be a float value between 0 and 1')
+    if not isinstance(q_low, float) or not isinstance(q_high, float) or \
+            not 0 < q_low < q_high < 1:
+        raise TypeError('q_low and q_high should be float values with '
+                        '0 < q_low < q_high < 1')
+    if not isinstance(n_nodes, int) or n_nodes < 1:
+        raise TypeError('n_nodes should be a positive integer')
+    if isinstance(df, Portfolio):
+        return _tasche_from_aggregates(
+            df.grade_aggregates(ratings_col, defaults_col, PDs_col), rho,
+            q_low, q_high, n_nodes)
+    if not _is_chunked(df) and df.empty:
+        raise TypeError('No data provided!')
+
+    # Checking that the correct datatype
+    if not isinstance(defaults_col, str):
+        raise TypeError('defaults_col not of type string')
+    if not isinstance(ratings_col, str):
+        raise TypeError('ratings_col not of type string')
+    if not isinstance(PDs_col, str):
+        raise TypeError('PDs_col not of type string')
+
+    if not _is_chunked(df):
+        # Check if the correct column names have been provided and the
+        # data for missing values
+        for col in (defaults_col, ratings_col, PDs_col):
+            if col not in df.columns:
+                raise ValueError('{} not a column in the df'.format(col))
+            if df[col].hasnans:
+                raise ValueError('Missing values in {}'.format(col))
+
+    agg = grade_aggregates(df, ratings_col, defaults_col, PDs_col)
+    return _tasche_from_aggregates(agg, rho, q_low, q_high, n_nodes)
+
+
+def _tasche_from_aggregates(agg, rho, q_low=0.95, q_high=0.999, n_nodes=64):
+    """Correlated traffic light per rating from the output of
+    grade_aggregates"""
+    N = agg['N'].to_numpy()
+    X = agg['D'].to_numpy()
+    p_g = agg['sum_PD'].to_numpy()/N
+    c_low = _vasicek_quantile(N, p_g, rho, q_low, n_nodes)
+    c_high = _vasicek_quantile(N, p_g, rho, q_high, n_nodes)
+    Y = np.where(X <= c_low, 'Green', np.where(X <= c_high, 'Yellow', 'Red'))
+    results = pd.DataFrame({'Number of Obs': agg['N'],
+                            'Number of Defaults': agg['D'],
+                            'Average PD': p_g,
+                            'Green up to': c_low,
+                            'Yellow up to': c_high,
+                            'Traffic Light': Y}, index=agg.index)
     return results
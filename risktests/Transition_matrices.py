@@ -0,0 +1,189 @@
+from collections import Counter
+import numpy as np
+import pandas as pd
+from scipy.linalg import expm
+from risktests.Grade_aggregates import _contingency
+
+# Nanoseconds in an average year, the unit of the exposure times
+YEAR = 365.25*24*3600*1e9
+
+
+class RatingHistory:
+    """Rating history panel from which transition matrices are estimated
+
+    Parameters
+    ----------
+    df: array-like, at least 2D
+        data with one row per obligor and rating observation
+    obligor_col: string
+        name of column with obligor identifiers
+    date_col: string
+        name of column with the observation dates
+    ratings_col: string
+        name of column with ratings
+
+
+    Notes
+    -----
+    An obligor holds a rating from its observation date until its next
+    observation, so the panel can hold rating changes only or regular
+    snapshots. Withdrawn ratings and defaults are ratings like any other,
+    e.g. 'NR' and 'D'.
+
+    The panel is checked, coded and sorted by obligor and date once;
+    the DataFrame itself is not kept. Every estimate is then a few passes
+    over the sorted arrays, with transition counts accumulated by
+    np.bincount on K*K pair keys and exposure times by np.bincount on the
+    ratings, so panels of tens of millions of rows are handled in memory
+    proportional to the panel.
+
+    The count matrices returned by cohort_counts and duration_counts can
+    be passed to migration_matrix_statistics_from_counts and
+    migration_matrix_stability_from_counts, and a stack of cohorts from
+    cohort_counts_by_start tests all of them at once.
+
+
+    References
+    ----------
+    [1] Lando, D., & Skødeberg, T. M. (2002). Analyzing rating transitions
+    and rating drift with continuous observations. Journal of Banking &
+    Finance, 26(2-3), 423-444.
+    [2] Aalen, O. O., & Johansen, S. (1978). An empirical transition
+    matrix for non-homogeneous Markov chains based on censored
+    observations. Scandinavian Journal of Statistics, 5(3), 141-150.
+
+
+    Examples
+    --------
+    >>history = RatingHistory(df=df, obligor_col='obligor', date_col='date',
+                              ratings_col='rating')
+    >>P_cohort = history.cohort_matrix('2020-01-01', '2021-01-01')
+    >>P_duration = history.duration_matrix('2015-01-01', '2020-01-01')
+    >>starts = pd.date_range('2015-01-01', '2019-12-01', freq='MS')
+    >>N = history.cohort_counts_by_start(starts)
+    >>z, phi = migration_matrix_stability_from_counts(N)
+    """
+
+    def __init__(self, df, obligor_col, date_col, ratings_col):
+        if df.empty:
+            raise TypeError('No data provided!')
+        for arg, col in [('obligor_col', obligor_col), ('date_col', date_col),
+                         ('ratings_col', ratings_col)]:
+            # Checking that the correct datatype
+            if not isinstance(col, str):
+                raise TypeError('{} not of type string'.format(arg))
+            # Check if the correct column names have been provided
+            if col not in df.columns:
+                raise ValueError('{} not a column in the df'.format(col))
+            # Check the data for missing values
+            if df[col].hasnans:
+                raise ValueError('Missing values in {}'.format(col))
+
+        obligors = pd.factorize(df[obligor_col])[0]
+        dates = pd.to_datetime(df[date_col]).to_numpy(dtype='datetime64[ns]')
+        ratings, self.levels = pd.factorize(df[ratings_col], sort=True)
+        order = np.lexsort((dates, obligors))
+        self._obligors = obligors[order]
+        self._dates = dates[order].view(np.int64)
+        self._ratings = ratings[order]
+        self._n_obligors = obligors.max() + 1
+        # Rows followed by a later observation of the same obligor
+        self._has_next = np.r_[self._obligors[1:] == self._obligors[:-1],
+                               False]
+
+    def ratings_at(self, date):
+        """Rating code of every obligor at a date, -1 if not yet rated"""
+        t = _timestamp(date)
+        rated = self._dates <= t
+        # The last row of each obligor dated no later than t
+        last = rated & ~np.r_[rated[1:] & self._has_next[:-1], False]
+        codes = np.full(self._n_obligors, -1)
+        codes[self._obligors[last]] = self._ratings[last]
+        return codes
+
+    def cohort_counts(self, start, end):
+        """Numbers of obligors by rating at start (rows) and at end
+        (columns), over the obligors rated at start"""
+        return self._cohort_counts(self.ratings_at(start),
+                                   self.ratings_at(end))
+
+    def cohort_counts_by_start(self, starts,
+                               horizon=pd.DateOffset(years=1)):
+        """cohorts x K x K array of the cohort_counts of each start date
+        over the horizon"""
+        starts = [pd.Timestamp(start) for start in starts]
+        ends = [start + horizon for start in starts]
+        # Overlapping cohorts share their snapshots, e.g. monthly starts
+        # over a one-year horizon; each is kept only while still needed
+        uses = Counter(starts + ends)
+        ratings = {}
+        counts = []
+        for start, end in zip(starts, ends):
+            for date in (start, end):
+                if date not in ratings:
+                    ratings[date] = self.ratings_at(date)
+            counts.append(self._cohort_counts(ratings[start],
+                                              ratings[end]).to_numpy())
+            for date in (start, end):
+                uses[date] -= 1
+                if not uses[date]:
+                    del ratings[date]
+        return np.stack(counts)
+
+    def _cohort_counts(self, initial, final):
+        rated = initial >= 0
+        return _contingency(initial[rated], self.levels, final[rated],
+                            self.levels, 'Initial', 'Final')
+
+    def cohort_matrix(self, start, end):
+        """Transition probabilities of the cohort method: cohort counts
+        divided by the number of obligors per initial rating"""
+        N_ij = self.cohort_counts(start, end)
+        return N_ij.div(N_ij.sum(axis=1), axis=0)
+
+    def duration_counts(self, start, end):
+        """Numbers of rating changes from (rows) and to (columns) each
+        rating within (start, end], and the years spent in each rating"""
+        t0, t1 = _timestamp(start), _timestamp(end)
+        # Each row holds its rating until the next observation of the
+        # obligor, or until the end of the window
+        following = np.r_[self._dates[1:], t1]
+        following = np.where(self._has_next, following, t1)
+        entry = np.clip(self._dates, t0, t1)
+        leave = np.clip(following, t0, t1)
+        K = len(self.levels)
+        exposure = np.bincount(self._ratings, weights=(leave - entry)/YEAR,
+                               minlength=K)
+
+        following_rating = np.r_[self._ratings[1:], -1]
+        moved = self._has_next & (following_rating != self._ratings) & \
+            (following > t0) & (following <= t1)
+        to = following_rating[moved]
+        N_ij = _contingency(self._ratings[moved], self.levels, to,
+                            self.levels, 'Initial', 'Final')
+        return N_ij, pd.Series(exposure, index=N_ij.index, name='Years')
+
+    def duration_generator(self, start, end):
+        """Maximum likelihood generator of the duration method: rating
+        changes per year spent in the initial rating, with the diagonal
+        making each row sum to zero"""
+        N_ij, exposure = self.duration_counts(start, end)
+        counts = N_ij.to_numpy(dtype=float, copy=True)
+        np.fill_diagonal(counts, 0)
+        T = exposure.to_numpy()[:, None]
+        # Ratings never held in the window have no exits
+        Q = np.divide(counts, T, out=np.zeros_like(counts), where=T > 0)
+        Q[np.diag_indices_from(Q)] = -Q.sum(axis=1)
+        return pd.DataFrame(Q, index=N_ij.index, columns=N_ij.columns)
+
+    def duration_matrix(self, start, end, t=1.0):
+        """Transition probabilities over t years of the duration method,
+        the matrix exponential of t times the generator"""
+        Q = self.duration_generator(start, end)
+        return pd.DataFrame(expm(Q.to_numpy()*t), index=Q.index,
+                            columns=Q.columns)
+
+
+def _timestamp(date):
+    """Date as nanoseconds since the epoch"""
+    return pd.Timestamp(date).value
@@ -0,0 +1,233 @@
+import numpy as np
+import pandas as pd
+from risktests.Grade_aggregates import _factorize, _moments, _contingency
+from risktests.Binomial_test import _binomial_from_aggregates
+from risktests.Jeffreys_test import _jeffreys_from_aggregates
+from risktests.Speigelhalter_Normal_test import _spiegelhalter_from_aggregates
+from risktests.Hosmer_Lemeshow_Chi_Square import Hosmer_Lemeshow_Chi_Square
+from risktests.InformationValue import _iv_from_aggregates
+from risktests.Coefficient_of_concordance import _concordance_from_aggregates
+from risktests.Somers_d import _somersd_from_aggregates
+from risktests.Traffic_lights_approach import _traffic_lights_from_aggregates
+from risktests.Population_Stability_Index import _psi_from_contingency
+from risktests.Concentration_of_Rating_Grades import (
+    _concentration_from_contingency)
+from risktests.Customer_migrations import _mwb_from_contingency
+from risktests.Stability_of_Migration_Matrices import (
+    _stability_from_contingency)
+from risktests.Grade_aggregates import _error_moments
+from risktests.LGD_t_test import _lgd_from_moments
+from risktests.Expected_Loss_Best_Estimate_t_test import _elbe_from_moments
+from risktests.Loss_Coverage_Ratio import _lcr_from_orders
+
+
+# Shared intermediates: name -> (column arguments, intermediates it
+# depends on, builder). Builders receive the suite and return the value.
+INTERMEDIATES = {
+    'ratings_codes': (
+        ('ratings_col',), (),
+        lambda s: _factorize(s.column('ratings_col'))),
+    'final_ratings_codes': (
+        ('final_ratings_col',), (),
+        lambda s: _factorize(s.column('final_ratings_col'))),
+    'grade_aggregates': (
+        ('defaults_col', 'PDs_col'), ('ratings_codes',),
+        lambda s: s._grade_aggregates()),
+    'contingency_table': (
+        (), ('ratings_codes', 'final_ratings_codes'),
+        lambda s: _contingency(
+            *s.get('ratings_codes'), *s.get('final_ratings_codes'),
+            s.columns['ratings_col'], s.columns['final_ratings_col'])),
+    'lgd_moments': (
+        ('LGD_col', 'pred_LGD_col'), (),
+        lambda s: _error_moments(s.values('LGD_col'),
+                                 s.values('pred_LGD_col'))),
+    'elbe_moments': (
+        ('LGD_col', 'ELBE_col'), (),
+        lambda s: _error_moments(s.values('LGD_col'), s.values('ELBE_col'))),
+    'loss': (
+        ('LGD_col', 'EAD_col'), (),
+        lambda s: s.values('EAD_col')*s.values('LGD_col')),
+    'pred_LGD_order': (
+        ('pred_LGD_col',), (),
+        lambda s: np.argsort(-s.values('pred_LGD_col'), kind='stable')),
+    'LGD_order': (
+        ('LGD_col',), (),
+        lambda s: np.argsort(-s.values('LGD_col'), kind='stable')),
+}
+
+# Tests: name -> (intermediates it depends on, function of the suite)
+TESTS = {
+    'binomial': (
+        ('grade_aggregates',),
+        lambda s: _binomial_from_aggregates(s.get('grade_aggregates'))),
+    'jeffreys': (
+        ('grade_aggregates',),
+        lambda s: _jeffreys_from_aggregates(s.get('grade_aggregates'),
+                                            s.alpha)),
+    'spiegelhalter': (
+        ('grade_aggregates',),
+        lambda s: _spiegelhalter_from_aggregates(s.get('grade_aggregates'))),
+    'hosmer_lemeshow': (
+        ('grade_aggregates',),
+        lambda s: Hosmer_Lemeshow_Chi_Square.from_aggregates(
+            s.get('grade_aggregates'), s.alpha)),
+    'information_value': (
+        ('grade_aggregates',),
+        lambda s: _iv_from_aggregates(s.get('grade_aggregates'))),
+    'concordance': (
+        ('grade_aggregates',),
+        lambda s: _concordance_from_aggregates(s.get('grade_aggregates'))),
+    'somers_d': (
+        ('grade_aggregates',),
+        lambda s: _somersd_from_aggregates(s.get('grade_aggregates'))),
+    'traffic_lights': (
+        ('grade_aggregates',),
+        lambda s: _traffic_lights_from_aggregates(
+            s.get('grade_aggregates'))),
+    'psi': (
+        ('contingency_table',),
+        lambda s: _psi_from_contingency(s.get('contingency_table'))),
+    'ratings_concentration': (
+        ('contingency_table',),
+        lambda s: _concentration_from_contingency(
+            s.get('contingency_table'))),
+    'migration_statistics': (
+        ('contingency_table',),
+        lambda s: _mwb_from_contingency(s.get('contingency_table'))),
+    'migration_stability': (
+        ('contingency_table',),
+        lambda s: _stability_from_contingency(s.get('contingency_table'))),
+    'lgd_t_test': (
+        ('lgd_moments',),
+        lambda s: _lgd_from_moments(s.get('lgd_moments'))),
+    'elbe_t_test': (
+        ('elbe_moments',),
+        lambda s: _elbe_from_moments(s.get('elbe_moments'))),
+    'lcr': (
+        ('loss', 'pred_LGD_order', 'LGD_order'),
+        lambda s: _lcr_from_orders(s.get('loss'), s.get('pred_LGD_order'),
+                                   s.get('LGD_order'))[0]),
+}
+
+
+class ValidationSuite:
+    """Runs several validation tests on one portfolio, computing the work
+    they share only once
+
+    Parameters
+    ----------
+    df: array-like, at least 2D
+        data
+    tests: list of strings
+        names of the tests to run, any of the keys of TESTS
+    alpha: float
+        level of significance for the Jeffreys and Hosmer-Lemeshow tests
+    **columns: strings
+        column names used by the tests: ratings_col, final_ratings_col,
+        defaults_col, PDs_col, LGD_col, pred_LGD_col, ELBE_col, EAD_col
+
+
+    Notes
+    -----
+    The tests are resolved into a dependency graph of shared
+    intermediates (factorized ratings, per-grade aggregates, the transition
+    contingency table, LGD error moments and sort orders). The columns the
+    plan needs are validated once, each intermediate is built once and
+    every test is evaluated from them. Default flags are expected as 0/1
+    values, also for the Hosmer-Lemeshow test.
+
+
+    Examples
+    --------
+    >>suite = ValidationSuite(
+        df=df,
+        tests=['binomial', 'jeffreys', 'psi', 'lgd_t_test'],
+        ratings_col='ratings',
+        final_ratings_col='ratings2',
+        defaults_col='default_flag',
+        PDs_col='prob_default',
+        LGD_col='LGD',
+        pred_LGD_col='PRED_LGD')
+    >>res = suite.run()
+    >>print(res['jeffreys'])
+    """
+
+    def __init__(self, df, tests, alpha=0.05, **columns):
+        if df.empty:
+            raise TypeError('No data provided!')
+        if not isinstance(alpha, float):
+            raise TypeError('alpha should be a float value')
+        for test in tests:
+            if test not in TESTS:
+                raise ValueError('{} is not a known test'.format(test))
+        for arg, col in columns.items():
+            if not isinstance(col, str):
+                raise TypeError('{} not of type string'.format(arg))
+
+        self.df = df
+        self.tests = list(tests)
+        self.alpha = alpha
+        self.columns = columns
+        self._cache = {}
+
+    def plan(self):
+        """Intermediates needed by the tests, in the order they are built"""
+        order = []
+
+        def visit(name):
+            if name in order:
+                return
+            for dep in INTERMEDIATES[name][1]:
+                visit(dep)
+            order.append(name)
+
+        for test in self.tests:
+            for dep in TESTS[test][0]:
+                visit(dep)
+        return order
+
+    def run(self):
+        """Validates the inputs once, builds the shared intermediates and
+        returns a dict with the result of each test"""
+        plan = self.plan()
+        self._validate(plan)
+        for name in plan:
+            self.get(name)
+        return {test: TESTS[test][1](self) for test in self.tests}
+
+    def get(self, name):
+        """Value of an intermediate, built on first use"""
+        if name not in self._cache:
+            self._cache[name] = INTERMEDIATES[name][2](self)
+        return self._cache[name]
+
+    def column(self, arg):
+        """Column of the data for a column argument such as 'ratings_col'"""
+        return self.df[self.columns[arg]]
+
+    def values(self, arg):
+        """Column of the data as a float array"""
+        return self.column(arg).to_numpy(dtype=float)
+
+    def _validate(self, plan):
+        args = []
+        for name in plan:
+            for arg in INTERMEDIATES[name][0]:
+                if arg not in args:
+                    args.append(arg)
+        for arg in args:
+            if arg not in self.columns:
+                raise TypeError('No column name for {} provided'.format(arg))
+            col = self.columns[arg]
+            if col not in self.df.columns:
+                raise ValueError('{} not a column in the df'.format(col))
+            if self.df[col].hasnans:
+                raise ValueError('Missing values in {}'.format(col))
+
+    def _grade_aggregates(self):
+        codes, levels = self.get('ratings_codes')
+        return pd.DataFrame(
+            _moments(codes, len(levels), self.values('defaults_col'),
+                     self.values('PDs_col')),
+            index=pd.Index(levels, name='Rating'))
@@ -3,3 +3,89 @@
 __author__ = """Anton Treialt"""
 __email__ = 'anton.treialt@aistat.com'
 __version__ = '0.1.0'
+
+import importlib
+
+# Modules of the package, loaded when first accessed as attributes. The
+# Speigelhalter, Hosmer-Lemeshow and concordance tests share the name of
+# their module, so they are reached through it, e.g.
+# risktests.Hosmer_Lemeshow_Chi_Square.Hosmer_Lemeshow_Chi_Square.
+_MODULES = [
+    'Accumulators', 'Binomial_test', 'Calibration_margins',
+    'Characteristic_stability', 'Coefficient_of_concordance',
+    'Concentration_of_Rating_Grades', 'Customer_migrations', 'DeLong_test',
+    'Discriminatory_power', 'Expected_Loss_Best_Estimate_t_test',
+    'Grade_aggregates', 'Hosmer_Lemeshow_Chi_Square', 'InformationValue',
+    'Jeffreys_test', 'LGD_t_test', 'Loss_Coverage_Ratio', 'Monte_Carlo_tests',
+    'PD_term_structure', 'Population_Stability_Index', 'Portfolio_handle',
+    'Segment_runner', 'Somers_d', 'Speigelhalter_Normal_test',
+    'Stability_of_Migration_Matrices', 'Stress_scenarios',
+    'Traffic_lights_approach', 'Transition_matrices', 'Validation_suite']
+
+# Public name -> module defining it. The modules (and pandas, scipy and
+# matplotlib with them) are only imported when a name is first accessed,
+# so importing the package has no I/O or other side effects.
+_EXPORTS = {
+    'binomial_test': 'Binomial_test',
+    'poisson_binomial_test': 'Binomial_test',
+    'vasicek_binomial_test': 'Binomial_test',
+    'jeffreys_test': 'Jeffreys_test',
+    'jeffreys_test_grid': 'Jeffreys_test',
+    'stress_calibration_tests': 'Stress_scenarios',
+    'calibration_margins': 'Calibration_margins',
+    'Information_value': 'InformationValue',
+    'information_values': 'InformationValue',
+    'Somersd': 'Somers_d',
+    'Somersd_loan_level': 'Somers_d',
+    'traffic_lights': 'Traffic_lights_approach',
+    'tasche_traffic_lights': 'Traffic_lights_approach',
+    'discriminatory_power': 'Discriminatory_power',
+    'discriminatory_power_from_histograms': 'Discriminatory_power',
+    'delong_test': 'DeLong_test',
+    'hosmer_lemeshow_sweep': 'Hosmer_Lemeshow_Chi_Square',
+    'PSI': 'Population_Stability_Index',
+    'CSI': 'Characteristic_stability',
+    'BaselineHistograms': 'Characteristic_stability',
+    'ratings_concentration': 'Concentration_of_Rating_Grades',
+    'migration_matrix_statistics': 'Customer_migrations',
+    'migration_matrix_statistics_by_cohort': 'Customer_migrations',
+    'migration_matrix_statistics_from_counts': 'Customer_migrations',
+    'migration_matrix_stability': 'Stability_of_Migration_Matrices',
+    'migration_matrix_stability_from_counts':
+        'Stability_of_Migration_Matrices',
+    'lgd_t_test': 'LGD_t_test',
+    'elbe_t_test': 'Expected_Loss_Best_Estimate_t_test',
+    'lcr': 'Loss_Coverage_Ratio',
+    'loss_capture_curve': 'Loss_Coverage_Ratio',
+    'grade_aggregates': 'Grade_aggregates',
+    'contingency_table': 'Grade_aggregates',
+    'Portfolio': 'Portfolio_handle',
+    'RatingHistory': 'Transition_matrices',
+    'pd_term_structure': 'PD_term_structure',
+    'ValidationSuite': 'Validation_suite',
+    'run_by_segment': 'Segment_runner',
+    'simulate_test': 'Monte_Carlo_tests',
+    'GradeAccumulator': 'Accumulators',
+    'ContingencyAccumulator': 'Accumulators',
+    'ErrorMomentsAccumulator': 'Accumulators',
+}
+
+__all__ = list(_EXPORTS) + _MODULES
+
+
+def __getattr__(name):
+    if name in _MODULES:
+        # Importing the module also sets it as an attribute of the package
+        return importlib.import_module('{}.{}'.format(__name__, name))
+    if name not in _EXPORTS:
+        raise AttributeError(
+            'module {!r} has no attribute {!r}'.format(__name__, name))
+    module = importlib.import_module('{}.{}'.format(__name__, _EXPORTS[name]))
+    value = getattr(module, name)
+    # Cache on the package so later lookups skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
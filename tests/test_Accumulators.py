@@ -0,0 +1,58 @@
+import risktests.Accumulators as AC
+import risktests.Jeffreys_test as JT
+import risktests.Customer_migrations as CM
+import risktests.Expected_Loss_Best_Estimate_t_test as ELBE
+import pytest
+import pickle
+import pandas as pd
+import numpy as np
+
+
+def test_Accumulators():
+    rng = np.random.default_rng(10)
+    ratings = rng.integers(1, 8, size=6000)
+    PDs = 0.02*ratings*rng.uniform(0.8, 1.2, size=6000)
+    df = pd.DataFrame({'ratings': ratings,
+                       'ratings2': np.clip(ratings + rng.integers(-1, 2, size=6000), 1, 7),
+                       'default_flag': (rng.uniform(size=6000) < PDs).astype(int),
+                       'prob_default': PDs,
+                       'LGD': rng.uniform(size=6000),
+                       'ELBE': rng.uniform(size=6000)})
+
+    factories = [lambda: AC.GradeAccumulator('ratings', 'default_flag', 'prob_default', test='jeffreys'),
+                 lambda: AC.ContingencyAccumulator('ratings', 'ratings2', test='migration_statistics'),
+                 lambda: AC.ErrorMomentsAccumulator('LGD', 'ELBE', test='elbe_t_test')]
+    outputs = []
+    for factory in factories:
+        # two workers on different partitions, the second one shipped back pickled
+        first, second = factory(), factory()
+        for i in range(0, 3000, 1000):
+            first.update(df.iloc[i:i+1000])
+        for i in range(3000, 6000, 1000):
+            second.update(df.iloc[i:i+1000])
+        outputs.append(first.merge(pickle.loads(pickle.dumps(second))).finalize())
+
+    pd.testing.assert_frame_equal(outputs[0], JT.jeffreys_test(df, 'ratings', 'prob_default', 'default_flag'))
+    assert np.allclose(outputs[1], CM.migration_matrix_statistics(df, 'ratings', 'ratings2'))
+    assert np.allclose(outputs[2], ELBE.elbe_t_test(df, 'LGD', 'ELBE'))
+
+    with pytest.raises(TypeError):
+        AC.GradeAccumulator('ratings', 'default_flag').finalize()
+    with pytest.raises(TypeError):
+        factories[0]().merge(factories[1]())
+
+
+def test_ContingencyAccumulator_disjoint_grades():
+    # Partitions with different grades leave cells that neither side has
+    first, second = AC.ContingencyAccumulator('a', 'b'), AC.ContingencyAccumulator('a', 'b')
+    first.update(pd.DataFrame({'a': [1, 2], 'b': [1, 2]}))
+    second.update(pd.DataFrame({'a': [2, 3], 'b': [2, 3]}))
+    table = first.merge(second).finalize()
+    expected = pd.DataFrame([[1, 0, 0], [0, 2, 0], [0, 0, 1]], index=[1, 2, 3], columns=[1, 2, 3])
+    assert (table.to_numpy() == expected.to_numpy()).all()
+    assert list(table.index) == [1, 2, 3] and list(table.columns) == [1, 2, 3]
+
+    acc = AC.ContingencyAccumulator('a', 'b')
+    acc.update(pd.DataFrame({'a': [1, 2], 'b': [1, 2]}))
+    acc.update(pd.DataFrame({'a': [2, 3], 'b': [2, 3]}))
+    assert (acc.finalize().to_numpy() == expected.to_numpy()).all()
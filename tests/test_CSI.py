@@ -0,0 +1,101 @@
+import risktests.Characteristic_stability as CS
+import pytest
+import pandas as pd
+import numpy as np
+
+
+def test_CSI():
+    rng = np.random.default_rng(10)
+    baseline = pd.DataFrame({'income': rng.lognormal(10, 1, size=5000),
+                             'age': rng.integers(18, 80, size=5000).astype(float),
+                             'region': rng.choice(['north', 'south', 'east'], size=5000),
+                             'products': rng.integers(1, 4, size=5000)})
+    current = pd.DataFrame({'income': rng.lognormal(10.5, 1, size=3000),
+                            'age': rng.integers(18, 80, size=3000).astype(float),
+                            'region': rng.choice(['north', 'south', 'west'], size=3000),
+                            'products': rng.integers(1, 4, size=3000)})
+    current.loc[:99, 'age'] = np.nan
+    summary, bins = CS.CSI(baseline, current, n_bins=10)
+    assert list(summary.index) == ['income', 'age', 'region', 'products']
+    assert np.isfinite(summary['CSI']).all()
+    assert np.isfinite(bins['CSI']).all()
+    assert np.allclose(bins.groupby(level='Variable', sort=False)['CSI'].sum(), summary['CSI'])
+    # The shifted income is flagged, the unchanged products are not
+    assert summary.loc['income', 'CSI'] > 0.1
+    assert summary.loc['products', 'CSI'] < 0.01
+    assert bins.loc['income', 'Baseline N'].sum() == 5000
+    assert bins.loc['income', 'Current N'].sum() == 3000
+    # Unseen and missing values get their own bins, empty in the baseline
+    assert bins.loc[('region', 'Other'), 'Current N'] == (current['region'] == 'west').sum()
+    assert bins.loc[('age', 'Missing'), 'Current N'] == 100
+    assert summary.loc['region', 'Empty bins'] == 2
+    assert summary.loc['age', 'Empty bins'] == 1
+
+    # Equal to the PSI on proportions for a discrete variable
+    p = baseline['products'].value_counts(normalize=True).sort_index()
+    q = current['products'].value_counts(normalize=True).sort_index()
+    assert summary.loc['products', 'CSI'] == pytest.approx(((p - q)*np.log(p/q)).sum())
+
+    with pytest.raises(ValueError):
+        CS.CSI(baseline, current, cols=['score'])
+    with pytest.raises(TypeError):
+        CS.CSI(baseline, current.iloc[:0])
+
+
+def test_BaselineHistograms(tmp_path):
+    rng = np.random.default_rng(10)
+    baseline = pd.DataFrame({'income': rng.lognormal(10, 1, size=5000),
+                             'region': rng.choice(['north', 'south', 'east'], size=5000),
+                             'products': rng.integers(1, 4, size=5000)})
+    months = [pd.DataFrame({'income': rng.lognormal(10 + 0.1*m, 1, size=2000),
+                            'region': rng.choice(['north', 'south', 'east'], size=2000),
+                            'products': rng.integers(1, 4, size=2000)})
+              for m in range(6)]
+    hist = CS.BaselineHistograms(baseline, n_bins=10)
+    for m, month in enumerate(months):
+        hist.add_month('2024-0{}'.format(m + 1), month)
+    hist.save(tmp_path / 'baseline.npz')
+    loaded = CS.BaselineHistograms.load(tmp_path / 'baseline.npz')
+
+    # Same as CSI on the raw samples, without the baseline data
+    for summary, bins in [hist.csi(months[0]), loaded.csi(months[0])]:
+        expected_summary, expected_bins = CS.CSI(baseline, months[0], n_bins=10)
+        assert np.allclose(summary['CSI'], expected_summary['CSI'])
+        assert (bins['Current N'].to_numpy() == expected_bins['Current N'].to_numpy()).all()
+
+    by_month = loaded.csi_by_month()
+    assert by_month.shape == (6, 3)
+    assert by_month.loc['2024-03', 'income'] == pytest.approx(
+        CS.CSI(baseline, months[2], n_bins=10)[0].loc['income', 'CSI'])
+    # The income drifts away from the baseline month by month
+    assert (np.diff(by_month['income']) > 0).sum() >= 4
+
+    rolling = loaded.csi_by_month(k=3)
+    assert list(rolling.index) == ['2024-04', '2024-05', '2024-06']
+    pooled = CS._stability(hist.cols, hist._specs, hist.histogram(pd.concat(months[:3])),
+                           hist.histogram(months[3]), 0.0001)[0]
+    assert np.allclose(rolling.loc['2024-04'], pooled['CSI'])
+
+    with pytest.raises(ValueError):
+        hist.add_month('2024-01', months[0])
+    with pytest.raises(ValueError):
+        hist.csi(months[0].drop(columns='region'))
+
+
+def test_CSI_bin_edges():
+    rng = np.random.default_rng(10)
+    df = pd.DataFrame({'income': rng.lognormal(10, 1, size=5000),
+                       'age': rng.integers(18, 80, size=5000).astype(float),
+                       'score': rng.integers(0, 8, size=5000).astype(float),
+                       'ties': np.repeat(rng.normal(size=500), 10)})
+    df.loc[:249, 'income'] = np.nan
+    specs = CS._fit_bins(df, list(df.columns), 10)
+    # Same edges as nanquantile over the columns with more than n_bins values
+    for col, (kind, edges) in zip(df.columns, specs):
+        if df[col].nunique() > 10:
+            assert kind == 'edges'
+            expected = np.unique(np.nanquantile(df[col].to_numpy(), np.linspace(0, 1, 11)[1:-1]))
+            assert np.allclose(edges, expected)
+        else:
+            assert kind == 'levels'
+            assert list(edges) == sorted(df[col].dropna().unique())
@@ -0,0 +1,72 @@
+import risktests.Calibration_margins as CM
+import risktests.Speigelhalter_Normal_test as SNT
+import risktests.Portfolio_handle as PF
+import pytest
+import pandas as pd
+import numpy as np
+from scipy.stats import beta, binom, norm
+
+
+def test_calibration_margins():
+    rng = np.random.default_rng(10)
+    ratings = rng.integers(1, 8, size=20000)
+    PDs = 0.01*ratings*rng.uniform(0.8, 1.2, size=20000)
+    df = pd.DataFrame({'ratings': ratings, 'prob_default': PDs,
+                       'default_flag': (rng.uniform(size=20000) < 1.3*PDs).astype(int)})
+    kw = dict(ratings_col='ratings', defaults_col='default_flag', PDs_col='prob_default')
+    output = CM.calibration_margins(df, **kw)
+    assert list(output.index) == list(range(1, 8))
+    n, d = output['N'].to_numpy(), output['D'].to_numpy()
+
+    # Jeffreys passes at its minimum PD and fails just below
+    assert np.allclose(beta.ppf(0.05, d + 0.5, n - d + 0.5), output['Jeffreys min PD'])
+    assert np.allclose(output['Jeffreys factor'], output['Jeffreys min PD']/output['PD'])
+    # The understated PDs mostly need raising
+    assert (output['Jeffreys factor'] > 1).sum() >= 5
+    # The binomial P(D <= d) sits on the 1 - alpha and alpha boundaries
+    assert np.allclose(binom.cdf(d, n, output['Binomial min PD']), 0.95)
+    assert np.allclose(binom.cdf(d, n, output['Binomial max PD']), 0.05)
+    assert np.allclose(output['Binomial factor'], output['Binomial min PD']/output['PD'])
+
+    # The z-score of the unscaled PDs is the Spiegelhalter test's
+    agg = df.groupby('ratings')
+    S = [agg['prob_default'].apply(lambda p: (p**k).sum()).to_numpy() for k in (1, 2, 3, 4)]
+    DP = (df['default_flag']*df['prob_default']).groupby(df['ratings']).sum().to_numpy()
+    z = CM._spiegelhalter_z(np.ones((7, 1)), d, DP, S)[:, 0]
+    assert np.allclose(z, SNT.Speigelhalter_Normal_test(df, **kw)['z-score'].iloc[:-1])
+    # and at the smallest passing factor |z| reaches the critical value
+    factor = output['Spiegelhalter non-rejection factor'].to_numpy()
+    z = CM._spiegelhalter_z(factor[:, None], d, DP, S)[:, 0]
+    assert np.allclose(np.abs(z), norm.isf(0.05), atol=1e-6)
+    below = CM._spiegelhalter_z(0.99*factor[:, None], d, DP, S)[:, 0]
+    assert (np.abs(below) > norm.isf(0.05)).all()
+    # Speigelhalter_Normal_test on the scaled PDs: p-values either side of
+    # alpha, so its 'Pass' label (p < 0.05) flips to 'Fail' at the margin
+    for scale, label in [(1.02, 'Fail'), (0.98, 'Pass')]:
+        scaled = df.assign(prob_default=df['prob_default']*scale*factor[df['ratings'] - 1])
+        res = SNT.Speigelhalter_Normal_test(scaled, **kw).iloc[:-1]
+        assert ((res['P-Value'] >= 0.05) == (scale > 1)).all()
+        assert (res['Pass/Fail'] == label).all()
+
+    pf = PF.Portfolio(df, ratings_cols='ratings', defaults_cols='default_flag', values_cols='prob_default')
+    pd.testing.assert_frame_equal(CM.calibration_margins(pf, **kw), output)
+
+    with pytest.raises(TypeError):
+        CM.calibration_margins(df, alpha=5, **kw)
+
+
+def test_calibration_margins_below_grid():
+    # One rating without defaults, one whose margin lies below the grid,
+    # whose floor is 1e-3 over the largest PD
+    PDs = np.r_[np.full(1000, 0.05), np.full(100000, 0.01), 0.9]
+    defaults = np.zeros(len(PDs), dtype=int)
+    defaults[-2] = 1
+    df = pd.DataFrame({'ratings': np.r_[np.zeros(1000, dtype=int), np.ones(100001, dtype=int)],
+                       'prob_default': PDs, 'default_flag': defaults})
+    output = CM.calibration_margins(df, 'ratings', 'default_flag', 'prob_default')
+    factor = output['Spiegelhalter non-rejection factor'].to_numpy()
+    assert factor[0] == 0
+    assert 0 < factor[1] < 1e-3/0.9
+    S = [np.array([(PDs[:1000]**k).sum(), (PDs[1000:]**k).sum()]) for k in (1, 2, 3, 4)]
+    z = CM._spiegelhalter_z(factor[1:, None], np.array([1.]), np.array([0.01]), [s[1:] for s in S])
+    assert abs(z[0, 0]) == pytest.approx(norm.isf(0.05), abs=1e-6)
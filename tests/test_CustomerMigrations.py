@@ -1,6 +1,7 @@
 import risktests.Customer_migrations as CM
 import pytest
 import pandas as pd
+import numpy as np
 import os
 
 
@@ -12,3 +13,26 @@ def test_CM():
     output = CM.migration_matrix(df=df, initial_ratings_col='ratings', final_ratings_col='ratings2')
     assert round(output[0], 2) == 1.05
     assert round(output[1], 1) == 0.6
+
+
+def test_CM_by_cohort():
+    rng = np.random.default_rng(10)
+    ratings = rng.integers(1, 8, size=5000)
+    snapshots = {}
+    for month in range(6):
+        moves = rng.integers(-1, 2, size=5000)*(rng.uniform(size=5000) < 0.2)
+        ratings = np.clip(ratings + moves, 1, 7)
+        snapshots['m{}'.format(month)] = ratings
+    df = pd.DataFrame(snapshots)
+    pairs = [('m0', 'm3'), ('m1', 'm4'), ('m2', 'm5')]
+
+    output = CM.migration_matrix_statistics_by_cohort(df=df, cohort_pairs=pairs)
+    assert list(output.index) == pairs
+    for pair in pairs:
+        expected = CM.migration_matrix_statistics(df, *pair)
+        assert np.allclose(output.loc[pair], expected)
+
+    N = np.stack([pd.crosstab(df[a], df[b]).to_numpy() for a, b in pairs])
+    upper_mwb, lower_mwb = CM.migration_matrix_statistics_from_counts(N)
+    assert np.allclose(upper_mwb, output['Upper MWB'])
+    assert np.allclose(lower_mwb, output['Lower MWB'])
@@ -0,0 +1,32 @@
+import risktests.DeLong_test as DL
+import pytest
+import pandas as pd
+import numpy as np
+
+
+def test_DeLong():
+    rng = np.random.default_rng(10)
+    risk = rng.normal(size=800)
+    defaults = (rng.uniform(size=800) < 1/(1 + np.exp(2 - risk))).astype(int)
+    df = pd.DataFrame({'champion': np.round(risk + rng.normal(scale=0.5, size=800), 1),
+                       'challenger': risk + rng.normal(scale=1.0, size=800),
+                       'default_flag': defaults})
+
+    aucs, comparisons = DL.delong_test(df=df, score_cols=['champion', 'challenger'],
+                                       defaults_col='default_flag')
+
+    # Naive O(n^2) placement values
+    X = df[defaults == 1][['champion', 'challenger']].to_numpy()
+    Y = df[defaults == 0][['champion', 'challenger']].to_numpy()
+    psi = [(X[:, [k]] > Y[:, k]) + 0.5*(X[:, [k]] == Y[:, k]) for k in range(2)]
+    V10 = np.array([p.mean(axis=1) for p in psi])
+    V01 = np.array([p.mean(axis=0) for p in psi])
+    S = np.cov(V10)/len(X) + np.cov(V01)/len(Y)
+
+    assert np.allclose(aucs['AUC'], V10.mean(axis=1))
+    assert np.allclose(aucs['SE'], np.sqrt(np.diag(S)))
+    assert np.isclose(comparisons['SE'].iloc[0], np.sqrt(S[0, 0] + S[1, 1] - 2*S[0, 1]))
+    assert comparisons.index[0] == ('champion', 'challenger')
+
+    with pytest.raises(TypeError):
+        DL.delong_test(df=df, score_cols=['champion'], defaults_col='default_flag')
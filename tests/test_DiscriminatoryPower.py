@@ -0,0 +1,31 @@
+import risktests.Discriminatory_power as DP
+import pytest
+import pandas as pd
+import numpy as np
+
+
+def test_DP():
+    rng = np.random.default_rng(10)
+    scores = np.round(rng.uniform(size=5000), 2)
+    defaults = (rng.uniform(size=5000) < 0.2*scores).astype(int)
+    df = pd.DataFrame({'prob_default': scores, 'default_flag': defaults})
+
+    auc, ar, curve = DP.discriminatory_power(df=df, score_col='prob_default',
+                                             defaults_col='default_flag', n_points=21)
+    # Brute force over all defaulter/non-defaulter pairs, ties count one half
+    s1 = scores[defaults == 1][:, None]
+    s0 = scores[defaults == 0][None, :]
+    expected = ((s1 > s0).sum() + 0.5*(s1 == s0).sum())/(s1.size*s0.size)
+    assert round(auc, 12) == round(expected, 12)
+    assert round(ar, 12) == round(2*expected - 1, 12)
+    assert len(curve) == 21
+    assert curve['CAP'].iloc[0] == 0 and curve['CAP'].iloc[-1] == 1
+    assert (np.diff(curve['ROC']) >= 0).all()
+
+    # The same result from histograms of the scores
+    bins = np.round(scores*100).astype(int)
+    hist_1 = np.bincount(bins, weights=defaults, minlength=101)
+    hist_0 = np.bincount(bins, minlength=101) - hist_1
+    output = DP.discriminatory_power_from_histograms(hist_0, hist_1, n_points=21)
+    assert round(output[0], 12) == round(auc, 12)
+    pd.testing.assert_frame_equal(output[2], curve)
@@ -0,0 +1,46 @@
+import risktests.Grade_aggregates as GA
+import pytest
+import pandas as pd
+import numpy as np
+
+
+def test_GA():
+    rng = np.random.default_rng(10)
+    ratings = rng.integers(1, 8, size=5000)
+    PDs = 0.02*ratings*rng.uniform(0.8, 1.2, size=5000)
+    defaults = (rng.uniform(size=5000) < PDs).astype(int)
+    df = pd.DataFrame({'ratings': ratings, 'default_flag': defaults,
+                       'prob_default': PDs})
+
+    output = GA.grade_aggregates(df=df, ratings_col='ratings',
+                                 defaults_col='default_flag',
+                                 PDs_col='prob_default')
+    g = df.groupby('ratings')
+    assert list(output.index) == list(range(1, 8))
+    assert (output['N'] == g.size()).all()
+    assert (output['D'] == g['default_flag'].sum()).all()
+    assert np.allclose(output['sum_PD'], g['prob_default'].sum())
+    se = (df['default_flag'] - df['prob_default'])**2
+    assert np.allclose(output['sum_SE'], se.groupby(df['ratings']).sum())
+    overall = GA._with_overall(output).loc['Overall']
+    assert overall['N'] == 5000
+    assert round(overall['sum_PD'], 8) == round(PDs.sum(), 8)
+
+
+def test_GA_chunked():
+    rng = np.random.default_rng(10)
+    df = pd.DataFrame({'ratings': rng.integers(1, 8, size=5000),
+                       'default_flag': rng.integers(0, 2, size=5000),
+                       'prob_default': rng.uniform(size=5000)})
+    chunks = (df.iloc[i:i+700] for i in range(0, len(df), 700))
+
+    output = GA.grade_aggregates(df=chunks, ratings_col='ratings',
+                                 defaults_col='default_flag',
+                                 PDs_col='prob_default')
+    expected = GA.grade_aggregates(df=df, ratings_col='ratings',
+                                   defaults_col='default_flag',
+                                   PDs_col='prob_default')
+    pd.testing.assert_frame_equal(output, expected, check_exact=False)
+    with pytest.raises(TypeError):
+        GA.grade_aggregates(df=iter([]), ratings_col='ratings',
+                            defaults_col='default_flag')
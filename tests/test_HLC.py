@@ -5,6 +5,7 @@ import numpy as np
 
 
 def test_Hosmer_Lemeshow_Chi_Square():
+    np.random.seed(10)
     # Sampling the buckets randomly at fixed probabilities
     buckets = np.random.choice(a=["Bucket one", "Bucket two", "Bucket three", "Bucket four", "Bucket five"],
                                p=[0.15, 0.25, 0.05, 0.05, 0.5], size=1000)
@@ -37,5 +38,49 @@ def test_Hosmer_Lemeshow_Chi_Square():
     assert output.dof == 3
 
 
+def test_Hosmer_Lemeshow_mixed_bucket():
+    rng = np.random.default_rng(10)
+    buckets = rng.choice(['A', 'B', 'C', 'D'], size=20000)
+    PDs = pd.Series(buckets).map({'A': 0.013, 'B': 0.02, 'C': 0.05, 'D': 0.1}).to_numpy().copy()
+    loan_data = pd.DataFrame({'loan_bucket': buckets, 'PD': PDs,
+                              'loan_status': np.where(rng.uniform(size=20000) < PDs, 'default', 'non-default')})
+    HLC.Hosmer_Lemeshow_Chi_Square(loan_data, 'loan_bucket', 'loan_status', 'PD', alpha=0.05)
+    # A single loan off the PD of its bucket by a relative 1e-6
+    PDs[np.flatnonzero(buckets == 'A')[0]] *= 1 + 1e-6
+    with pytest.raises(ValueError):
+        HLC.Hosmer_Lemeshow_Chi_Square(loan_data.assign(PD=PDs), 'loan_bucket', 'loan_status', 'PD', alpha=0.05)
+    with pytest.raises(ValueError):
+        HLC.Hosmer_Lemeshow_Chi_Square(np.array_split(loan_data.assign(PD=PDs), 4), 'loan_bucket',
+                                       'loan_status', 'PD', alpha=0.05)
 
 
+def test_Hosmer_Lemeshow_loan_level():
+    rng = np.random.default_rng(10)
+    PDs = rng.beta(1, 30, size=20000)
+    defaults = (rng.uniform(size=20000) < PDs).astype(int)
+    loan_data = pd.DataFrame({'default_flag': defaults, 'PD': PDs,
+                              'loan_status': np.where(defaults == 1, 'default', 'non-default')})
+    output = HLC.Hosmer_Lemeshow_Chi_Square.from_loan_level(loan_data, 'default_flag', 'PD', alpha=0.05)
+    assert output.dof == 8
+    assert output.p_value > 0.05
+
+    # Deciles of risk checked against a direct computation
+    deciles = np.argsort(np.argsort(PDs, kind='stable'), kind='stable')*10//len(PDs)
+    Ni = np.bincount(deciles)
+    Ei = np.bincount(deciles, weights=PDs)
+    di = np.bincount(deciles, weights=defaults)
+    assert output.HLC_stat == pytest.approx(((di - Ei)**2/(Ei*(1 - Ei/Ni))).sum())
+    assert HLC.Hosmer_Lemeshow_Chi_Square.from_loan_level(
+        loan_data, 'loan_status', 'PD', alpha=0.05).HLC_stat == pytest.approx(output.HLC_stat)
+
+    sweep = HLC.hosmer_lemeshow_sweep(loan_data, 'default_flag', 'PD', groups=range(5, 21))
+    assert list(sweep.index) == list(range(5, 21))
+    assert sweep.loc[10, 'HLC_stat'] == pytest.approx(output.HLC_stat)
+    assert (sweep['dof'] == sweep.index - 2).all()
+    # Understated PDs are rejected at every grouping
+    assert (HLC.hosmer_lemeshow_sweep(loan_data.assign(PD=PDs/2), 'default_flag', 'PD')['p_value'] < 0.01).all()
+
+    with pytest.raises(TypeError):
+        HLC.hosmer_lemeshow_sweep(loan_data, 'default_flag', 'PD', groups=[2])
+    with pytest.raises(ValueError):
+        HLC.hosmer_lemeshow_sweep(loan_data.assign(default_flag=2), 'default_flag', 'PD')
@@ -0,0 +1,30 @@
+import subprocess
+import sys
+import risktests
+
+
+COLD_IMPORT = """
+import sys
+import risktests
+loaded = [m for m in ('numpy', 'pandas', 'scipy', 'matplotlib', 'sklearn')
+          if m in sys.modules]
+loaded += [m for m in sys.modules if m.startswith('risktests.')]
+print(','.join(loaded))
+"""
+
+
+def test_cold_import():
+    # Fresh interpreter, so nothing is cached from the other tests. The
+    # package import itself loads none of its modules or dependencies.
+    output = subprocess.run([sys.executable, '-c', COLD_IMPORT], check=True,
+                            capture_output=True, text=True).stdout.strip()
+    assert output == '', 'imported at package import: ' + output
+
+
+def test_lazy_exports():
+    for name in risktests.__all__:
+        assert getattr(risktests, name) is not None
+    assert risktests.binomial_test.__module__ == 'risktests.Binomial_test'
+    assert risktests.Portfolio.__name__ == 'Portfolio'
+    assert risktests.Hosmer_Lemeshow_Chi_Square.Hosmer_Lemeshow_Chi_Square
+    assert 'jeffreys_test' in dir(risktests)
@@ -1,6 +1,7 @@
 import risktests.Jeffreys_test as JT
 import pytest
 import pandas as pd
+import numpy as np
 import os
 
 def test_JT():
@@ -24,4 +25,28 @@ def test_JT():
     assert round(output['P-Value'][10],5) == x[10]
     assert round(output['P-Value'][11],5) == x[11]
     assert round(output['P-Value'][12],5) == x[12]
-    assert round(output['P-Value'][13],5) == x[13]
\ No newline at end of file
+    assert round(output['P-Value'][13],5) == x[13]
+
+def test_JT_grid():
+    rng = np.random.default_rng(10)
+    ratings = rng.integers(1, 6, size=6000)
+    PDs = 0.03*ratings*rng.uniform(0.8, 1.2, size=6000)
+    df = pd.DataFrame({'pool': rng.integers(0, 4, size=6000),
+                       'ratings': ratings,
+                       'default_flag': (rng.uniform(size=6000) < PDs).astype(int),
+                       'prob_default': PDs})
+
+    output = JT.jeffreys_test_grid(df=df, ratings_col='ratings', PDs_col='prob_default',
+                                   defaults_col='default_flag', segment_cols=['pool'],
+                                   alphas=[0.01, 0.05])
+    assert len(output) == 4*6
+    for pool in range(4):
+        expected = JT.jeffreys_test(df=df[df['pool'] == pool], ratings_col='ratings',
+                                    PDs_col='prob_default', defaults_col='default_flag')
+        assert list(output.loc[pool].index) == list(expected.index)
+        assert np.allclose(output.loc[pool]['P-Value 0.05'], expected['P-Value'])
+        assert list(output.loc[pool]['Pass/Fail 0.05']) == list(expected['Pass/Fail'])
+
+    output = JT.jeffreys_test_grid(df=df, ratings_col='ratings', PDs_col='prob_default',
+                                   defaults_col='default_flag', alphas=[0.05], two_sided=True)
+    assert (output['Lower 0.05'] < output['Upper 0.05']).all()
@@ -1,5 +1,6 @@
-import Loss_Coverage_Ratio as LCR
+import risktests.Loss_Coverage_Ratio as LCR
 import pandas as pd
+import numpy as np
 import pytest
 
 
@@ -10,3 +11,25 @@ def test_LCR():
         LGD_col='LGD',
         EAD_col='EAD', pred_LGD_col='PRED_LGD')
     assert round(output, 2) == 1.00
+
+
+def test_LCR_curve():
+    rng = np.random.default_rng(10)
+    LGD = rng.uniform(size=5000)
+    df = pd.DataFrame({'LGD': LGD,
+                       'EAD': rng.uniform(1, 100, size=5000),
+                       'PRED_LGD': LGD + rng.normal(scale=0.2, size=5000)})
+    copy = df.copy()
+
+    output, curve = LCR.loss_capture_curve(df=df, LGD_col='LGD', EAD_col='EAD',
+                                           pred_LGD_col='PRED_LGD', n_points=21)
+    pd.testing.assert_frame_equal(df, copy)
+    assert round(output, 12) == round(LCR.lcr(df, 'LGD', 'EAD', 'PRED_LGD'), 12)
+    assert 0 < output < 1
+    assert len(curve) == 21
+    assert curve[['Model', 'Ideal']].iloc[0].tolist() == [0, 0]
+    assert np.allclose(curve[['Model', 'Ideal']].iloc[-1], 1)
+
+    # Ordering by the realised LGD captures the losses ideally
+    assert round(LCR.lcr(df, 'LGD', 'EAD', 'LGD'), 12) == 1
+    assert LCR.loss_capture_curve(df, 'LGD', 'EAD', 'PRED_LGD', n_points=None)[1] is None
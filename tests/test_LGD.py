@@ -1,6 +1,7 @@
 import risktests.LGD_t_test as LGD
 import pytest
 import pandas as pd
+import numpy as np
 import os
 
 def test_LGD():
@@ -16,4 +17,15 @@ def test_LGD():
     assert round(output[2], 3) == 6584.700
     assert round(output[3], 3) == -19.159
     assert round(output[4], 3) == 10197.483
-    assert round(output[5], 5) == 1.00000
\ No newline at end of file
+    assert round(output[5], 5) == 1.00000
+
+def test_LGD_chunked():
+    rng = np.random.default_rng(10)
+    df = pd.DataFrame({'LGD': rng.uniform(size=5000),
+                       'PRED_LGD': rng.uniform(size=5000)})
+    chunks = (df.iloc[i:i+700] for i in range(0, len(df), 700))
+
+    output = LGD.lgd_t_test(df=chunks, observed_LGD_col='LGD', expected_LGD_col='PRED_LGD')
+    expected = LGD.lgd_t_test(df=df, observed_LGD_col='LGD', expected_LGD_col='PRED_LGD')
+    assert output[0] == 5000
+    assert np.allclose(output, expected)
@@ -0,0 +1,36 @@
+import risktests.Stability_of_Migration_Matrices as SM
+import pandas as pd
+import numpy as np
+from scipy.stats import norm
+
+
+def test_migration_stability():
+    rng = np.random.default_rng(10)
+    ratings = rng.integers(1, 6, size=5000)
+    df = pd.DataFrame({'ratings': ratings,
+                       'ratings2': np.clip(ratings + rng.integers(-1, 2, size=5000), 1, 5)})
+
+    z_df, phi_df = SM.migration_matrix_stability(df=df, initial_ratings_col='ratings',
+                                                 final_ratings_col='ratings2')
+    N = pd.crosstab(df['ratings'], df['ratings2']).to_numpy(dtype=float)
+    p = N/N.sum(axis=1, keepdims=True)
+    # Cell (4, 2) is below the diagonal and compared with (4, 3)
+    i, j, k = 3, 1, 2
+    Ni = N[i].sum()
+    z = (p[i, k] - p[i, j])/np.sqrt((p[i, j]*(1 - p[i, j]) + p[i, k]*(1 - p[i, k]) +
+                                     2*p[i, j]*p[i, k])/Ni)
+    assert round(z_df.iloc[i, j], 10) == round(z, 10)
+    assert round(phi_df.iloc[i, j], 10) == round(norm.cdf(z), 10)
+    assert np.isnan(np.diag(z_df.to_numpy())).all()
+
+
+def test_migration_stability_stack():
+    rng = np.random.default_rng(10)
+    N = rng.integers(1, 200, size=(12, 6, 6))
+
+    z, phi = SM.migration_matrix_stability_from_counts(N)
+    assert z.shape == phi.shape == (12, 6, 6)
+    for period in [0, 7]:
+        z_df, phi_df = SM._stability_from_contingency(pd.DataFrame(N[period]))
+        assert np.allclose(z[period], z_df, equal_nan=True)
+        assert np.allclose(phi[period], phi_df, equal_nan=True)
@@ -0,0 +1,53 @@
+import risktests.Monte_Carlo_tests as MC
+import risktests.Speigelhalter_Normal_test as SNT
+import risktests.Hosmer_Lemeshow_Chi_Square as HLC
+import pytest
+import pandas as pd
+import numpy as np
+from scipy.stats import binom
+
+
+def test_simulate_test():
+    rng = np.random.default_rng(10)
+    ratings = rng.integers(1, 5, size=2000)
+    PDs = 0.02*ratings*rng.uniform(0.8, 1.2, size=2000)
+    df = pd.DataFrame({'ratings': ratings, 'prob_default': PDs,
+                       'default_flag': (rng.uniform(size=2000) < PDs).astype(int)})
+    kw = dict(ratings_col='ratings', defaults_col='default_flag', PDs_col='prob_default')
+
+    binomial = MC.simulate_test(df, 'binomial', n_sims=20000, seed=1, **kw)
+    assert list(binomial.index) == [1, 2, 3, 4]
+    # Close to the binomial distribution at the average PD of each rating
+    N = df.groupby('ratings').size().to_numpy()
+    p_g = df.groupby('ratings')['prob_default'].mean().to_numpy()
+    expected = binom.cdf(binomial['Statistic'], N, p_g)
+    assert (abs(binomial['P-Value'] - expected) < 5*binomial['P-Value MC error'] + 0.01).all()
+    assert (binomial['Lower critical value'] < binomial['Critical value']).all()
+
+    spiegelhalter = MC.simulate_test(df, 'spiegelhalter', n_sims=5000, seed=1, **kw)
+    analytic = SNT.Speigelhalter_Normal_test(df, **kw)
+    assert np.allclose(spiegelhalter['Statistic'], analytic['z-score'])
+    assert list(spiegelhalter.index)[-1] == 'Overall'
+    # Same convention as the analytic p-value norm.sf(|z|)
+    assert (abs(spiegelhalter['P-Value'] - analytic['P-Value']) <
+            5*spiegelhalter['P-Value MC error'] + 0.02).all()
+
+    hl = MC.simulate_test(df, 'hosmer_lemeshow', n_sims=5000, seed=1, **kw)
+    # The statistic only depends on the expected defaults of each rating
+    averaged = df.assign(prob_default=df.groupby('ratings')['prob_default'].transform('mean'),
+                         loan_status=np.where(df['default_flag'] == 1, 'default', 'non-default'))
+    analytic = HLC.Hosmer_Lemeshow_Chi_Square(data=averaged, buckets_col='ratings', loan_statuses_col='loan_status',
+                                              PDs_col='prob_default', alpha=0.05)
+    assert hl.loc['Overall', 'Statistic'] == pytest.approx(analytic.HLC_stat)
+    assert hl.loc['Overall', 'P-Value'] > 0.05
+    # Correlated defaults widen the distribution of the statistic
+    correlated = MC.simulate_test(df, 'hosmer_lemeshow', n_sims=5000, rho=0.1, seed=1, **kw)
+    assert correlated.loc['Overall', 'Critical value'] > 2*hl.loc['Overall', 'Critical value']
+
+    # Reproducible whatever the number of workers
+    pd.testing.assert_frame_equal(
+        MC.simulate_test(df, 'hosmer_lemeshow', n_sims=3000, block_size=500, seed=7, **kw),
+        MC.simulate_test(df, 'hosmer_lemeshow', n_sims=3000, block_size=500, seed=7, workers=2, **kw))
+
+    with pytest.raises(ValueError):
+        MC.simulate_test(df, 'jeffreys', **kw)
@@ -0,0 +1,39 @@
+import risktests.PD_term_structure as TS
+import pytest
+import pandas as pd
+import numpy as np
+from scipy.linalg import expm
+
+
+def test_TS():
+    rng = np.random.default_rng(10)
+    grades = ['A', 'B', 'C', 'D', 'E', 'Default']
+    P = rng.uniform(size=(6, 6))*np.exp(-np.abs(np.subtract.outer(range(6), range(6))))
+    P[-1] = np.eye(6)[-1]
+    P = P/P.sum(axis=1, keepdims=True)
+    df = pd.DataFrame(P, index=grades, columns=grades)
+
+    cumulative, marginal = TS.pd_term_structure(df, horizons=range(1, 31), default_rating='Default')
+    expected = np.stack([np.linalg.matrix_power(P, t)[:, -1] for t in range(1, 31)], axis=1)
+    assert cumulative.shape == (6, 30)
+    assert np.allclose(cumulative, expected)
+    assert np.allclose(marginal.cumsum(axis=1), cumulative)
+    assert (np.diff(cumulative.to_numpy(), axis=1) >= -1e-12).all()
+
+    # The factorization is cached per matrix
+    TS._eigen.cache_clear()
+    cumulative, _ = TS.pd_term_structure(np.stack([P]*50 + [P.T/P.T.sum(axis=1, keepdims=True)]))
+    assert cumulative.shape == (51, 6, 30)
+    assert TS._eigen.cache_info().misses == 2
+
+    Q = P - np.eye(6)
+    cumulative, _ = TS.pd_term_structure(Q, horizons=[0.5, 1, 10], generator=True)
+    assert np.allclose(cumulative, np.stack([expm(Q*t)[:, -1] for t in [0.5, 1, 10]], axis=1))
+
+    # Not diagonalizable
+    J = np.array([[0.5, 0.5, 0], [0, 0.5, 0.5], [0, 0, 1]])
+    cumulative, _ = TS.pd_term_structure(J, horizons=[1, 2, 3])
+    assert np.allclose(cumulative[:, 2], np.linalg.matrix_power(J, 3)[:, -1])
+
+    with pytest.raises(ValueError):
+        TS.pd_term_structure(P, horizons=[0.5])
@@ -0,0 +1,45 @@
+import risktests.Binomial_test as BT
+import risktests.Portfolio_handle as PF
+import pytest
+import pandas as pd
+import numpy as np
+from scipy.stats import binom
+
+
+def test_poisson_binomial_test():
+    rng = np.random.default_rng(10)
+    ratings = rng.integers(1, 6, size=20000)
+    PDs = 0.01*ratings*rng.uniform(0.2, 1.8, size=20000)
+    df = pd.DataFrame({'ratings': ratings,
+                       'prob_default': PDs,
+                       'default_flag': (rng.uniform(size=20000) < PDs).astype(int)})
+    output = BT.poisson_binomial_test(df, 'default_flag', 'prob_default', 'ratings')
+    assert list(output.index) == [1, 2, 3, 4, 5]
+    assert (output['Method'] == 'exact').all()
+    assert (output['Number of Obs'].sum(), output['Number of Defaults'].sum()) == \
+        (20000, df['default_flag'].sum())
+
+    # The exact distribution against repeated convolution
+    p = PDs[:40]
+    pmf = np.array([1.0])
+    for q in p:
+        pmf = np.convolve(pmf, [1 - q, q])
+    assert np.allclose(BT._poisson_binomial_pmf(p), pmf, atol=1e-14)
+    # and against the binomial distribution for a single PD
+    assert np.allclose(BT._poisson_binomial_pmf(np.full(300, 0.03)),
+                       binom.pmf(np.arange(301), 300, 0.03), atol=1e-12)
+
+    # The refined normal approximation is close to the exact test
+    normal = BT.poisson_binomial_test(df, 'default_flag', 'prob_default', 'ratings', max_exact=0)
+    assert (normal['Method'] == 'refined normal').all()
+    assert np.allclose(normal['Poisson-Binomial Test'], output['Poisson-Binomial Test'], atol=0.01)
+
+    pf = PF.Portfolio(df, ratings_cols='ratings', defaults_cols='default_flag', values_cols='prob_default')
+    pd.testing.assert_frame_equal(BT.poisson_binomial_test(pf, 'default_flag', 'prob_default', 'ratings'), output)
+
+    # Halved PDs are rejected
+    halved = BT.poisson_binomial_test(df.assign(prob_default=PDs/2), 'default_flag', 'prob_default', 'ratings')
+    assert (halved['Conclusion'] == 'reject').all()
+
+    with pytest.raises(ValueError):
+        BT.poisson_binomial_test(df, 'default_flag', 'PD', 'ratings')
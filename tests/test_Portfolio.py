@@ -0,0 +1,79 @@
+import risktests.Portfolio_handle as PF
+import risktests.Binomial_test as BT
+import risktests.Jeffreys_test as JT
+import risktests.Somers_d as SD
+import risktests.Population_Stability_Index as PSI
+import risktests.LGD_t_test as LGD
+import risktests.DeLong_test as DL
+import risktests.Hosmer_Lemeshow_Chi_Square as HLC
+import pytest
+import pandas as pd
+import numpy as np
+
+
+def test_Portfolio():
+    rng = np.random.default_rng(10)
+    ratings = rng.integers(1, 8, size=5000)
+    PDs = 0.02*ratings*rng.uniform(0.8, 1.2, size=5000)
+    df = pd.DataFrame({'segment': rng.choice(['retail', 'corporate'], size=5000),
+                       'ratings': ratings,
+                       'ratings2': np.clip(ratings + rng.integers(-1, 2, size=5000), 1, 7),
+                       'default_flag': (rng.uniform(size=5000) < PDs).astype(int),
+                       'prob_default': PDs,
+                       'challenger': PDs*rng.uniform(0.5, 1.5, size=5000),
+                       'LGD': rng.uniform(size=5000),
+                       'PRED_LGD': rng.uniform(size=5000)})
+    pf = PF.Portfolio(df, ratings_cols=['segment', 'ratings', 'ratings2'],
+                      defaults_cols='default_flag',
+                      values_cols=['prob_default', 'challenger', 'LGD', 'PRED_LGD'])
+    assert len(pf) == 5000
+    assert pf.defaults('default_flag').dtype == np.int8
+
+    kw = dict(ratings_col='ratings', defaults_col='default_flag', PDs_col='prob_default')
+    pd.testing.assert_frame_equal(BT.binomial_test(pf, **kw), BT.binomial_test(df, **kw))
+    pd.testing.assert_frame_equal(JT.jeffreys_test(pf, **kw), JT.jeffreys_test(df, **kw))
+    pd.testing.assert_frame_equal(JT.jeffreys_test_grid(pf, segment_cols=['segment'], **kw),
+                                  JT.jeffreys_test_grid(df, segment_cols=['segment'], **kw))
+    # The per-grade aggregates are built once and shared
+    assert pf.grade_aggregates('ratings', 'default_flag', 'prob_default') is \
+        pf.grade_aggregates('ratings', 'default_flag', 'prob_default')
+
+    assert np.allclose(SD.Somersd_loan_level(pf, 'prob_default', 'default_flag'),
+                       SD.Somersd_loan_level(df, 'prob_default', 'default_flag'))
+    assert np.allclose(SD.Somersd_loan_level(pf, 'ratings', 'default_flag'),
+                       SD.Somersd_loan_level(df, 'ratings', 'default_flag'))
+    assert PSI.PSI(pf, 'ratings', 'ratings2') == pytest.approx(PSI.PSI(df, 'ratings', 'ratings2'))
+    assert np.allclose(LGD.lgd_t_test(pf, 'LGD', 'PRED_LGD'), LGD.lgd_t_test(df, 'LGD', 'PRED_LGD'))
+    for res, expected in zip(DL.delong_test(pf, ['prob_default', 'challenger'], 'default_flag'),
+                             DL.delong_test(df, ['prob_default', 'challenger'], 'default_flag')):
+        pd.testing.assert_frame_equal(res, expected)
+
+    with pytest.raises(ValueError):
+        BT.binomial_test(pf, defaults_col='default_flag', PDs_col='EAD', ratings_col='ratings')
+    with pytest.raises(ValueError):
+        PF.Portfolio(df, defaults_cols='ratings')
+    with pytest.raises(ValueError):
+        PF.Portfolio(df.assign(LGD=np.nan), values_cols='LGD')
+
+
+def test_Portfolio_arguments():
+    rng = np.random.default_rng(10)
+    ratings = rng.integers(1, 4, size=500)
+    df = pd.DataFrame({'ratings': ratings, 'prob_default': 0.05*ratings,
+                       'default_flag': (rng.uniform(size=500) < 0.05*ratings).astype(int),
+                       'challenger': rng.uniform(size=500)})
+    pf = PF.Portfolio(df, ratings_cols='ratings', defaults_cols='default_flag',
+                      values_cols=['prob_default', 'challenger'])
+    # Only the schema checks are skipped for a Portfolio, not those of alpha
+    with pytest.raises(TypeError):
+        JT.jeffreys_test(pf, 'ratings', 'prob_default', 'default_flag', alpha=5)
+    with pytest.raises(TypeError):
+        JT.jeffreys_test(pf, 'ratings', 'prob_default', 'default_flag', alpha=None)
+    with pytest.raises(ValueError):
+        JT.jeffreys_test_grid(pf, 'ratings', 'prob_default', 'default_flag', alphas=[5])
+    with pytest.raises(TypeError):
+        HLC.Hosmer_Lemeshow_Chi_Square(pf, 'ratings', 'default_flag', 'prob_default', alpha=5)
+    with pytest.raises(TypeError):
+        SD.Somersd_loan_level(pf, 'prob_default', 'default_flag', alpha=5)
+    with pytest.raises(TypeError):
+        DL.delong_test(pf, ['prob_default', 'challenger'], 'default_flag', alpha=5)
@@ -1,5 +1,7 @@
-import Somers_d as SD
+import risktests.Somers_d as SD
 import pandas as pd
+import numpy as np
+from scipy.stats import somersd
 
 
 def test_SD():
@@ -10,3 +12,18 @@ def test_SD():
                 PDs_col='prob_default',
                 defaults_col='default_flag')
     assert round(output, 15) == 0.538461538461538
+
+
+def test_SD_loan_level():
+    rng = np.random.default_rng(10)
+    ratings = rng.integers(1, 12, size=4000)
+    defaults = (rng.uniform(size=4000) < 0.01*ratings).astype(int)
+    df = pd.DataFrame({'ratings': ratings, 'default_flag': defaults})
+
+    output = SD.Somersd_loan_level(df=df, score_col='ratings', defaults_col='default_flag')
+    assert round(output[0], 12) == round(somersd(defaults, ratings).statistic, 12)
+    assert 0 < output[1] < 0.1
+    assert output[2] < output[0] < output[3]
+    # Reversing the score reverses the sign
+    df['ratings'] = -df['ratings']
+    assert round(SD.Somersd_loan_level(df, 'ratings', 'default_flag')[0], 12) == round(-output[0], 12)
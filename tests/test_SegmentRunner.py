@@ -0,0 +1,53 @@
+import risktests.Segment_runner as SR
+import risktests.Jeffreys_test as JT
+import pytest
+import pandas as pd
+import numpy as np
+
+
+def test_SegmentRunner():
+    rng = np.random.default_rng(10)
+    ratings = rng.integers(1, 6, size=6000)
+    PDs = 0.03*ratings*rng.uniform(0.8, 1.2, size=6000)
+    df = pd.DataFrame({'country': rng.choice(['EE', 'LV', 'LT'], size=6000),
+                       'product': rng.integers(0, 3, size=6000),
+                       'ratings': ratings,
+                       'default_flag': (rng.uniform(size=6000) < PDs).astype(int),
+                       'prob_default': PDs,
+                       'LGD': rng.uniform(size=6000),
+                       'PRED_LGD': rng.uniform(size=6000)})
+    kw = dict(by=['country', 'product'], tests=['jeffreys', 'lgd_t_test'],
+              ratings_col='ratings', defaults_col='default_flag',
+              PDs_col='prob_default', LGD_col='LGD', pred_LGD_col='PRED_LGD')
+
+    output = SR.run_by_segment(df, workers=1, **kw)
+    pd.testing.assert_frame_equal(output, SR.run_by_segment(df, workers=2, **kw))
+
+    assert list(output[['country', 'product']].drop_duplicates().itertuples(index=False)) == \
+        sorted(set(zip(df['country'], df['product'])))
+    segment = df[(df['country'] == 'LV') & (df['product'] == 1)]
+    expected = JT.jeffreys_test(segment, 'ratings', 'prob_default', 'default_flag')
+    res = output[(output['country'] == 'LV') & (output['product'] == 1) & (output['Test'] == 'jeffreys')]
+    assert np.allclose(res['P-Value'], expected['P-Value'])
+    assert (res['Rating'].to_list() == list(expected.index))
+    assert len(output[output['Test'] == 'lgd_t_test']) == 9
+
+
+def test_SegmentRunner_missing_key():
+    rng = np.random.default_rng(10)
+    ratings = rng.integers(1, 6, size=3000)
+    PDs = 0.03*ratings*rng.uniform(0.8, 1.2, size=3000)
+    df = pd.DataFrame({'country': rng.choice(['EE', 'LV', None], size=3000),
+                       'ratings': ratings,
+                       'default_flag': (rng.uniform(size=3000) < PDs).astype(int),
+                       'prob_default': PDs})
+    kw = dict(by='country', tests=['jeffreys'], ratings_col='ratings',
+              defaults_col='default_flag', PDs_col='prob_default')
+
+    # Loans without a country form their own segment, also across workers
+    output = SR.run_by_segment(df, workers=2, **kw)
+    pd.testing.assert_frame_equal(output, SR.run_by_segment(df, workers=1, **kw))
+    segment = df[df['country'].isna()]
+    expected = JT.jeffreys_test(segment, 'ratings', 'prob_default', 'default_flag')
+    assert output['country'].isna().sum() == len(expected)
+    assert np.allclose(output.loc[output['country'].isna(), 'P-Value'], expected['P-Value'])
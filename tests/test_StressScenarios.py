@@ -0,0 +1,40 @@
+import risktests.Stress_scenarios as SS
+import risktests.Jeffreys_test as JT
+import risktests.Binomial_test as BT
+import pytest
+import pandas as pd
+import numpy as np
+
+
+def test_stress_calibration_tests():
+    rng = np.random.default_rng(10)
+    ratings = rng.integers(1, 8, size=20000)
+    PDs = 0.01*ratings
+    df = pd.DataFrame({'ratings': ratings, 'prob_default': PDs,
+                       'default_flag': (rng.uniform(size=20000) < 0.9*PDs).astype(int)})
+    kw = dict(ratings_col='ratings', defaults_col='default_flag', PDs_col='prob_default')
+    multipliers = np.linspace(0.5, 1.2, 8)
+    output = SS.stress_calibration_tests(df, scenarios=multipliers, **kw)
+    assert output.shape[0] == 8*7
+    verdicts = output['Jeffreys Pass/Fail'].unstack('Rating')
+    assert verdicts.shape == (8, 7)
+
+    # Same as rerunning the tests on the stressed PDs
+    for s, m in enumerate(multipliers):
+        stressed = df.assign(prob_default=m*PDs)
+        jeffreys = JT.jeffreys_test(stressed, alpha=0.05, **kw).drop('Overall')
+        binomial = BT.binomial_test(stressed, **kw)
+        assert (verdicts.loc[s].to_numpy() == jeffreys['Pass/Fail'].to_numpy()).all()
+        assert np.allclose(output.loc[s, 'Binomial Test'], binomial['Binomial Test'])
+        assert (output.loc[s, 'Binomial Conclusion'].to_numpy() == binomial['Conclusion'].to_numpy()).all()
+    # Lower PDs fail first
+    assert (verdicts.loc[0] == 'Fail').all() and (verdicts.loc[7] == 'Pass').all()
+
+    # Per-rating additive shifts from a labelled DataFrame
+    shifts = pd.DataFrame([[-0.005]*7, [0.0]*7], columns=range(7, 0, -1), index=['down', 'base'])
+    additive = SS.stress_calibration_tests(df, scenarios=shifts, shift='additive', **kw)
+    assert np.allclose(additive.loc['base', 'PD'], 0.01*np.arange(1, 8))
+    assert np.allclose(additive.loc['down', 'PD'], 0.01*np.arange(1, 8) - 0.005)
+
+    with pytest.raises(ValueError):
+        SS.stress_calibration_tests(df, scenarios=np.ones((3, 5)), **kw)
@@ -0,0 +1,53 @@
+import risktests.Transition_matrices as TM
+import risktests.Stability_of_Migration_Matrices as SM
+import pytest
+import pandas as pd
+import numpy as np
+
+
+def test_TM():
+    df = pd.DataFrame({'obligor': ['a', 'a', 'a', 'b', 'b', 'c'],
+                       'date': ['2019-06-01', '2020-07-01', '2021-06-01',
+                                '2018-01-01', '2020-01-01', '2020-03-01'],
+                       'rating': ['A', 'B', 'D', 'B', 'A', 'B']})
+    history = TM.RatingHistory(df=df, obligor_col='obligor', date_col='date', ratings_col='rating')
+
+    # a and b are rated A at the start, a is B a year later, c enters later
+    N_ij = history.cohort_counts('2020-01-01', '2021-01-01')
+    assert N_ij.loc['A'].tolist() == [1, 1, 0]
+    assert N_ij.to_numpy().sum() == 2
+    assert history.cohort_matrix('2020-01-01', '2021-01-01').loc['A', 'B'] == 0.5
+
+    # a spends half a year in A and in B, b a year in A, c ten months in B
+    N_ij, exposure = history.duration_counts('2020-01-01', '2021-01-01')
+    assert N_ij.to_numpy().sum() == 1 and N_ij.loc['A', 'B'] == 1
+    days = np.array([182 + 366, 184 + 306, 0])
+    assert np.allclose(exposure, days*24*3600*1e9/TM.YEAR)
+    Q = history.duration_generator('2020-01-01', '2021-01-01')
+    assert round(Q.loc['A', 'B'], 12) == round(1/exposure['A'], 12)
+    assert np.allclose(Q.sum(axis=1), 0)
+    P = history.duration_matrix('2020-01-01', '2021-01-01')
+    assert np.allclose(P.sum(axis=1), 1)
+    assert round(P.loc['A', 'A'], 12) == round(np.exp(-1/exposure['A']), 12)
+
+
+def test_TM_cohorts():
+    rng = np.random.default_rng(10)
+    n = 3000
+    df = pd.DataFrame({'obligor': rng.integers(0, 300, size=n),
+                       'date': pd.Timestamp('2015-01-01') +
+                       pd.to_timedelta(rng.integers(0, 5*365, size=n), unit='D'),
+                       'rating': rng.integers(1, 6, size=n)})
+    history = TM.RatingHistory(df, 'obligor', 'date', 'rating')
+    starts = pd.date_range('2016-01-01', periods=24, freq='MS')
+
+    N = history.cohort_counts_by_start(starts)
+    assert N.shape == (24, 5, 5)
+    for i in [0, 13]:
+        expected = history.cohort_counts(starts[i], starts[i] + pd.DateOffset(years=1))
+        assert (N[i] == expected.to_numpy()).all()
+    z, phi = SM.migration_matrix_stability_from_counts(N)
+    assert z.shape == (24, 5, 5)
+
+    with pytest.raises(ValueError):
+        TM.RatingHistory(df, 'obligor', 'date', 'grade')
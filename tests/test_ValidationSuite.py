@@ -0,0 +1,36 @@
+import risktests.Validation_suite as VS
+import risktests.Binomial_test as BT
+import risktests.Jeffreys_test as JT
+import risktests.Population_Stability_Index as PSI
+import risktests.LGD_t_test as LGD
+import pytest
+import pandas as pd
+import numpy as np
+
+
+def test_ValidationSuite():
+    rng = np.random.default_rng(10)
+    ratings = rng.integers(1, 8, size=5000)
+    PDs = 0.02*ratings*rng.uniform(0.8, 1.2, size=5000)
+    df = pd.DataFrame({'ratings': ratings,
+                       'ratings2': np.clip(ratings + rng.integers(-1, 2, size=5000), 1, 7),
+                       'default_flag': (rng.uniform(size=5000) < PDs).astype(int),
+                       'prob_default': PDs,
+                       'LGD': rng.uniform(size=5000),
+                       'PRED_LGD': rng.uniform(size=5000)})
+
+    suite = VS.ValidationSuite(df=df, tests=['binomial', 'jeffreys', 'psi', 'lgd_t_test'],
+                               ratings_col='ratings', final_ratings_col='ratings2',
+                               defaults_col='default_flag', PDs_col='prob_default',
+                               LGD_col='LGD', pred_LGD_col='PRED_LGD')
+    assert suite.plan() == ['ratings_codes', 'grade_aggregates', 'final_ratings_codes',
+                            'contingency_table', 'lgd_moments']
+    output = suite.run()
+    kw = dict(df=df, ratings_col='ratings', defaults_col='default_flag', PDs_col='prob_default')
+    pd.testing.assert_frame_equal(output['binomial'], BT.binomial_test(**kw))
+    pd.testing.assert_frame_equal(output['jeffreys'], JT.jeffreys_test(**kw))
+    assert round(output['psi'], 10) == round(PSI.PSI(df, 'ratings', 'ratings2'), 10)
+    assert np.allclose(output['lgd_t_test'], LGD.lgd_t_test(df, 'LGD', 'PRED_LGD'))
+
+    with pytest.raises(TypeError):
+        VS.ValidationSuite(df=df, tests=['binomial'], ratings_col='ratings').run()
@@ -0,0 +1,79 @@
+import risktests.Binomial_test as BT
+import risktests.Traffic_lights_approach as TL
+import pytest
+import pandas as pd
+import numpy as np
+from scipy.stats import binom, norm
+from scipy.integrate import quad
+
+
+def test_vasicek_binomial_test():
+    rng = np.random.default_rng(10)
+    ratings = rng.integers(1, 6, size=50000)
+    PDs = 0.01*ratings
+    df = pd.DataFrame({'ratings': ratings,
+                       'prob_default': PDs,
+                       'default_flag': (rng.uniform(size=50000) < 1.5*PDs).astype(int)})
+    output = BT.vasicek_binomial_test(df, 'default_flag', 'prob_default', 'ratings', rho=0.12)
+    independent = BT.binomial_test(df, 'default_flag', 'prob_default', 'ratings')
+    # Correlation widens the default distribution: 50% more defaults are
+    # rejected without it but not with it
+    assert (independent['Conclusion'] == 'reject').all()
+    assert (output['Conclusion'] == 'fail to reject').all()
+    assert np.allclose(BT.vasicek_binomial_test(df, 'default_flag', 'prob_default', 'ratings', rho=1e-6)
+                       ['Vasicek Binomial Test'], independent['Binomial Test'], atol=1e-3)
+
+    # The quadrature against adaptive integration over the factor
+    def direct(k, N, p, rho):
+        conditional = lambda z: norm.cdf((norm.ppf(p) - np.sqrt(rho)*z)/np.sqrt(1 - rho))
+        return quad(lambda z: binom.cdf(k, N, conditional(z))*norm.pdf(z), -12, 12, limit=2000)[0]
+    k, N, p = np.array([3, 300, 10000, 0]), np.array([100, 10000, 1000000, 50]), np.array([0.02, 0.02, 0.02, 0.001])
+    assert np.allclose(BT._vasicek_cdf(k, N, p, 0.12), [direct(*args, 0.12) for args in zip(k, N, p)], atol=1e-6)
+
+    # Degenerate PDs: none or all of the loans default
+    with np.errstate(all='raise'):
+        cdf = BT._vasicek_cdf([0, 9, 10, 0, 3], [10, 10, 10, 10, 10], [1., 1., 1., 0., 0.], 0.12)
+    assert list(cdf) == [0, 0, 1, 1, 1]
+    assert list(BT._vasicek_quantile([10, 10], [0., 1.], 0.12, 0.95)) == [0, 10]
+
+
+def test_tasche_traffic_lights():
+    rng = np.random.default_rng(10)
+    ratings = rng.integers(1, 4, size=30000)
+    PDs = 0.02*ratings
+    df = pd.DataFrame({'ratings': ratings, 'prob_default': PDs,
+                       'default_flag': (rng.uniform(size=30000) < PDs*np.array([0, 1, 2.5, 4])[ratings]).astype(int)})
+    output = TL.tasche_traffic_lights(df, 'ratings', 'default_flag', 'prob_default', rho=0.05)
+    assert list(output['Traffic Light']) == ['Green', 'Yellow', 'Red']
+    assert (output['Green up to'] < output['Yellow up to']).all()
+    # The thresholds are the quantiles of the correlated default distribution
+    N, p = output['Number of Obs'].to_numpy(), output['Average PD'].to_numpy()
+    for q, col in [(0.95, 'Green up to'), (0.999, 'Yellow up to')]:
+        c = output[col].to_numpy()
+        assert (BT._vasicek_cdf(c, N, p, 0.05) >= q).all()
+        assert (BT._vasicek_cdf(c - 1, N, p, 0.05) < q).all()
+
+    with pytest.raises(TypeError):
+        TL.tasche_traffic_lights(df, 'ratings', 'default_flag', 'prob_default', rho=0.05, q_low=0.999, q_high=0.95)
+
+
+def test_vasicek_quantile(monkeypatch):
+    rng = np.random.default_rng(10)
+    N = rng.integers(1000, 20000, size=300)
+    p = rng.uniform(0.005, 0.05, size=300)
+    monkeypatch.setattr(BT, '_QUANTILE_OFFSETS', BT.OrderedDict())
+    calls = []
+    cdf = BT._vasicek_cdf
+    monkeypatch.setattr(BT, '_vasicek_cdf', lambda k, *args: calls.append(len(k)) or cdf(k, *args))
+    runs = []
+    for sizes in [N, N + rng.integers(-50, 51, size=300)]:
+        calls.clear()
+        c = BT._vasicek_quantile(sizes, p, 0.12, 0.999)
+        assert (cdf(c, sizes, p, 0.12) >= 0.999).all()
+        assert (cdf(c - 1, sizes, p, 0.12) < 0.999).all()
+        runs.append(list(calls))
+    # The rerun on changed pool sizes reuses the offsets per (PD, rho, q,
+    # n_nodes) and settles most pools after evaluating all of them twice
+    assert len(BT._QUANTILE_OFFSETS) == 300
+    assert runs[1][:2] == [300, 300] and max(runs[1][2:]) < 100
+    assert sum(runs[1]) < sum(runs[0])
@@ -0,0 +1,45 @@
+import risktests.InformationValue as IV
+import pytest
+import pandas as pd
+import numpy as np
+
+
+def test_information_values():
+    rng = np.random.default_rng(10)
+    n = 20000
+    income = rng.lognormal(10, 1, size=n)
+    noise = rng.normal(size=n)
+    region = rng.choice(['north', 'south', 'east'], size=n)
+    logit = -2 - 0.8*(np.log(income) - 10) + 0.5*(region == 'south')
+    df = pd.DataFrame({'income': income,
+                       'noise': noise,
+                       'region': region,
+                       'default_flag': (rng.uniform(size=n) < 1/(1 + np.exp(-logit))).astype(int)})
+    df.loc[:199, 'income'] = np.nan
+    summary, bins = IV.information_values(df, 'default_flag', n_bins=20)
+    assert list(summary.index) == ['income', 'region', 'noise']
+    assert (np.diff(summary['IV']) <= 0).all()
+    assert np.isfinite(bins['WoE']).all()
+    assert np.allclose(bins.groupby(level='Variable', sort=False)['IV'].sum(), summary['IV'])
+    assert (bins.groupby(level='Variable')['N'].sum() == n).all()
+    assert bins.loc[('income', 'Missing'), 'N'] == 200
+
+    # Same as the per-rating Information_value for a discrete driver
+    agg = df.assign(ratings=df['region'], prob_default=0.1)
+    expected = IV.Information_value(agg, 'default_flag', 'prob_default', 'ratings')
+    assert summary.loc['region', 'IV'] == pytest.approx(expected.loc['Overall', 'IV'])
+
+    merged_summary, merged = IV.information_values(df, 'default_flag', cols=['income', 'noise'],
+                                                   n_bins=20, monotone=True)
+    for col in ['income', 'noise']:
+        rates = merged.loc[col].drop('Missing', errors='ignore')['Bad rate'].to_numpy()
+        assert (np.diff(rates) <= 0).all() or (np.diff(rates) >= 0).all()
+        assert merged.loc[col, 'N'].sum() == n
+    # Income falls with a decreasing bad rate, so few bins are merged
+    assert merged_summary.loc['income', 'Bins'] > 10
+    assert merged_summary.loc['noise', 'Bins'] < summary.loc['noise', 'Bins']
+
+    with pytest.raises(ValueError):
+        IV.information_values(df.assign(default_flag=2), 'default_flag')
+    with pytest.raises(ValueError):
+        IV.information_values(df, 'default_flag', cols=['score'])